@@ -6,38 +6,138 @@ import os
 from datetime import timedelta
 import logging
 from logging.handlers import RotatingFileHandler
-from dotenv import load_dotenv 
-load_dotenv()
+from dotenv import load_dotenv
+from routing import REPLICA_PREFIX
+
+# Arbitrary key for the PostgreSQL advisory lock held while migrating
+MIGRATION_LOCK_KEY = 4712001
+
+
+def engine_options(database_url, prefix='DB_'):
+    """SQLAlchemy engine options, with pool sizing from `prefix`* environment variables"""
+    options = {'pool_pre_ping': True}
+    if not database_url.startswith('sqlite'):
+        options.update(
+            pool_size=int(os.environ.get(f'{prefix}POOL_SIZE', 5)),
+            max_overflow=int(os.environ.get(f'{prefix}MAX_OVERFLOW', 10)),
+            pool_recycle=int(os.environ.get(f'{prefix}POOL_RECYCLE', 1800)),
+            pool_timeout=int(os.environ.get(f'{prefix}POOL_TIMEOUT', 30)),
+        )
+    return options
+
+
+def replica_binds(replica_urls):
+    """SQLALCHEMY_BINDS for the comma-separated read replica URLs, each with
+    its own pool sized by the DB_REPLICA_* variables"""
+    urls = [url.strip() for url in (replica_urls or '').split(',') if url.strip()]
+    return {f'{REPLICA_PREFIX}{n}': dict(engine_options(url, 'DB_REPLICA_'), url=url)
+            for n, url in enumerate(urls)}
+
+
+def run_migrations_once(app):
+    """Upgrade the schema under a lock so concurrently booting workers don't race.
+
+    Only used when AUTO_MIGRATE is set; deployments normally run
+    `flask db upgrade` as a release step instead (see Procfile).
+    """
+    from flask_migrate import upgrade
+    with app.app_context():
+        if db.engine.dialect.name == 'postgresql':
+            with db.engine.connect() as conn:
+                conn.execute(db.text('SELECT pg_advisory_lock(:key)'), {'key': MIGRATION_LOCK_KEY})
+                try:
+                    upgrade()
+                finally:
+                    conn.execute(db.text('SELECT pg_advisory_unlock(:key)'), {'key': MIGRATION_LOCK_KEY})
+        else:
+            import fcntl
+            with open(os.path.join(app.instance_path, 'migrate.lock'), 'w') as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                upgrade()
+
 
 def create_app(test_config=None):
     """Application factory function"""
+    load_dotenv()
     app = Flask(__name__)
     
-  
+    database_url = os.environ.get('DATABASE_URL') or 'sqlite:///medications.db'
     app.config.from_mapping(
         SECRET_KEY=os.environ.get('SECRET_KEY') or 'dev_key',
-        SQLALCHEMY_DATABASE_URI=os.environ.get('DATABASE_URL') or 'sqlite:///medications.db',
+        SQLALCHEMY_DATABASE_URI=database_url,
         SQLALCHEMY_TRACK_MODIFICATIONS=False,
-        SQLALCHEMY_ENGINE_OPTIONS={'pool_pre_ping': True},
+        SQLALCHEMY_ENGINE_OPTIONS=engine_options(database_url),
+        # GET requests read from these (see routing.RoutingSession)
+        SQLALCHEMY_BINDS=replica_binds(os.environ.get('DATABASE_REPLICA_URLS')),
+        AUTO_MIGRATE=os.environ.get('AUTO_MIGRATE', '').lower() in ('1', 'true', 'yes'),
+        # Fraction of requests run under cProfile; sampled requests slower than
+        # PROFILE_SLOW_MS have their profile written to the log
+        PROFILE_SAMPLE_RATE=float(os.environ.get('PROFILE_SAMPLE_RATE', 0)),
+        PROFILE_SLOW_MS=float(os.environ.get('PROFILE_SLOW_MS', 500)),
+        LOG_MAX_BYTES=int(os.environ.get('LOG_MAX_BYTES', 10 * 1024 * 1024)),
+        # 'memory' for a single process, 'postgres' to fan out via LISTEN/NOTIFY
+        ALERTS_BACKEND=os.environ.get('ALERTS_BACKEND') or 'memory',
+        # Open /api/alerts/stream connections per worker, 0 for no limit;
+        # gunicorn.conf.py caps it for gthread workers
+        SSE_MAX_CONNECTIONS=int(os.environ.get('SSE_MAX_CONNECTIONS', 0)),
+        # Stored responses of Idempotency-Key writes: 'memory' (per process,
+        # at most IDEMPOTENCY_MAX_KEYS) or 'database' (shared by all workers),
+        # kept for IDEMPOTENCY_TTL seconds
+        IDEMPOTENCY_BACKEND=os.environ.get('IDEMPOTENCY_BACKEND') or 'memory',
+        IDEMPOTENCY_TTL=int(os.environ.get('IDEMPOTENCY_TTL', 86400)),
+        IDEMPOTENCY_MAX_KEYS=int(os.environ.get('IDEMPOTENCY_MAX_KEYS', 10000)),
+        # Medications (name and threshold) and patients (name) each worker caches
+        REFERENCE_CACHE_SIZE=int(os.environ.get('REFERENCE_CACHE_SIZE', 10000)),
+        # 'orjson' (falls back to 'stdlib' when orjson is not installed)
+        JSON_BACKEND=os.environ.get('JSON_BACKEND') or 'orjson',
         CORS_ORIGINS=[
             "http://localhost:3000",
             "https://medication-2uz1.onrender.com"],
     )
+    if test_config:
+        app.config.update(test_config)
     
-  
     db.init_app(app)
     migrate = Migrate(app, db)
     
-    @app.before_first_request
-    def run_migrations():
-        from flask_migrate import upgrade
-        upgrade()
+    import serialization
+    serialization.init_app(app)
+    
+    import events
+    events.init_app(app)
+    
+    import instrumentation
+    instrumentation.init_app(app)
+    
+    import idempotency
+    idempotency.init_app(app)
+    
+    import schedules
+    schedules.init_app(app)
+    
+    import imports
+    imports.init_app(app)
+    
+    import partitions
+    partitions.init_app(app)
+    
+    import ledger
+    ledger.init_app(app)
+
+    import references
+    references.init_app(app)
+    
+    if app.config['AUTO_MIGRATE']:
+        os.makedirs(app.instance_path, exist_ok=True)
+        run_migrations_once(app)
 
     CORS(app, resources={
         r"/api/*": {
             "origins": app.config['CORS_ORIGINS'],
             "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-            "allow_headers": ["Content-Type", "Authorization"]
+            "allow_headers": ["Content-Type", "Authorization", "If-None-Match", "Idempotency-Key"],
+            "expose_headers": ["X-Next-Cursor", "X-Alerts-As-Of", "ETag", "Server-Timing",
+                               "Idempotent-Replayed"]
         }
     })
     
@@ -66,7 +166,19 @@ def create_app(test_config=None):
                     "POST": "/api/dosages"
                 },
                 "alerts": {
-                    "GET": "/api/alerts"
+                    "GET": "/api/alerts",
+                    "stream": "/api/alerts/stream"
+                },
+                "schedules": {
+                    "GET": "/api/schedules",
+                    "POST": "/api/schedules",
+                    "timeline": "/api/patients/<id>/timeline"
+                },
+                "summary": {
+                    "GET": "/api/summary"
+                },
+                "metrics": {
+                    "GET": "/metrics"
                 }
             }
         })
@@ -86,7 +198,7 @@ def create_app(test_config=None):
             os.mkdir('logs')
         file_handler = RotatingFileHandler(
             'logs/medication_tracker.log',
-            maxBytes=10240,
+            maxBytes=app.config['LOG_MAX_BYTES'],
             backupCount=10
         )
         file_handler.setFormatter(logging.Formatter(
@@ -99,7 +211,16 @@ def create_app(test_config=None):
     
     return app
 
-app = create_app()
+
+def __getattr__(name):
+    # `gunicorn app:app` and the flask CLI look up `app`; build it on first
+    # access so that importing create_app (scripts, benchmarks) stays cheap
+    if name == 'app':
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5001, debug=True)
\ No newline at end of file
+    create_app().run(host='0.0.0.0', port=5001, debug=True)
\ No newline at end of file
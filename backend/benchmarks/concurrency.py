@@ -0,0 +1,76 @@
+"""Benchmark: gunicorn worker modes under many concurrent clients.
+
+Seeds one database, then load-tests the read-heavy mix plus dosage writes
+against each worker class in turn (sync, gthread and, when installed,
+gevent) with the same number of processes, and prints requests/sec and
+latency percentiles side by side.
+
+    python benchmarks/concurrency.py --clients 500 --duration 30
+    python benchmarks/concurrency.py --database-url postgresql://localhost/med_bench --skip-seed
+"""
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', help='defaults to a temporary SQLite file')
+    parser.add_argument('--skip-seed', action='store_true')
+    parser.add_argument('--patients', type=int, default=1000)
+    parser.add_argument('--medications', type=int, default=100)
+    parser.add_argument('--dosages', type=int, default=100000)
+    parser.add_argument('--clients', type=int, default=500)
+    parser.add_argument('--load-processes', type=int, default=10)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--server-workers', type=int, default=4)
+    parser.add_argument('--server-threads', type=int, default=16)
+    parser.add_argument('--modes', nargs='*', default=['sync', 'gthread', 'gevent'])
+    parser.add_argument('--port', type=int, default=5099)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench-')
+    os.environ['DATABASE_URL'] = args.database_url or f'sqlite:///{workdir}/bench.db'
+    env = dict(os.environ)
+    os.chdir(workdir)
+
+    from app import create_app
+    from extensions import db
+    from models import Medication, Patient
+    from benchmarks.run import run_http
+    from benchmarks.seed import seed
+
+    with create_app().app_context():
+        if not args.skip_seed:
+            seed(args.patients, args.medications, args.dosages)
+        medications = db.session.query(db.func.max(Medication.id)).scalar() or 0
+        patients = db.session.query(db.func.max(Patient.id)).scalar() or 0
+
+    results = {}
+    for mode in args.modes:
+        if mode == 'gevent' and not (importlib.util.find_spec('gevent') and importlib.util.find_spec('psycogreen')):
+            print('skipping gevent: pip install gevent psycogreen', file=sys.stderr)
+            continue
+        print(f'{mode}: {args.clients} clients for {args.duration:.0f}s', file=sys.stderr)
+        run_args = argparse.Namespace(
+            port=args.port, worker_class=mode, server_workers=args.server_workers,
+            server_threads=args.server_threads, load_scenarios=None, duration=args.duration,
+            load_processes=args.load_processes, load_threads=args.clients // args.load_processes)
+        results[mode] = run_http(env, workdir, run_args, medications, patients)
+
+    print(json.dumps(results, indent=2))
+    print(f'\n{"mode":10} {"req/s":>9} {"p50 ms":>9} {"p99 ms":>9} {"errors":>7}', file=sys.stderr)
+    for mode, report in results.items():
+        errors = sum(s['errors'] for s in report['scenarios'].values())
+        print(f'{mode:10} {report["requests_per_sec"]:>9} {report["overall"].get("p50_ms"):>9} '
+              f'{report["overall"].get("p99_ms"):>9} {errors:>7}', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
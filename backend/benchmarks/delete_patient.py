@@ -0,0 +1,90 @@
+"""Benchmark: deleting a patient with a long dosage history.
+
+Two identical patients get --doses doses each. One is deleted through
+DELETE /api/patients/<id>, where ON DELETE CASCADE removes the dosages in
+the database; the other the way the ORM used to do it, loading every
+dosage, taking each out of the rollup and deleting it row by row.
+
+    python benchmarks/delete_patient.py --doses 100000
+    python benchmarks/delete_patient.py --database-url postgresql://localhost/med_delete
+
+The tables of the target database are dropped and recreated, so only point
+--database-url at a scratch database. Without it a temporary SQLite file is used.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--doses', type=int, default=100000, help='doses per patient')
+    parser.add_argument('--database-url')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='delete-patient-')
+    os.environ['DATABASE_URL'] = args.database_url or f'sqlite:///{workdir}/delete.db'
+    os.chdir(workdir)
+
+    from sqlalchemy import event, insert
+    from app import create_app
+    from extensions import db
+    from inventory import record_consumption
+    from models import Patient, Dosage, DailyConsumption
+    from versions import touch
+
+    app = create_app()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        client = app.test_client()
+        med_id = client.post('/api/medications', json={
+            'name': 'Delete', 'current_stock': 10 ** 9, 'threshold': 0}).get_json()['id']
+        patient_ids = [client.post('/api/patients', json={
+            'first_name': 'Delete', 'last_name': name, 'date_of_birth': '1980-01-01',
+            'medical_record_number': f'DELETE-{name}'}).get_json()['id'] for name in ('cascade', 'orm')]
+        start = datetime.utcnow() - timedelta(days=365)
+        for patient_id in patient_ids:
+            rows = [{'medication_id': med_id, 'patient_id': patient_id, 'dosage_amount': 1.0,
+                     'dosage_time': start + timedelta(minutes=5 * n), 'administered_by': 'Nurse'}
+                    for n in range(args.doses)]
+            db.session.execute(insert(Dosage), rows)
+            record_consumption((med_id, row['dosage_time'], 1.0, 1) for row in rows)
+        db.session.commit()
+
+        # Dosage rows materialized in the session
+        loaded = []
+        event.listen(Dosage, 'load', lambda target, context: loaded.append(1))
+
+        started = time.perf_counter()
+        resp = client.delete(f'/api/patients/{patient_ids[0]}')
+        cascade = (time.perf_counter() - started, len(loaded))
+        assert resp.status_code == 200, resp.get_json()
+
+        loaded.clear()
+        started = time.perf_counter()
+        patient = db.session.get(Patient, patient_ids[1])
+        dosages = db.session.query(Dosage).filter_by(patient_id=patient.id).all()
+        record_consumption((d.medication_id, d.dosage_time, -d.dosage_amount, -1) for d in dosages)
+        for dosage in dosages:
+            db.session.delete(dosage)
+        db.session.delete(patient)
+        touch('patients', 'dosages', 'medications', 'schedules')
+        db.session.commit()
+        orm = (time.perf_counter() - started, len(loaded))
+
+        left = db.session.query(Dosage).count()
+        rolled_up = db.session.query(db.func.coalesce(db.func.sum(DailyConsumption.dose_count), 0)).scalar()
+
+    print(f'{args.doses} doses per patient; afterwards {left} dosages, {rolled_up} in the rollup')
+    print(f'cascade: {cascade[0]:.3f}s, {cascade[1]} dosages loaded')
+    print(f'orm:     {orm[0]:.3f}s, {orm[1]} dosages loaded')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Benchmark: peak RSS of the dosage history export.
+
+Seeds a dosage table (5M rows by default) and then, in a fresh process
+each, downloads the whole history through GET /api/dosages/export and,
+with --buffered, through the old approach of building one JSON list.
+Peak resident memory of each run is reported as JSON.
+
+    python benchmarks/export_rss.py --rows 5000000 --format csv --buffered
+    python benchmarks/export_rss.py --database-url sqlite:////tmp/bench.db --skip-seed
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(fmt, buffered):
+    """Run one export in this process and return its timings and peak RSS"""
+    from app import create_app
+    from flask import jsonify
+    from models import Dosage
+
+    app = create_app()
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+    size = 0
+    if buffered:
+        with app.test_request_context():
+            rows = Dosage.listing_query().all()
+            size = len(jsonify([Dosage.row_to_dict(row) for row in rows]).get_data())
+    else:
+        response = app.test_client().get(f'/api/dosages/export?format={fmt}', buffered=False)
+        for chunk in response.iter_encoded():
+            size += len(chunk)
+        response.close()
+    return {
+        'mode': 'buffered-json' if buffered else f'streamed-{fmt}',
+        'seconds': round(time.perf_counter() - started, 2),
+        'bytes': size,
+        'baseline_rss_mb': round(baseline, 1),
+        'peak_rss_mb': round(peak_rss_mb(), 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=5_000_000)
+    parser.add_argument('--format', choices=('ndjson', 'csv'), default='ndjson')
+    parser.add_argument('--buffered', action='store_true', help='also measure a buffered JSON list')
+    parser.add_argument('--database-url', help='defaults to a temporary SQLite file')
+    parser.add_argument('--skip-seed', action='store_true')
+    parser.add_argument('--measure', choices=('streamed', 'buffered'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.format, args.measure == 'buffered')))
+        return
+
+    workdir = tempfile.mkdtemp(prefix='export-rss-')
+    database_url = args.database_url or f'sqlite:///{workdir}/export.db'
+    env = dict(os.environ, DATABASE_URL=database_url)
+    os.environ['DATABASE_URL'] = database_url
+    os.chdir(workdir)
+
+    if not args.skip_seed:
+        from app import create_app
+        from benchmarks.seed import seed
+        with create_app().app_context():
+            seed(patients=10000, medications=200, dosages=args.rows)
+
+    results = []
+    for mode in ['streamed'] + (['buffered'] if args.buffered else []):
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--measure', mode, '--format', args.format],
+            env=env, check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(out.strip().splitlines()[-1]))
+    print(json.dumps({'rows': args.rows, 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Multi-process HTTP load generator for a running API server."""
+import http.client
+import json
+import multiprocessing
+import threading
+import time
+from urllib.parse import urlsplit
+
+from benchmarks.scenarios import Context
+
+
+def _client(args):
+    """One load process: `threads` keep-alive connections looping over scenarios"""
+    base_url, scenarios, threads, duration, medications, patients, seed = args
+    from benchmarks.scenarios import SCENARIOS
+    chosen = [s for s in SCENARIOS if s[0] in scenarios]
+    target = urlsplit(base_url)
+    results = {name: {'latencies': [], 'errors': 0} for name in scenarios}
+    deadline = time.perf_counter() + duration
+
+    def worker(n):
+        ctx = Context(medications, patients, rng_seed=seed * 1000 + n)
+        conn = http.client.HTTPConnection(target.hostname, target.port, timeout=60)
+        i = 0
+        while time.perf_counter() < deadline:
+            name, method, path, body, kind = chosen[i % len(chosen)]
+            i += 1
+            try:
+                url = path(ctx)
+            except IndexError:
+                # Needs a row created by an earlier request of this client
+                continue
+            payload = json.dumps(body(ctx)) if body else None
+            started = time.perf_counter()
+            try:
+                conn.request(method, url, body=payload,
+                             headers={'Content-Type': 'application/json'} if payload else {})
+                response = conn.getresponse()
+                data = response.read()
+                ok = response.status < 400
+                if response.status == 201 and kind:
+                    ctx.created[kind].append(json.loads(data)['id'])
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection(target.hostname, target.port, timeout=60)
+                ok = False
+            elapsed = time.perf_counter() - started
+            results[name]['latencies'].append(elapsed)
+            if not ok:
+                results[name]['errors'] += 1
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return results
+
+
+def run_load(base_url, scenarios, processes, threads, duration, medications, patients):
+    """Drive `scenarios` from processes x threads clients; return raw latencies"""
+    jobs = [(base_url, scenarios, threads, duration, medications, patients, p) for p in range(processes)]
+    merged = {name: {'latencies': [], 'errors': 0} for name in scenarios}
+    with multiprocessing.Pool(processes) as pool:
+        for result in pool.map(_client, jobs):
+            for name, data in result.items():
+                merged[name]['latencies'].extend(data['latencies'])
+                merged[name]['errors'] += data['errors']
+    return merged
+
+
+def wait_until_up(base_url, timeout=60):
+    target = urlsplit(base_url)
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            conn = http.client.HTTPConnection(target.hostname, target.port, timeout=5)
+            conn.request('GET', '/')
+            conn.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'Server at {base_url} did not come up')
@@ -0,0 +1,91 @@
+"""Micro-benchmarks of the per-row hot paths: serialization and parsing."""
+import timeit
+from datetime import date, datetime
+
+
+def _rate(fn, number):
+    """Best-of-3 calls per second of `fn`"""
+    best = min(timeit.repeat(fn, number=number, repeat=3))
+    return {'calls_per_sec': round(number / best), 'usec_per_call': round(best / number * 1e6, 3)}
+
+
+def _rows_per_sec(fn, rows):
+    """Best-of-3 rows per second of `fn(rows)`"""
+    best = min(timeit.repeat(lambda: fn(rows), number=1, repeat=3))
+    return {'rows_per_sec': round(len(rows) / best)}
+
+
+def run_rows(count=20000):
+    """Rows/sec of list serialization, ORM instances + stdlib JSON against
+    listing rows + compiled serializers + orjson; must run inside an app context"""
+    from flask import current_app
+    from flask.json.provider import DefaultJSONProvider
+    from models import Medication, Patient, Dosage
+    from serialization import OrjsonProvider, orjson
+
+    app = current_app._get_current_object()
+    stdlib = DefaultJSONProvider(app)
+    fast = OrjsonProvider(app) if orjson else stdlib
+    medication = Medication(id=1, name='Amoxicillin', description='500 mg', current_stock=120,
+                            threshold=20, low_stock=False, low_stock_changed_at=datetime(2025, 3, 1))
+    patient = Patient(id=1, first_name='Ada', last_name='Lovelace', date_of_birth=date(1815, 12, 10),
+                      medical_record_number='MRN-1')
+    dosage = Dosage(id=1, medication_id=1, patient_id=1, dosage_amount=1.5,
+                    dosage_time=datetime(2025, 3, 1, 8, 30), administered_by='Nurse 1', notes='')
+    dosage.medication = medication
+    dosage.patient = patient
+
+    def row(instance, values):
+        return tuple(values.get(column, getattr(instance, column, None)) for column in type(instance).LISTING_COLUMNS)
+
+    cases = {
+        'medications': ([medication] * count, [row(medication, {})] * count,
+                        lambda m: m.to_dict(0.0), lambda r: Medication.serialize_row(r, 0.0)),
+        'patients': ([patient] * count, [row(patient, {})] * count,
+                     Patient.to_dict, Patient.serialize_row),
+        'dosages': ([dosage] * count,
+                    [row(dosage, {'medication_name': 'Amoxicillin', 'patient_first_name': 'Ada',
+                                  'patient_last_name': 'Lovelace'})] * count,
+                    Dosage.to_dict, Dosage.serialize_row),
+    }
+    report = {}
+    for name, (instances, rows, to_dict, serialize_row) in cases.items():
+        report[name] = {
+            'to_dict+stdlib': _rows_per_sec(lambda items: stdlib.dumps([to_dict(i) for i in items]), instances),
+            'serialize_row+stdlib': _rows_per_sec(lambda items: stdlib.dumps([serialize_row(r) for r in items]), rows),
+            'serialize_row+orjson': _rows_per_sec(lambda items: fast.dumps([serialize_row(r) for r in items]), rows),
+        }
+    return report
+
+
+def run_micro(number=20000):
+    """Time the model serializers and parsers; must run inside an app context"""
+    from models import Medication, Patient, Dosage
+    from routes import parse_datetime, parse_dosage
+
+    medication = Medication(id=1, name='Amoxicillin', description='500 mg', current_stock=120,
+                            threshold=20, low_stock=False)
+    patient = Patient(id=1, first_name='Ada', last_name='Lovelace', date_of_birth=date(1815, 12, 10),
+                      medical_record_number='MRN-1')
+    dosage = Dosage(id=1, medication_id=1, patient_id=1, dosage_amount=1.5,
+                    dosage_time=datetime(2025, 3, 1, 8, 30), administered_by='Nurse 1', notes='')
+    dosage.medication = medication
+    dosage.patient = patient
+    dosage_row = (1, 1, 1, 1.5, datetime(2025, 3, 1, 8, 30), 'Nurse 1', '', 'Amoxicillin', 'Ada', 'Lovelace')
+    payload = {'medication_id': 1, 'patient_id': 1, 'dosage_amount': 2, 'notes': 'x',
+               'dosage_time': '2025-03-01 09:00:00', 'administered_by': 'Nurse 2'}
+
+    return {
+        'Medication.to_dict': _rate(medication.to_dict, number),
+        'Patient.to_dict': _rate(patient.to_dict, number),
+        'Dosage.to_dict': _rate(dosage.to_dict, number),
+        'Dosage.row_to_dict': _rate(lambda: Dosage.row_to_dict(
+            dosage, medication_name='Amoxicillin', patient_name='Ada Lovelace'), number),
+        'Dosage.serialize_row': _rate(lambda: Dosage.serialize_row(dosage_row), number),
+        'Medication.update_from_dict': _rate(lambda: medication.update_from_dict({'current_stock': 119}), number),
+        'Patient.update_from_dict': _rate(lambda: patient.update_from_dict({'date_of_birth': '1815-12-10'}), number),
+        'Dosage.update_from_dict': _rate(lambda: dosage.update_from_dict(payload), number),
+        'parse_datetime(space)': _rate(lambda: parse_datetime('2025-03-01 09:00:00'), number),
+        'parse_datetime(iso)': _rate(lambda: parse_datetime('2025-03-01T09:00:00'), number),
+        'parse_dosage': _rate(lambda: parse_dosage(payload), number),
+    }
@@ -0,0 +1,247 @@
+"""API benchmark suite: seeded data, every route, load test and micro-benchmarks.
+
+    python benchmarks/run.py --patients 10000 --dosages 5000000 --output results.json
+    python benchmarks/run.py --database-url postgresql://localhost/med_bench --skip-seed
+    python benchmarks/run.py --compare baseline.json --output results.json
+
+Stages (each can be skipped):
+  client  every scenario in benchmarks/scenarios.py through the Flask test
+          client: p50/p95/p99 latency, requests/sec, SQL statements per
+          request (from the Server-Timing header) and peak traced memory
+  load    the same read-heavy mix over HTTP against gunicorn (or the Flask
+          development server when gunicorn is missing) from several client
+          processes: latency percentiles, throughput and error count;
+          --worker-class picks the gunicorn mode (see benchmarks/concurrency.py)
+  micro   to_dict / update_from_dict / datetime parsing calls per second, and
+          rows/sec of list serialization (ORM to_dict + stdlib JSON against
+          compiled row serializers + orjson)
+
+Results are written as JSON together with the git commit, so two runs can
+be compared with --compare.
+"""
+import argparse
+import json
+import os
+import re
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+SQL_COUNT = re.compile(r'desc="(\d+) queries"')
+
+
+def percentiles(latencies):
+    """p50/p95/p99 and mean in milliseconds"""
+    if not latencies:
+        return {}
+    ordered = sorted(latencies)
+
+    def pick(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)
+
+    return {'p50_ms': pick(0.50), 'p95_ms': pick(0.95), 'p99_ms': pick(0.99),
+            'mean_ms': round(sum(ordered) / len(ordered) * 1000, 3)}
+
+
+def run_client(app, iterations, medications, patients, trace_memory):
+    """Run every scenario `iterations` times through the test client"""
+    from benchmarks.scenarios import SCENARIOS, Context
+
+    ctx = Context(medications, patients)
+    client = app.test_client()
+    report = {}
+    for name, method, path, body, kind in SCENARIOS:
+        latencies, statements, errors = [], [], 0
+        if trace_memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        for _ in range(iterations):
+            try:
+                url = path(ctx)
+            except IndexError:
+                continue
+            t0 = time.perf_counter()
+            response = client.open(url, method=method, json=body(ctx) if body else None)
+            response.get_data()
+            latencies.append(time.perf_counter() - t0)
+            if response.status_code >= 400:
+                errors += 1
+            elif response.status_code == 201 and kind:
+                ctx.created[kind].append(response.get_json()['id'])
+            match = SQL_COUNT.search(response.headers.get('Server-Timing', ''))
+            if match:
+                statements.append(int(match.group(1)))
+        elapsed = time.perf_counter() - started
+        entry = percentiles(latencies)
+        entry.update(requests=len(latencies), errors=errors,
+                     requests_per_sec=round(len(latencies) / elapsed, 1) if elapsed else None,
+                     sql_statements_per_request=round(sum(statements) / len(statements), 2) if statements else None)
+        if trace_memory:
+            entry['peak_traced_mb'] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 2)
+            tracemalloc.stop()
+        report[name] = entry
+        print(f'  {name:30} p50 {entry.get("p50_ms")} ms  p99 {entry.get("p99_ms")} ms', file=sys.stderr)
+    return report
+
+
+def run_http(env, workdir, args, medications, patients):
+    """Serve the app in a subprocess and load it over HTTP"""
+    from benchmarks.load import run_load, wait_until_up
+    from benchmarks.scenarios import READ_SCENARIOS
+
+    base_url = f'http://127.0.0.1:{args.port}'
+    if shutil.which('gunicorn'):
+        # Through the environment, so gunicorn.conf.py sizes the pool to match
+        env = dict(env, GUNICORN_WORKER_CLASS=args.worker_class, GUNICORN_THREADS=str(args.server_threads))
+        command = ['gunicorn', '-c', os.path.join(BACKEND, 'gunicorn.conf.py'),
+                   '-w', str(args.server_workers), '-b', f'127.0.0.1:{args.port}', 'app:app']
+        server = f'gunicorn {args.worker_class} x{args.server_workers}'
+        if args.worker_class == 'gthread':
+            server += f' x{args.server_threads} threads'
+    else:
+        command = [sys.executable, '-c',
+                   f'from app import create_app; create_app().run(port={args.port}, threaded=True)']
+        server = 'flask dev server (threaded)'
+    proc = subprocess.Popen(command, cwd=BACKEND, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_up(base_url)
+        names = args.load_scenarios or [s[0] for s in READ_SCENARIOS] + ['add_dosage']
+        started = time.perf_counter()
+        raw = run_load(base_url, names, args.load_processes, args.load_threads,
+                       args.duration, medications, patients)
+        elapsed = time.perf_counter() - started
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    total = sum(len(r['latencies']) for r in raw.values())
+    report = {
+        'server': server,
+        'clients': args.load_processes * args.load_threads,
+        'duration_s': round(elapsed, 1),
+        'requests': total,
+        'requests_per_sec': round(total / elapsed, 1),
+        'overall': percentiles([l for r in raw.values() for l in r['latencies']]),
+        'scenarios': {}
+    }
+    for name, data in raw.items():
+        entry = percentiles(data['latencies'])
+        entry.update(requests=len(data['latencies']), errors=data['errors'])
+        report['scenarios'][name] = entry
+    return report
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline, current):
+    """Print p50/p99 and throughput changes between two result files"""
+    print(f'comparing {baseline.get("commit")} -> {current.get("commit")}')
+    for stage in ('client',):
+        for name, now in current.get(stage, {}).items():
+            before = baseline.get(stage, {}).get(name)
+            if not before or not before.get('p50_ms') or not now.get('p50_ms'):
+                continue
+            change = (now['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100
+            print(f'  {name:30} p50 {before["p50_ms"]:>9} -> {now["p50_ms"]:>9} ms ({change:+.1f}%)'
+                  f'  p99 {before["p99_ms"]} -> {now["p99_ms"]} ms')
+    if 'load' in baseline and 'load' in current:
+        print(f'  load throughput {baseline["load"]["requests_per_sec"]} -> '
+              f'{current["load"]["requests_per_sec"]} req/s')
+    for name, now in current.get('micro', {}).items():
+        before = baseline.get('micro', {}).get(name)
+        if before:
+            print(f'  {name:30} {before["calls_per_sec"]:>9} -> {now["calls_per_sec"]:>9} calls/s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter, epilog=__doc__)
+    parser.add_argument('--database-url', help='defaults to a temporary SQLite file')
+    parser.add_argument('--patients', type=int, default=1000)
+    parser.add_argument('--medications', type=int, default=100)
+    parser.add_argument('--dosages', type=int, default=100000)
+    parser.add_argument('--skip-seed', action='store_true', help='benchmark the existing data')
+    parser.add_argument('--iterations', type=int, default=50, help='test client requests per scenario')
+    parser.add_argument('--trace-memory', action='store_true', help='record peak traced memory per scenario')
+    parser.add_argument('--skip-client', action='store_true')
+    parser.add_argument('--skip-load', action='store_true')
+    parser.add_argument('--skip-micro', action='store_true')
+    parser.add_argument('--duration', type=float, default=20, help='load test seconds')
+    parser.add_argument('--load-processes', type=int, default=4)
+    parser.add_argument('--load-threads', type=int, default=8)
+    parser.add_argument('--load-scenarios', nargs='*')
+    parser.add_argument('--server-workers', type=int, default=4)
+    parser.add_argument('--worker-class', default='gthread', choices=['sync', 'gthread', 'gevent'])
+    parser.add_argument('--server-threads', type=int, default=16, help='threads per gthread worker')
+    parser.add_argument('--port', type=int, default=5098)
+    parser.add_argument('--output', help='write results JSON here')
+    parser.add_argument('--compare', help='baseline results JSON to compare against')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench-')
+    database_url = args.database_url or f'sqlite:///{workdir}/bench.db'
+    os.environ['DATABASE_URL'] = database_url
+    env = dict(os.environ)
+    os.chdir(workdir)
+
+    from app import create_app
+    from extensions import db
+    from models import Medication, Patient
+    from benchmarks.seed import seed
+
+    app = create_app()
+    results = {'commit': git_commit(), 'started_at': time.strftime('%Y-%m-%dT%H:%M:%S')}
+    with app.app_context():
+        results['database'] = db.engine.url.get_backend_name()
+        if not args.skip_seed:
+            print(f'seeding {args.patients} patients, {args.medications} medications, '
+                  f'{args.dosages} dosages', file=sys.stderr)
+            t0 = time.perf_counter()
+            seed(args.patients, args.medications, args.dosages)
+            results['seed_seconds'] = round(time.perf_counter() - t0, 1)
+        medications = db.session.query(db.func.max(Medication.id)).scalar() or 0
+        patients = db.session.query(db.func.max(Patient.id)).scalar() or 0
+        results['volumes'] = {'medications': medications, 'patients': patients,
+                              'dosages': db.session.execute(db.text('SELECT count(*) FROM dosages')).scalar()}
+
+        if not args.skip_micro:
+            from benchmarks.micro import run_micro, run_rows
+            print('micro-benchmarks', file=sys.stderr)
+            results['micro'] = run_micro()
+            results['serialization_rows'] = run_rows()
+
+    if not args.skip_client:
+        print('test client scenarios', file=sys.stderr)
+        results['client'] = run_client(app, args.iterations, medications, patients, args.trace_memory)
+
+    if not args.skip_load:
+        print('HTTP load test', file=sys.stderr)
+        results['load'] = run_http(env, workdir, args, medications, patients)
+
+    results['peak_rss_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(os.path.join(BACKEND, args.output) if not os.path.isabs(args.output) else args.output, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+
+if __name__ == '__main__':
+    main()
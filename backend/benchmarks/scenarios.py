@@ -0,0 +1,80 @@
+"""One request scenario per route in routes.py, valid against seeded data."""
+import random
+from datetime import datetime, timedelta
+
+
+class Context:
+    """Ids available to scenarios: the seeded ranges plus rows they created"""
+
+    def __init__(self, medications, patients, rng_seed=7):
+        self.medications = medications
+        self.patients = patients
+        self.rng = random.Random(rng_seed)
+        self.created = {'medications': [], 'patients': [], 'dosages': []}
+        self.serial = 0
+
+    def medication_id(self):
+        return self.rng.randint(1, self.medications)
+
+    def patient_id(self):
+        return self.rng.randint(1, self.patients)
+
+    def next_serial(self):
+        self.serial += 1
+        return self.serial
+
+    def dosage_payload(self):
+        when = datetime.utcnow() - timedelta(minutes=self.rng.randrange(60 * 24 * 30))
+        return {
+            'medication_id': self.medication_id(),
+            'patient_id': self.patient_id(),
+            'dosage_amount': 1,
+            'dosage_time': when.strftime('%Y-%m-%d %H:%M:%S'),
+            'administered_by': f'Nurse {self.rng.randrange(50)}'
+        }
+
+
+def _created(ctx, kind):
+    """Pop a row created by an earlier scenario, or None"""
+    return ctx.created[kind].pop() if ctx.created[kind] else None
+
+
+# (name, method, path(ctx), body(ctx) or None, kind of row created by a 201)
+SCENARIOS = [
+    ('list_medications', 'GET', lambda ctx: '/api/medications', None, None),
+    ('list_patients', 'GET', lambda ctx: '/api/patients', None, None),
+    ('search_patients', 'GET', lambda ctx: f'/api/patients/search?q=last{ctx.rng.randrange(1000)}', None, None),
+    ('list_dosages', 'GET', lambda ctx: '/api/dosages', None, None),
+    ('list_dosages_by_patient', 'GET', lambda ctx: f'/api/dosages?patient_id={ctx.patient_id()}', None, None),
+    ('patient_timeline', 'GET', lambda ctx: f'/api/patients/{ctx.patient_id()}/timeline', None, None),
+    ('list_dosages_by_medication', 'GET',
+     lambda ctx: f'/api/dosages?medication_id={ctx.medication_id()}&limit=50', None, None),
+    ('alerts', 'GET', lambda ctx: '/api/alerts', None, None),
+    ('summary', 'GET', lambda ctx: '/api/summary', None, None),
+    ('export_patient_ndjson', 'GET', lambda ctx: f'/api/dosages/export?patient_id={ctx.patient_id()}', None, None),
+    ('add_medication', 'POST', lambda ctx: '/api/medications',
+     lambda ctx: {'name': f'Bench {ctx.next_serial()}', 'current_stock': 10 ** 6, 'threshold': 10},
+     'medications'),
+    ('add_patient', 'POST', lambda ctx: '/api/patients',
+     lambda ctx: {'first_name': 'Bench', 'last_name': f'Patient{ctx.next_serial()}',
+                  'date_of_birth': '1970-01-01', 'medical_record_number': f'BENCH-{ctx.rng.getrandbits(48)}'},
+     'patients'),
+    ('add_dosage', 'POST', lambda ctx: '/api/dosages', lambda ctx: ctx.dosage_payload(), 'dosages'),
+    ('add_dosages_bulk_100', 'POST', lambda ctx: '/api/dosages/bulk',
+     lambda ctx: [ctx.dosage_payload() for _ in range(100)], None),
+    ('batch_mixed_10', 'POST', lambda ctx: '/api/batch',
+     lambda ctx: [{'op': 'create', 'resource': 'dosages', 'data': ctx.dosage_payload()} for _ in range(9)]
+     + [{'op': 'update', 'resource': 'medications', 'id': ctx.medication_id(),
+         'data': {'threshold': ctx.rng.randint(10, 500)}}], None),
+    ('update_medication', 'PUT', lambda ctx: f'/api/medications/{ctx.medication_id()}',
+     lambda ctx: {'threshold': ctx.rng.randint(10, 500)}, None),
+    ('update_patient', 'PUT', lambda ctx: f'/api/patients/{ctx.patient_id()}',
+     lambda ctx: {'last_name': f'Renamed{ctx.next_serial()}'}, None),
+    ('update_dosage', 'PUT', lambda ctx: f'/api/dosages/{ctx.created["dosages"][-1]}',
+     lambda ctx: {'dosage_amount': 2}, None),
+    ('delete_dosage', 'DELETE', lambda ctx: f'/api/dosages/{_created(ctx, "dosages")}', None, None),
+    ('delete_patient', 'DELETE', lambda ctx: f'/api/patients/{_created(ctx, "patients")}', None, None),
+    ('delete_medication', 'DELETE', lambda ctx: f'/api/medications/{_created(ctx, "medications")}', None, None),
+]
+
+READ_SCENARIOS = [s for s in SCENARIOS if s[1] == 'GET']
@@ -0,0 +1,106 @@
+"""Fill a database with synthetic patients, medications and dosages.
+
+    python benchmarks/seed.py --database-url sqlite:////tmp/bench.db --patients 10000 --dosages 5000000
+
+Tables are created if missing and rows are appended with chunked
+executemany inserts, so millions of dosages load in a few minutes.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BATCH = 10000
+NURSES = [f'Nurse {n}' for n in range(50)]
+
+
+def _chunks(rows, size=BATCH):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def seed(patients=1000, medications=100, dosages=100000, days=365, rng_seed=42, progress=None):
+    """Insert synthetic rows; must run inside an app context"""
+    from sqlalchemy import func, insert
+    from extensions import db
+    from models import Medication, Patient, Dosage, StockMovement
+    from inventory import record_consumption
+
+    rng = random.Random(rng_seed)
+    db.create_all()
+    first_patient = (db.session.query(func.max(Patient.id)).scalar() or 0) + 1
+    first_medication = (db.session.query(func.max(Medication.id)).scalar() or 0) + 1
+
+    for chunk in _chunks({
+        'name': f'Medication {first_medication + n}',
+        'description': 'Synthetic benchmark medication',
+        'current_stock': 10 ** 9,
+        'threshold': rng.randint(10, 500)
+    } for n in range(medications)):
+        db.session.execute(insert(Medication), chunk)
+    # Opening balances, so the stock ledger reconciles
+    db.session.execute(insert(StockMovement).from_select(
+        ['medication_id', 'kind', 'quantity', 'created_at'],
+        db.select(Medication.id, db.literal('opening'), Medication.current_stock, db.literal(datetime.utcnow()))
+        .where(Medication.id >= first_medication)))
+
+    for chunk in _chunks({
+        'first_name': f'First{rng.randint(0, 99999)}',
+        'last_name': f'Last{rng.randint(0, 99999)}',
+        'date_of_birth': date(1940, 1, 1) + timedelta(days=rng.randint(0, 30000)),
+        'medical_record_number': f'MRN-{first_patient + n:09d}'
+    } for n in range(patients)):
+        db.session.execute(insert(Patient), chunk)
+    db.session.commit()
+
+    end = datetime.utcnow()
+    span = days * 86400
+    inserted = 0
+    for chunk in _chunks({
+        'medication_id': first_medication + rng.randrange(medications),
+        'patient_id': first_patient + rng.randrange(patients),
+        'dosage_amount': rng.choice((0.5, 1.0, 2.0, 5.0)),
+        'dosage_time': end - timedelta(seconds=rng.randrange(span)),
+        'administered_by': rng.choice(NURSES),
+        'notes': ''
+    } for _ in range(dosages)):
+        db.session.execute(insert(Dosage), chunk)
+        record_consumption((row['medication_id'], row['dosage_time'], row['dosage_amount'], 1)
+                           for row in chunk)
+        db.session.commit()
+        inserted += len(chunk)
+        if progress:
+            progress(inserted)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', required=True)
+    parser.add_argument('--patients', type=int, default=1000)
+    parser.add_argument('--medications', type=int, default=100)
+    parser.add_argument('--dosages', type=int, default=100000)
+    parser.add_argument('--days', type=int, default=365, help='spread dosages over this many days')
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = args.database_url
+    from app import create_app
+
+    started = time.perf_counter()
+    with create_app().app_context():
+        seed(args.patients, args.medications, args.dosages, args.days,
+             progress=lambda n: print(f'\r{n} dosages', end='', file=sys.stderr))
+    print(f'\nseeded in {time.perf_counter() - started:.1f}s', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Benchmark: worker cold start and first-request latency.
+
+Each run starts a fresh interpreter that imports the app, builds it with
+create_app() and serves two GET /api/medications requests through the
+test client. Medians over all runs are printed as JSON. With --gunicorn
+it also boots `gunicorn app:app` and times the first successful HTTP
+response.
+
+    python benchmarks/startup.py --runs 10
+    python benchmarks/startup.py --gunicorn --workers 4
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = '''
+import json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {backend!r})
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+with app.app_context():
+    from extensions import db
+    db.create_all()
+client = app.test_client()
+t0 = time.perf_counter()
+client.get('/api/medications')
+t1 = time.perf_counter()
+client.get('/api/medications')
+t2 = time.perf_counter()
+print(json.dumps({{
+    'import_ms': (imported - started) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_request_ms': (t1 - t0) * 1000,
+    'second_request_ms': (t2 - t1) * 1000,
+}}))
+'''
+
+
+def run_child(env, cwd):
+    started = time.perf_counter()
+    out = subprocess.run([sys.executable, '-c', CHILD.format(backend=BACKEND)],
+                         env=env, cwd=cwd, check=True, capture_output=True, text=True).stdout
+    result = json.loads(out.strip().splitlines()[-1])
+    result['process_ms'] = (time.perf_counter() - started) * 1000
+    return result
+
+
+def time_gunicorn(env, workers, port):
+    started = time.perf_counter()
+    proc = subprocess.Popen(['gunicorn', '-w', str(workers), '-b', f'127.0.0.1:{port}', 'app:app'],
+                            cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            try:
+                request_started = time.perf_counter()
+                urllib.request.urlopen(f'http://127.0.0.1:{port}/api/medications', timeout=30).read()
+                return {
+                    'time_to_first_response_ms': round((time.perf_counter() - started) * 1000, 1),
+                    'first_request_ms': round((time.perf_counter() - request_started) * 1000, 1)
+                }
+            except OSError:
+                time.sleep(0.05)
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--database-url', help='defaults to a temporary SQLite file')
+    parser.add_argument('--gunicorn', action='store_true')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--port', type=int, default=5099)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='startup-')
+    env = dict(os.environ, DATABASE_URL=args.database_url or f'sqlite:///{workdir}/startup.db')
+
+    runs = [run_child(env, workdir) for _ in range(args.runs)]
+    report = {key: round(statistics.median(r[key] for r in runs), 1) for key in runs[0]}
+    report['runs'] = args.runs
+    if args.gunicorn:
+        report['gunicorn'] = time_gunicorn(env, args.workers, args.port)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
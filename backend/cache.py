@@ -0,0 +1,88 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Small thread-safe in-process cache whose entries expire after `ttl` seconds"""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._entries = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get_or_set(self, key, factory):
+        """Return the cached value for `key`, computing it with `factory` on a miss"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                return entry[1]
+            generation = self._generation
+        value = factory()
+        with self._lock:
+            # Don't store a value computed before a concurrent clear()
+            if generation == self._generation:
+                self._entries[key] = (now + self.ttl, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+
+class LRUCache:
+    """Thread-safe in-process mapping of at most `maxsize` entries that
+    evicts the least recently used entry when full"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self):
+        """Changes on every clear(); pass it back to set_many()"""
+        return self._generation
+
+    def get_many(self, keys):
+        """The cached values of those of `keys` present, marked recently used"""
+        found = {}
+        with self._lock:
+            for key in keys:
+                value = self._entries.get(key, self)
+                if value is not self:
+                    self._entries.move_to_end(key)
+                    found[key] = value
+        return found
+
+    def set_many(self, items, generation):
+        """Store `items`, unless clear() ran since `generation` was read"""
+        with self._lock:
+            if generation != self._generation:
+                return
+            for key, value in items.items():
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Dashboard aggregates; each worker keeps its own copy for a few seconds
+summary_cache = TTLCache(ttl=10)
+
+
+def invalidate_summary():
+    """Drop cached dashboard aggregates after a write"""
+    summary_cache.clear()
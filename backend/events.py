@@ -0,0 +1,228 @@
+import json
+import logging
+import queue
+import re
+import select
+import threading
+import time
+from datetime import datetime
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect, text
+from sqlalchemy.orm import Session, scoped_session
+from models import Medication
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+class Broadcaster:
+    """Fans alert events out to the SSE subscribers of this worker, at most
+    `max_subscribers` at a time (0 for no limit)"""
+
+    def __init__(self, max_subscribers=0):
+        self.max_subscribers = max_subscribers
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        """A queue of the events to come, or None when this worker already
+        serves max_subscribers streams"""
+        subscription = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            if self.max_subscribers and len(self._subscribers) >= self.max_subscribers:
+                return None
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def deliver(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.put_nowait(event)
+            except queue.Full:
+                # A stalled client must not hold up everyone else; it will
+                # resync from /api/alerts when it reconnects
+                logger.warning('Dropping alert event for a slow SSE subscriber')
+
+
+class MemoryBackend:
+    """Delivers events to this process only; for tests and single-worker runs"""
+
+    def __init__(self):
+        self._deliver = lambda event: None
+
+    def start(self, deliver):
+        self._deliver = deliver
+
+    def before_commit(self, session, events):
+        pass
+
+    def after_commit(self, events):
+        for e in events:
+            self._deliver(e)
+
+
+class PostgresBackend:
+    """Bridges gunicorn workers with PostgreSQL LISTEN/NOTIFY.
+
+    Notifications are sent inside the writing transaction, so PostgreSQL only
+    delivers them if it commits. Each worker keeps one listening connection
+    and hands what it receives to its local broadcaster.
+    """
+
+    def __init__(self, dsn, channel='stock_alerts'):
+        # libpq wants a plain postgresql:// URL, without the SQLAlchemy driver suffix
+        self.dsn = re.sub(r'^postgres(ql)?(\+\w+)?://', 'postgresql://', dsn)
+        self.channel = channel
+        self._started = False
+        self._lock = threading.Lock()
+
+    def start(self, deliver):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        thread = threading.Thread(target=self._listen, args=(deliver,), daemon=True)
+        thread.start()
+
+    def before_commit(self, session, events):
+        for e in events:
+            session.execute(text('SELECT pg_notify(:channel, :payload)'),
+                            {'channel': self.channel, 'payload': json.dumps(e)})
+
+    def after_commit(self, events):
+        pass
+
+    def _listen(self, deliver):
+        import psycopg2
+        import psycopg2.extensions
+
+        while True:
+            try:
+                conn = psycopg2.connect(self.dsn)
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cur:
+                    cur.execute(f'LISTEN {self.channel}')
+                while True:
+                    if select.select([conn], [], [], 30) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        deliver(json.loads(conn.notifies.pop(0).payload))
+            except Exception:
+                logger.exception('Alert listener connection lost, reconnecting')
+                time.sleep(5)
+
+
+class AlertEvents:
+    """Collects low-stock transitions per transaction and publishes them on commit"""
+
+    def __init__(self, backend, max_streams=0):
+        self.backend = backend
+        self.broadcaster = Broadcaster(max_streams)
+
+    def subscribe(self):
+        # Listener threads are started lazily, after gunicorn has forked
+        self.backend.start(self.broadcaster.deliver)
+        return self.broadcaster.subscribe()
+
+    def unsubscribe(self, subscription):
+        self.broadcaster.unsubscribe(subscription)
+
+
+def alert_event(medication_id, name, low_stock, current_stock, threshold, at):
+    """Build the payload pushed to clients when an alert is raised or cleared"""
+    return {
+        'type': 'raised' if low_stock else 'cleared',
+        'medication_id': medication_id,
+        'name': name,
+        'current_stock': current_stock,
+        'threshold': threshold,
+        'low_stock': bool(low_stock),
+        'at': at.isoformat() if isinstance(at, datetime) else at
+    }
+
+
+def queue_alert(session, payload):
+    """Publish `payload` once the current transaction commits; under a
+    SAVEPOINT, only if the savepoint is released and the outer transaction
+    commits too"""
+    if isinstance(session, scoped_session):
+        session = session()
+    transaction = session.get_nested_transaction() or session.get_transaction()
+    session.info.setdefault('alert_events', {}).setdefault(transaction, []).append(payload)
+
+
+def init_app(app):
+    """Attach the alert event pipeline configured by ALERTS_BACKEND"""
+    if app.config.get('ALERTS_BACKEND') == 'postgres':
+        backend = PostgresBackend(app.config['SQLALCHEMY_DATABASE_URI'])
+    else:
+        backend = MemoryBackend()
+    app.extensions['alert_events'] = AlertEvents(backend, app.config['SSE_MAX_CONNECTIONS'])
+    return app.extensions['alert_events']
+
+
+def current_alerts():
+    """The alert pipeline of the active app, if any"""
+    if has_app_context():
+        return current_app.extensions.get('alert_events')
+    return None
+
+
+@event.listens_for(Session, 'after_flush')
+def collect_orm_transitions(session, flush_context):
+    # Medication creates and edits flip the flag through sync_low_stock
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Medication) and inspect(obj).attrs.low_stock.history.has_changes():
+            if obj.low_stock or obj not in session.new:
+                queue_alert(session, alert_event(
+                    obj.id, obj.name, obj.low_stock, obj.current_stock,
+                    obj.threshold, obj.low_stock_changed_at))
+
+
+# Events are queued per transaction, SAVEPOINTs included (the commit and
+# rollback events fire for those too). A released savepoint hands its events
+# to the enclosing transaction, a rolled back one drops them, and only the
+# outermost commit sends them.
+
+@event.listens_for(Session, 'before_commit')
+def notify(session):
+    if session.in_nested_transaction():
+        return
+    alerts = current_alerts()
+    if alerts is None:
+        return
+    session.flush()
+    events = session.info.get('alert_events', {}).get(session.get_transaction())
+    if events:
+        alerts.backend.before_commit(session, events)
+
+
+@event.listens_for(Session, 'after_commit')
+def publish(session):
+    if session.in_nested_transaction():
+        savepoint = session.get_nested_transaction()
+        queued = session.info.get('alert_events', {})
+        events = queued.pop(savepoint, None)
+        if events:
+            queued.setdefault(savepoint.parent, []).extend(events)
+        return
+    events = session.info.pop('alert_events', {}).get(session.get_transaction())
+    alerts = current_alerts()
+    if events and alerts is not None:
+        alerts.backend.after_commit(events)
+
+
+@event.listens_for(Session, 'after_rollback')
+def discard(session):
+    if session.in_nested_transaction():
+        session.info.get('alert_events', {}).pop(session.get_nested_transaction(), None)
+        return
+    session.info.pop('alert_events', None)
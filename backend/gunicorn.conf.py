@@ -0,0 +1,62 @@
+"""Gunicorn settings, read from the environment.
+
+The default `gthread` worker serves GUNICORN_THREADS requests per process,
+so a request waiting on PostgreSQL no longer holds the whole worker (and
+an open /api/alerts/stream only holds one thread). `gevent` serves up to
+GUNICORN_WORKER_CONNECTIONS requests per process on greenlets; it needs
+`pip install gevent psycogreen`. `sync` is the old one-request-per-process
+mode.
+
+Each open /api/alerts/stream holds a gthread thread for as long as the
+dashboard stays open, so gthread workers accept at most SSE_MAX_CONNECTIONS
+streams each (default a quarter of GUNICORN_THREADS, so 4 of 16) and answer
+more with 503. The rest of the threads stay free for requests. Clients that
+are turned away poll /api/alerts and try again later. With many dashboards,
+use `gevent`, where a stream only holds a greenlet and there is no cap by
+default.
+
+Flask-SQLAlchemy scopes sessions to the app context, so every thread or
+greenlet gets its own session; the pool just has to be large enough that
+they do not queue for a connection (DB_POOL_SIZE below). Keep
+workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW) under PostgreSQL's
+max_connections.
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.environ.get('WEB_CONCURRENCY', min(multiprocessing.cpu_count() * 2, 8)))
+threads = int(os.environ.get('GUNICORN_THREADS', 16))
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 500))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+# Recycle workers now and then so a slow leak cannot grow without bound
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 10000))
+max_requests_jitter = max_requests // 10
+
+# One pooled connection per concurrent request: a thread per connection for
+# gthread, a bounded share of the greenlets for gevent (the rest wait up to
+# DB_POOL_TIMEOUT for a connection instead of overwhelming the database).
+# Workers build the app after fork, so they see these defaults.
+# The same sizing applies to each read replica pool (DB_REPLICA_*).
+for prefix in ('DB_', 'DB_REPLICA_'):
+    if worker_class == 'gthread':
+        os.environ.setdefault(f'{prefix}POOL_SIZE', str(threads))
+        os.environ.setdefault(f'{prefix}MAX_OVERFLOW', '0')
+    elif worker_class == 'gevent':
+        os.environ.setdefault(f'{prefix}POOL_SIZE', '20')
+        os.environ.setdefault(f'{prefix}MAX_OVERFLOW', '10')
+
+# Keep three quarters of the threads for requests however many dashboards
+# are open (see above)
+if worker_class == 'gthread':
+    os.environ.setdefault('SSE_MAX_CONNECTIONS', str(max(1, threads // 4)))
+
+
+def post_fork(server, worker):
+    if worker_class == 'gevent':
+        # psycopg2 blocks in C; make it yield to other greenlets while it
+        # waits on the socket
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
@@ -0,0 +1,216 @@
+import functools
+import hashlib
+import random
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timedelta
+from flask import Response, current_app, jsonify, request
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from extensions import db
+from instrumentation import IDEMPOTENT_REQUESTS
+from models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+# A claim whose request has not finished after this long is assumed dead
+# (the worker crashed or was killed) and can be taken over by a retry
+CLAIM_TIMEOUT = timedelta(seconds=60)
+# How often a duplicate polls the database for the original's response
+POLL_SECONDS = 0.05
+# Fraction of claims that also purge expired keys from the database
+PURGE_RATE = 0.01
+PURGE_BATCH = 1000
+
+# status_code is None while the first request is still running
+StoredResponse = namedtuple('StoredResponse', 'fingerprint status_code body content_type')
+
+
+class MemoryStore:
+    """Responses kept in this process; for tests and single-worker runs.
+
+    An LRU of at most `max_keys` keys, each expiring `ttl` seconds after it
+    was claimed.
+    """
+
+    def __init__(self, ttl, max_keys):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        # key -> (StoredResponse, claimed at)
+        self._records = OrderedDict()
+        self._changed = threading.Condition()
+
+    def claim(self, key, fingerprint):
+        """None if this request now owns `key`, else what is stored for it"""
+        now = time.monotonic()
+        with self._changed:
+            entry = self._records.get(key)
+            if entry is not None:
+                record, claimed_at = entry
+                expired = now - claimed_at > (self.ttl if record.status_code is not None
+                                              else CLAIM_TIMEOUT.total_seconds())
+                if not expired:
+                    self._records.move_to_end(key)
+                    return record
+            self._records[key] = (StoredResponse(fingerprint, None, None, None), now)
+            self._records.move_to_end(key)
+            while len(self._records) > self.max_keys:
+                self._records.popitem(last=False)
+            return None
+
+    def complete(self, key, status_code, body, content_type):
+        with self._changed:
+            entry = self._records.get(key)
+            if entry is not None:
+                self._records[key] = (entry[0]._replace(
+                    status_code=status_code, body=body, content_type=content_type), entry[1])
+            self._changed.notify_all()
+
+    def release(self, key):
+        with self._changed:
+            self._records.pop(key, None)
+            self._changed.notify_all()
+
+    def wait(self, key, timeout):
+        with self._changed:
+            self._changed.wait(timeout)
+
+
+class DatabaseStore:
+    """Responses kept in the idempotency_keys table, shared by every worker.
+
+    Claims are an INSERT .. ON CONFLICT DO NOTHING in their own transaction,
+    so of concurrent duplicates exactly one inserts the row and runs.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = timedelta(seconds=ttl)
+
+    def claim(self, key, fingerprint):
+        table = IdempotencyKey.__table__
+        while True:
+            now = datetime.utcnow()
+            with db.engine.begin() as conn:
+                insert = {'postgresql': postgresql, 'sqlite': sqlite}[conn.dialect.name].insert
+                if random.random() < PURGE_RATE:
+                    self.purge(conn, now)
+                claimed = conn.execute(insert(table).values(
+                    key=key, fingerprint=fingerprint, created_at=now
+                ).on_conflict_do_nothing(index_elements=[table.c.key])).rowcount
+                if not claimed:
+                    # Reuse the key of an expired response or an abandoned claim
+                    claimed = conn.execute(update(table).where(table.c.key == key, or_(
+                        table.c.created_at < now - self.ttl,
+                        and_(table.c.status_code.is_(None), table.c.created_at < now - CLAIM_TIMEOUT),
+                    )).values(fingerprint=fingerprint, status_code=None, body=None,
+                              content_type=None, created_at=now)).rowcount
+                if claimed:
+                    return None
+                row = conn.execute(select(
+                    table.c.fingerprint, table.c.status_code, table.c.body, table.c.content_type
+                ).where(table.c.key == key)).one_or_none()
+            if row is not None:
+                return StoredResponse(*row)
+            # Released between the INSERT and the SELECT; try again
+
+    def purge(self, conn, now):
+        table = IdempotencyKey.__table__
+        expired = select(table.c.key).where(table.c.created_at < now - self.ttl).limit(PURGE_BATCH)
+        conn.execute(delete(table).where(table.c.key.in_(expired.scalar_subquery())))
+
+    def complete(self, key, status_code, body, content_type):
+        table = IdempotencyKey.__table__
+        with db.engine.begin() as conn:
+            conn.execute(update(table).where(table.c.key == key).values(
+                status_code=status_code, body=body, content_type=content_type))
+
+    def release(self, key):
+        table = IdempotencyKey.__table__
+        with db.engine.begin() as conn:
+            conn.execute(delete(table).where(table.c.key == key, table.c.status_code.is_(None)))
+
+    def wait(self, key, timeout):
+        time.sleep(min(timeout, POLL_SECONDS))
+
+
+def _digest(*parts):
+    sha = hashlib.sha256()
+    for part in parts:
+        sha.update(part if isinstance(part, bytes) else part.encode())
+        sha.update(b'\0')
+    return sha.hexdigest()
+
+
+def _replay(record):
+    response = Response(record.body, status=record.status_code, content_type=record.content_type)
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view):
+    """Run `view` at most once per Idempotency-Key.
+
+    The first request with a key runs and its response (anything below 500)
+    is stored; a retry with the same key, method, path and body gets that
+    response back without touching the tables. A duplicate that arrives
+    while the first is still running waits up to IDEMPOTENCY_WAIT seconds
+    for it, then gets 409. Reusing a key for a different request is a 422.
+    Requests without the header run as before.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return view(*args, **kwargs)
+        if not key.strip() or len(key) > MAX_KEY_LENGTH:
+            return jsonify({'error': f'{HEADER} must be 1-{MAX_KEY_LENGTH} characters'}), 400
+
+        store = current_app.extensions['idempotency']
+        key = _digest(request.method, request.path, key)
+        fingerprint = _digest(request.get_data())
+        deadline = time.monotonic() + current_app.config['IDEMPOTENCY_WAIT']
+        while True:
+            record = store.claim(key, fingerprint)
+            if record is None:
+                break
+            if record.fingerprint != fingerprint:
+                IDEMPOTENT_REQUESTS.inc((('outcome', 'mismatch'),))
+                return jsonify({'error': f'{HEADER} was already used for a different request'}), 422
+            if record.status_code is not None:
+                IDEMPOTENT_REQUESTS.inc((('outcome', 'replayed'),))
+                return _replay(record)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                IDEMPOTENT_REQUESTS.inc((('outcome', 'in_progress'),))
+                response = jsonify({'error': 'A request with this Idempotency-Key is still in progress'})
+                response.headers['Retry-After'] = '1'
+                return response, 409
+            store.wait(key, remaining)
+
+        try:
+            response = current_app.make_response(view(*args, **kwargs))
+        except BaseException:
+            store.release(key)
+            raise
+        if response.status_code >= 500:
+            # Nothing was written; let a retry run again
+            store.release(key)
+        else:
+            store.complete(key, response.status_code, response.get_data(), response.content_type)
+        IDEMPOTENT_REQUESTS.inc((('outcome', 'executed'),))
+        return response
+    return wrapper
+
+
+def init_app(app):
+    """Attach the response store configured by IDEMPOTENCY_BACKEND"""
+    app.config.setdefault('IDEMPOTENCY_TTL', 86400)
+    app.config.setdefault('IDEMPOTENCY_MAX_KEYS', 10000)
+    app.config.setdefault('IDEMPOTENCY_WAIT', 10.0)
+    if app.config.get('IDEMPOTENCY_BACKEND') == 'database':
+        store = DatabaseStore(app.config['IDEMPOTENCY_TTL'])
+    else:
+        store = MemoryStore(app.config['IDEMPOTENCY_TTL'], app.config['IDEMPOTENCY_MAX_KEYS'])
+    app.extensions['idempotency'] = store
+    return store
@@ -0,0 +1,234 @@
+import csv
+import io
+import json
+import sys
+from datetime import date, datetime
+import click
+from sqlalchemy import update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
+from events import alert_event, queue_alert
+from extensions import db
+from inventory import record_movements
+from models import Medication, Patient
+from versions import touch
+
+# Rows validated, upserted and committed together
+IMPORT_BATCH = 5000
+# Rejected rows listed in a report; the rest are only counted
+MAX_REPORTED_ERRORS = 1000
+FORMATS = ('csv', 'ndjson')
+
+
+def read_rows(stream, fmt):
+    """Yield dicts from a binary CSV (with a header row) or NDJSON stream"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        yield from csv.DictReader(text)
+    else:
+        for line in text:
+            line = line.strip()
+            if line:
+                try:
+                    yield json.loads(line)
+                except ValueError as e:
+                    # Reported against its row like any other invalid record
+                    yield e
+
+
+def _text(record, field, length, required=True):
+    value = record.get(field)
+    value = value.strip() if isinstance(value, str) else value
+    if not value:
+        if required:
+            raise KeyError(field)
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f'{field} must be a string')
+    if length and len(value) > length:
+        raise ValueError(f'{field} is longer than {length} characters')
+    return value
+
+
+def parse_patient(record):
+    """Validate an imported patient; raises KeyError/ValueError/TypeError"""
+    return {
+        'first_name': _text(record, 'first_name', 50),
+        'last_name': _text(record, 'last_name', 50),
+        'date_of_birth': date.fromisoformat(_text(record, 'date_of_birth', None)),
+        'medical_record_number': _text(record, 'medical_record_number', 50),
+    }
+
+
+def parse_medication(record):
+    """Validate an imported medication; `id`, when given, updates that medication"""
+    fields = {
+        'name': _text(record, 'name', 100),
+        'description': _text(record, 'description', None, required=False),
+        'current_stock': int(record['current_stock']),
+        'threshold': int(record['threshold']),
+    }
+    if record.get('id') not in (None, ''):
+        fields['id'] = int(record['id'])
+    return fields
+
+
+def _insert():
+    return {'postgresql': postgresql, 'sqlite': sqlite}[db.session.get_bind().dialect.name].insert
+
+
+def upsert_patients(rows):
+    """INSERT ... ON CONFLICT (medical_record_number) DO UPDATE"""
+    # Against the table rather than the mapper: a plain executemany (batched
+    # into multi-row VALUES on PostgreSQL) without ORM bulk bookkeeping
+    statement = _insert()(Patient.__table__)
+    db.session.execute(statement.on_conflict_do_update(
+        index_elements=[Patient.__table__.c.medical_record_number],
+        set_={column: statement.excluded[column] for column in ('first_name', 'last_name', 'date_of_birth')}
+    ), [fields for _, fields in rows])
+    return []
+
+
+def upsert_medications(rows):
+    """Insert new medications and update those given by id, keeping the
+    low_stock flag (and the time it last flipped) in step with the stock,
+    recording every stock change in the ledger and publishing the alerts
+    raised or cleared once the batch commits"""
+    now = datetime.utcnow()
+    # FOR UPDATE: the ledger records the difference from the stock read here
+    known = {row.id: row for row in db.session.query(
+        Medication.id, Medication.current_stock, Medication.low_stock, Medication.low_stock_changed_at
+    ).filter(Medication.id.in_([fields['id'] for _, fields in rows if 'id' in fields])).with_for_update()}
+    new, existing, rejected, movements = [], [], [], []
+    for row_number, fields in rows:
+        low = fields['current_stock'] < fields['threshold']
+        if 'id' not in fields:
+            new.append(dict(fields, low_stock=low, low_stock_changed_at=now if low else None))
+        elif fields['id'] not in known:
+            rejected.append((row_number, f"Unknown medication id {fields['id']}"))
+        else:
+            current = known[fields['id']]
+            existing.append(dict(fields, low_stock=low, low_stock_changed_at=(
+                now if low != current.low_stock else current.low_stock_changed_at)))
+            if low != current.low_stock:
+                queue_alert(db.session, alert_event(
+                    current.id, fields['name'], low, fields['current_stock'], fields['threshold'], now))
+            if fields['current_stock'] != current.current_stock:
+                movements.append((current.id, fields['current_stock'] - current.current_stock,
+                                  'correction', None, 'import'))
+    if new:
+        created = db.session.execute(_insert()(Medication).returning(
+            Medication.id, Medication.name, Medication.low_stock, Medication.current_stock,
+            Medication.threshold, Medication.low_stock_changed_at), new).all()
+        movements.extend((row.id, row.current_stock, 'opening', None, 'import') for row in created)
+        # Like a created medication, a new one only raises an alert
+        for row in created:
+            if row.low_stock:
+                queue_alert(db.session, alert_event(*row))
+    if existing:
+        # ORM bulk UPDATE by primary key, one executemany
+        db.session.execute(update(Medication), existing)
+    record_movements(movements)
+    return rejected
+
+
+# kind -> (parse, upsert, natural key, tables bumped)
+IMPORTERS = {
+    'patients': (parse_patient, upsert_patients, 'medical_record_number', ('patients', 'patient_refs')),
+    'medications': (parse_medication, upsert_medications, 'id', ('medications', 'medication_refs')),
+}
+
+
+def describe_error(error):
+    """Message for a record validation error, worded like the single-record routes"""
+    if isinstance(error, KeyError):
+        return f'Missing required field: {str(error)}'
+    return f'Invalid data format: {str(error)}'
+
+
+def import_rows(kind, rows, batch=IMPORT_BATCH, progress=None):
+    """Validate and upsert `rows` IMPORT_BATCH at a time, committing each batch.
+
+    Invalid rows are skipped and reported by their 1-based position; a
+    batch that fails in the database is rolled back and reported as a
+    whole, and the import carries on. Returns the import report.
+    """
+    parse, upsert, key, tables = IMPORTERS[kind]
+    report = {'processed': 0, 'imported': 0, 'rejected': 0, 'errors': []}
+
+    def reject(row_number, message):
+        report['rejected'] += 1
+        if len(report['errors']) < MAX_REPORTED_ERRORS:
+            report['errors'].append({'row': row_number, 'error': message})
+
+    def flush(valid):
+        # A key repeated within one statement cannot be upserted twice; the
+        # last occurrence wins, as it would row by row
+        unique = list({item[1].get(key, id(item)): item for item in valid}.values())
+        try:
+            rejected = upsert(unique)
+            touch(*tables)
+            db.session.commit()
+            report['imported'] += len(valid) - len(rejected)
+            for row_number, message in rejected:
+                reject(row_number, message)
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            reject(valid[0][0], f'Rows {valid[0][0]}-{valid[-1][0]} not imported: {e.__class__.__name__}')
+            report['rejected'] += len(valid) - 1
+        if progress:
+            progress(report)
+
+    valid = []
+    for row_number, record in enumerate(rows, 1):
+        report['processed'] += 1
+        try:
+            if isinstance(record, ValueError):
+                raise record
+            if not isinstance(record, dict):
+                raise ValueError('expected an object')
+            valid.append((row_number, parse(record)))
+        except (KeyError, ValueError, TypeError) as e:
+            reject(row_number, describe_error(e))
+        if len(valid) == batch:
+            flush(valid)
+            valid = []
+    if valid:
+        flush(valid)
+    return report
+
+
+def init_app(app):
+    """Register `flask import patients|medications FILE`"""
+
+    @app.cli.group('import')
+    def import_group():
+        """Import patients or medications from CSV or NDJSON."""
+
+    def make_command(kind):
+        @import_group.command(kind)
+        @click.argument('path', type=click.Path(exists=True, dir_okay=False, allow_dash=True))
+        @click.option('--format', 'fmt', type=click.Choice(FORMATS),
+                      help='Defaults to the file extension (.csv, otherwise NDJSON)')
+        @click.option('--batch', type=int, default=IMPORT_BATCH, show_default=True)
+        def command(path, fmt, batch):
+            fmt = fmt or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+            started = datetime.utcnow()
+
+            def progress(report):
+                rate = report['processed'] / max((datetime.utcnow() - started).total_seconds(), 1e-6)
+                click.echo(f"\r{report['processed']} rows, {report['imported']} imported, "
+                           f"{report['rejected']} rejected ({rate:.0f} rows/s)", nl=False, err=True)
+
+            with (sys.stdin.buffer if path == '-' else open(path, 'rb')) as stream:
+                report = import_rows(kind, read_rows(stream, fmt), batch, progress)
+            click.echo(err=True)
+            for error in report['errors']:
+                click.echo(f"row {error['row']}: {error['error']}", err=True)
+            click.echo(json.dumps({k: v for k, v in report.items() if k != 'errors'}))
+
+        command.__doc__ = f'Upsert {kind} from a CSV or NDJSON file (- for stdin).'
+        return command
+
+    for kind in IMPORTERS:
+        make_command(kind)
@@ -0,0 +1,183 @@
+import cProfile
+import io
+import pstats
+import random
+import threading
+import time
+from contextlib import contextmanager
+from flask import Response, current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _labels(labels):
+    return ','.join(f'{key}="{value}"' for key, value in labels)
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram with one series per label set"""
+
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.setdefault(labels, {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0})
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['buckets'][i] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                text = _labels(labels)
+                for bound, count in zip(self.buckets, series['buckets']):
+                    lines.append(f'{self.name}_bucket{{{text},le="{bound}"}} {count}')
+                lines.append(f'{self.name}_bucket{{{text},le="+Inf"}} {series["count"]}')
+                lines.append(f'{self.name}_sum{{{text}}} {series["sum"]:.6f}')
+                lines.append(f'{self.name}_count{{{text}}} {series["count"]}')
+        return lines
+
+
+class Counter:
+    """Prometheus-style monotonically increasing counter"""
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                text = _labels(labels)
+                lines.append(f'{self.name}{{{text}}} {value}' if text else f'{self.name} {value}')
+        return lines
+
+
+# Per-worker metrics; Prometheus scrapes and sums each worker separately
+REQUEST_SECONDS = Histogram('http_request_duration_seconds', 'Request handling time by route')
+SQL_SECONDS = Histogram('http_request_sql_duration_seconds', 'SQL time per request by route')
+SQL_STATEMENTS = Counter('sql_statements_total', 'SQL statements executed by route')
+SERIALIZE_SECONDS = Counter('serialization_seconds_total', 'Time spent serializing rows by route')
+REQUESTS = Counter('http_requests_total', 'Requests by route, method and status')
+IDEMPOTENT_REQUESTS = Counter('idempotent_requests_total', 'Requests with an Idempotency-Key by outcome')
+REFERENCE_CACHE_LOOKUPS = Counter('reference_cache_lookups_total', 'Reference cache lookups by table and result')
+METRICS = [REQUEST_SECONDS, SQL_SECONDS, SQL_STATEMENTS, SERIALIZE_SECONDS, REQUESTS, IDEMPOTENT_REQUESTS,
+           REFERENCE_CACHE_LOOKUPS]
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _start_statement(conn, cursor, statement, parameters, context, executemany):
+    conn.info['statement_started'] = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _end_statement(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info.pop('statement_started', time.perf_counter())
+    if has_request_context() and 'sql_count' in g:
+        g.sql_count += 1
+        g.sql_seconds += elapsed
+
+
+@contextmanager
+def serialization_timer():
+    """Attribute the enclosed block (a to_dict loop) to serialization time"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if has_request_context() and 'serialize_seconds' in g:
+            g.serialize_seconds += time.perf_counter() - started
+
+
+def _route_labels():
+    rule = request.url_rule.rule if request.url_rule else 'unmatched'
+    return (('route', rule), ('method', request.method))
+
+
+def _start_request():
+    g.request_started = time.perf_counter()
+    g.sql_count = 0
+    g.sql_seconds = 0.0
+    g.serialize_seconds = 0.0
+    g.profiler = None
+    rate = current_app.config['PROFILE_SAMPLE_RATE']
+    if rate and random.random() < rate:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            g.profiler = profiler
+        except ValueError:
+            # Another thread's request is already being profiled
+            pass
+
+
+def _finish_request(response):
+    if 'request_started' not in g:
+        return response
+    elapsed = time.perf_counter() - g.request_started
+    labels = _route_labels()
+    REQUEST_SECONDS.observe(labels, elapsed)
+    SQL_SECONDS.observe(labels, g.sql_seconds)
+    SQL_STATEMENTS.inc(labels, g.sql_count)
+    SERIALIZE_SECONDS.inc(labels, g.serialize_seconds)
+    REQUESTS.inc(labels + (('status', response.status_code),))
+
+    response.headers['Server-Timing'] = ', '.join([
+        f'app;dur={elapsed * 1000:.1f}',
+        f'db;dur={g.sql_seconds * 1000:.1f};desc="{g.sql_count} queries"',
+        f'serialize;dur={g.serialize_seconds * 1000:.1f}',
+    ])
+
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.disable()
+        if elapsed * 1000 >= current_app.config['PROFILE_SLOW_MS']:
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(25)
+            current_app.logger.warning('Slow request %s %s took %.0f ms (%d SQL statements)\n%s',
+                                       request.method, request.full_path, elapsed * 1000,
+                                       g.sql_count, out.getvalue())
+    return response
+
+
+def _stop_profiler(error):
+    # after_request is skipped when a view raises
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.disable()
+
+
+def metrics():
+    """Prometheus text exposition of this worker's metrics"""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.expose())
+    return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
+
+def init_app(app):
+    """Time every request and expose the results as Server-Timing and /metrics"""
+    app.config.setdefault('PROFILE_SAMPLE_RATE', 0.0)
+    app.config.setdefault('PROFILE_SLOW_MS', 500)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_stop_profiler)
+    app.add_url_rule('/metrics', 'metrics', metrics)
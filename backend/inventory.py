@@ -0,0 +1,167 @@
+import random
+import time
+from collections import defaultdict
+from datetime import date, datetime
+from sqlalchemy import Date, case, cast, func, insert, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import DBAPIError
+from extensions import db
+from models import Medication, Dosage, DailyConsumption, StockMovement
+from events import alert_event, queue_alert
+
+# PostgreSQL serialization_failure and deadlock_detected
+RETRYABLE_PGCODES = {'40001', '40P01'}
+MAX_ATTEMPTS = 5
+
+
+class StaleRowError(Exception):
+    """A row changed between being read and being written"""
+
+
+def record_movements(movements):
+    """Append (medication_id, quantity, kind, dosage_id, note) tuples to the stock ledger"""
+    now = datetime.utcnow()
+    rows = [{'medication_id': medication_id, 'quantity': quantity, 'kind': kind,
+             'dosage_id': dosage_id, 'note': note, 'created_at': now}
+            for medication_id, quantity, kind, dosage_id, note in movements]
+    if rows:
+        db.session.execute(insert(StockMovement), rows)
+
+
+def adjust_stock(medication_id, delta, kind='dose', dosage_id=None, note=None, expected=None):
+    """Add `delta` to a medication's stock with a single SQL-side UPDATE.
+
+    The arithmetic happens in the database (`current_stock = current_stock + :delta`)
+    under the row lock the UPDATE takes, so concurrent workers never overwrite
+    each other's changes the way a Python read-modify-write would. The same
+    statement keeps the materialized low_stock flag in step with the new stock,
+    and the change is appended to the stock ledger as a `kind` movement.
+    With `expected`, the stock must still be that value or StaleRowError is raised.
+    """
+    now = datetime.utcnow()
+    new_stock = Medication.current_stock + delta
+    now_low = new_stock < Medication.threshold
+    stmt = update(Medication) \
+        .where(Medication.id == medication_id) \
+        .values(
+            current_stock=new_stock,
+            low_stock=now_low,
+            low_stock_changed_at=case(
+                (now_low != Medication.low_stock, now),
+                else_=Medication.low_stock_changed_at
+            )
+        ) \
+        .execution_options(synchronize_session=False)
+    if expected is not None:
+        stmt = stmt.where(Medication.current_stock == expected)
+    columns = (Medication.id, Medication.name, Medication.low_stock,
+               Medication.current_stock, Medication.threshold, Medication.low_stock_changed_at)
+
+    if db.session.get_bind().dialect.update_returning:
+        row = db.session.execute(stmt.returning(*columns)).first()
+    else:
+        updated = db.session.execute(stmt).rowcount
+        row = db.session.query(*columns).filter(Medication.id == medication_id).first() if updated else None
+
+    if row is None:
+        if expected is not None:
+            raise StaleRowError(f'Stock of medication {medication_id} changed concurrently')
+        return
+    record_movements([(medication_id, delta, kind, dosage_id, note)])
+    # The flag flipped in this statement iff it was stamped with our `now`
+    if row.low_stock_changed_at == now:
+        queue_alert(db.session, alert_event(*row))
+
+
+def set_stock(medication_id, stock, kind='correction', note=None):
+    """Set a medication's stock to a counted value, recording the difference
+    in the ledger; the caller retries StaleRowError with run_in_transaction"""
+    current = db.session.query(Medication.current_stock) \
+        .filter(Medication.id == medication_id).with_for_update().scalar()
+    if current is not None and current != stock:
+        adjust_stock(medication_id, stock - current, kind, note=note, expected=current)
+
+
+def consumption_totals(doses):
+    """Sum (medication_id, dosage_time, amount, count) tuples per medication and day"""
+    totals = defaultdict(lambda: [0.0, 0])
+    for medication_id, dosage_time, amount, count in doses:
+        key = (medication_id, dosage_time.date() if isinstance(dosage_time, datetime) else dosage_time)
+        totals[key][0] += amount
+        totals[key][1] += count
+    return totals
+
+
+def record_consumption(doses):
+    """Apply dosage changes to the daily consumption rollup.
+
+    `doses` holds (medication_id, dosage_time, amount, count) tuples; removals
+    pass a negative amount and count. All (medication, day) totals go in one
+    executemany of `INSERT .. ON CONFLICT DO UPDATE` adding to the stored
+    totals in SQL, so concurrent writers combine like adjust_stock. Keys are
+    sent in sorted order so two transactions never lock the same rows in
+    opposite orders.
+    """
+    # Zero totals: an update that moved nothing between days or medications
+    rows = [{'medication_id': medication_id, 'day': day, 'total_amount': amount, 'dose_count': count}
+            for (medication_id, day), (amount, count) in sorted(consumption_totals(doses).items())
+            if amount or count]
+    if not rows:
+        return
+    dialect = {'postgresql': postgresql, 'sqlite': sqlite}[db.session.get_bind().dialect.name]
+    table = DailyConsumption.__table__
+    stmt = dialect.insert(table)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c.medication_id, table.c.day],
+        set_={
+            'total_amount': table.c.total_amount + stmt.excluded.total_amount,
+            'dose_count': table.c.dose_count + stmt.excluded.dose_count,
+        }
+    ), rows)
+
+
+def remove_consumption(*criteria):
+    """Take the dosages matching `criteria` out of the rollup before a bulk
+    delete, summed per medication and day in SQL rather than loaded"""
+    if db.session.get_bind().dialect.name == 'sqlite':
+        day = func.date(Dosage.dosage_time)
+    else:
+        day = cast(Dosage.dosage_time, Date)
+    rows = db.session.query(Dosage.medication_id, day, func.sum(Dosage.dosage_amount), func.count()) \
+        .filter(*criteria).group_by(Dosage.medication_id, day)
+    record_consumption((medication_id, date.fromisoformat(day) if isinstance(day, str) else day, -amount, -count)
+                       for medication_id, day, amount, count in rows)
+
+
+def begin_write():
+    """Open the session's transaction for writing before its first statement.
+
+    pysqlite only opens a transaction in front of the first INSERT, UPDATE
+    or DELETE, so a SAVEPOINT issued earlier would start (and on release,
+    commit) a transaction of its own. On SQLite this takes the write lock
+    with BEGIN IMMEDIATE up front; other databases need nothing.
+    """
+    connection = db.session.connection()
+    if connection.dialect.name == 'sqlite' and not connection.connection.dbapi_connection.in_transaction:
+        connection.exec_driver_sql('BEGIN IMMEDIATE')
+
+
+def is_retryable(error):
+    """True for lock and serialization conflicts that are safe to retry"""
+    orig = getattr(error, 'orig', None)
+    if getattr(orig, 'pgcode', None) in RETRYABLE_PGCODES:
+        return True
+    return 'database is locked' in str(orig)
+
+
+def run_in_transaction(work, attempts=MAX_ATTEMPTS):
+    """Run `work()` (which commits) and retry it on transient conflicts"""
+    for attempt in range(1, attempts + 1):
+        try:
+            return work()
+        except (DBAPIError, StaleRowError) as e:
+            db.session.rollback()
+            if attempt == attempts or not (isinstance(e, StaleRowError) or is_retryable(e)):
+                raise
+            # Jittered backoff so retrying workers don't collide again
+            time.sleep(random.uniform(0, 0.01 * 2 ** attempt))
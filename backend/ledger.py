@@ -0,0 +1,106 @@
+import time
+from datetime import datetime, timedelta
+import click
+from sqlalchemy import and_, func, insert, or_, select
+from extensions import db
+from inventory import record_movements
+from models import Medication, StockMovement, StockSnapshot
+
+# Snapshots only cover movements at least this old, so a transaction still
+# in flight when the snapshot is taken cannot commit a movement behind it
+SNAPSHOT_LAG = timedelta(minutes=5)
+
+
+def balance_at(medication_id, at):
+    """Ledger stock of a medication at `at`: the latest snapshot taken by
+    then plus the movements after it. None if the ledger starts after `at`."""
+    snapshot = db.session.query(StockSnapshot.taken_at, StockSnapshot.balance) \
+        .filter(StockSnapshot.medication_id == medication_id, StockSnapshot.taken_at <= at) \
+        .order_by(StockSnapshot.taken_at.desc()).first()
+    movements = db.session.query(func.sum(StockMovement.quantity), func.count()) \
+        .filter(StockMovement.medication_id == medication_id, StockMovement.created_at <= at)
+    if snapshot is not None:
+        movements = movements.filter(StockMovement.created_at > snapshot.taken_at)
+    total, count = movements.one()
+    if snapshot is None and not count:
+        return None
+    return {
+        'stock': round((snapshot.balance if snapshot else 0) + (total or 0), 6),
+        'snapshot_at': snapshot.taken_at.isoformat() if snapshot else None,
+        'movements_scanned': count,
+    }
+
+
+def _latest_snapshots():
+    return db.session.query(
+        StockSnapshot.medication_id, func.max(StockSnapshot.taken_at).label('taken_at')
+    ).group_by(StockSnapshot.medication_id).subquery()
+
+
+def take_snapshots(now=None):
+    """Snapshot the balance of every medication with movements since its
+    last snapshot; returns the number of snapshots written"""
+    cutoff = (now or datetime.utcnow()) - SNAPSHOT_LAG
+    latest = _latest_snapshots()
+    previous = dict(db.session.query(StockSnapshot.medication_id, StockSnapshot.balance).join(latest, and_(
+        latest.c.medication_id == StockSnapshot.medication_id, latest.c.taken_at == StockSnapshot.taken_at)))
+    totals = db.session.query(StockMovement.medication_id, func.sum(StockMovement.quantity)) \
+        .outerjoin(latest, latest.c.medication_id == StockMovement.medication_id) \
+        .filter(StockMovement.created_at <= cutoff,
+                or_(latest.c.taken_at.is_(None), StockMovement.created_at > latest.c.taken_at)) \
+        .group_by(StockMovement.medication_id)
+    rows = [{'medication_id': medication_id, 'taken_at': cutoff, 'balance': previous.get(medication_id, 0) + total}
+            for medication_id, total in totals]
+    if rows:
+        db.session.execute(insert(StockSnapshot), rows)
+    db.session.commit()
+    return len(rows)
+
+
+def reconcile(fix=False):
+    """Compare every medication's current_stock with the sum of its ledger in
+    one aggregate query; with `fix`, append a correction movement for each
+    difference so the ledger agrees with the stock on hand"""
+    ledger = select(StockMovement.medication_id, func.sum(StockMovement.quantity).label('balance')) \
+        .group_by(StockMovement.medication_id).subquery()
+    balance = func.coalesce(ledger.c.balance, 0)
+    mismatches = db.session.query(Medication.id, Medication.name, Medication.current_stock, balance) \
+        .outerjoin(ledger, ledger.c.medication_id == Medication.id) \
+        .filter(func.abs(Medication.current_stock - balance) > 1e-6) \
+        .order_by(Medication.id).all()
+    if fix:
+        record_movements((medication_id, stock - balance, 'correction', None, 'reconcile')
+                         for medication_id, _, stock, balance in mismatches)
+        db.session.commit()
+    return mismatches
+
+
+def init_app(app):
+    """Register the `flask stock` ledger commands"""
+
+    @app.cli.group('stock')
+    def stock_group():
+        """Stock ledger snapshots and reconciliation."""
+
+    @stock_group.command('snapshot')
+    @click.option('--every', type=float, default=0,
+                  help='Repeat every this many seconds instead of running once')
+    def snapshot_command(every):
+        """Snapshot the ledger balance of each medication."""
+        while True:
+            taken = take_snapshots()
+            click.echo(f'{datetime.utcnow().isoformat()} took {taken} stock snapshots')
+            if not every:
+                break
+            time.sleep(every)
+
+    @stock_group.command('reconcile')
+    @click.option('--fix', is_flag=True, help='Append corrections so the ledger matches current_stock')
+    def reconcile_command(fix):
+        """Check current_stock against the stock ledger."""
+        mismatches = reconcile(fix)
+        for medication_id, name, stock, balance in mismatches:
+            click.echo(f'medication {medication_id} ({name}): current_stock {stock}, ledger {balance:g}')
+        click.echo(f"{len(mismatches)} medications {'corrected' if fix else 'out of step'}")
+        if mismatches and not fix:
+            raise SystemExit(1)
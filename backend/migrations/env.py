@@ -51,6 +51,13 @@ def get_metadata():
     return target_db.metadata
 
 
+def set_sqlite_foreign_keys(connection, enabled):
+    # Straight on the DBAPI connection: the pragma is ignored inside a
+    # transaction, and this must not begin one on `connection`
+    connection.connection.driver_connection.execute(
+        f"PRAGMA foreign_keys={'ON' if enabled else 'OFF'}")
+
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode.
 
@@ -93,15 +100,25 @@ def run_migrations_online():
     connectable = get_engine()
 
     with connectable.connect() as connection:
-        context.configure(
-            connection=connection,
-            target_metadata=get_metadata(),
-            process_revision_directives=process_revision_directives,
-            **current_app.extensions['migrate'].configure_args
-        )
-
-        with context.begin_transaction():
-            context.run_migrations()
+        # The app turns SQLite foreign keys on for every connection
+        # (extensions.py). Batch migrations copy and drop referenced
+        # tables, which that would reject, so they run with it off.
+        sqlite = connection.dialect.name == 'sqlite'
+        if sqlite:
+            set_sqlite_foreign_keys(connection, False)
+        try:
+            context.configure(
+                connection=connection,
+                target_metadata=get_metadata(),
+                process_revision_directives=process_revision_directives,
+                **current_app.extensions['migrate'].configure_args
+            )
+
+            with context.begin_transaction():
+                context.run_migrations()
+        finally:
+            if sqlite:
+                set_sqlite_foreign_keys(connection, True)
 
 
 if context.is_offline_mode():
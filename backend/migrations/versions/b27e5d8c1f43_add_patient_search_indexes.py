@@ -0,0 +1,66 @@
+"""Add patient search indexes
+
+Revision ID: b27e5d8c1f43
+Revises: 9d3a6c1e4f27
+Create Date: 2026-10-18 15:12:40.631087
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b27e5d8c1f43'
+down_revision = '9d3a6c1e4f27'
+branch_labels = None
+depends_on = None
+
+PREFIX_INDEXES = {
+    'ix_patients_last_name_lower': 'last_name',
+    'ix_patients_first_name_lower': 'first_name',
+    'ix_patients_mrn_lower': 'medical_record_number',
+}
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    ops = ' text_pattern_ops' if dialect == 'postgresql' else ''
+    for name, column in PREFIX_INDEXES.items():
+        op.execute(f'CREATE INDEX {name} ON patients (lower({column}){ops})')
+
+    if dialect == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.execute("CREATE INDEX ix_patients_search_trgm ON patients USING gin "
+                   "((lower(first_name || ' ' || last_name || ' ' || medical_record_number)) gin_trgm_ops)")
+    elif dialect == 'sqlite':
+        # Kept in sync by triggers. A batch_alter_table on patients recreates
+        # the table and drops them, so such migrations must re-run these.
+        op.execute("CREATE VIRTUAL TABLE patients_fts USING fts5("
+                   "first_name, last_name, medical_record_number, "
+                   "content='patients', content_rowid='id', tokenize='trigram')")
+        op.execute("CREATE TRIGGER patients_fts_insert AFTER INSERT ON patients BEGIN "
+                   "INSERT INTO patients_fts(rowid, first_name, last_name, medical_record_number) "
+                   "VALUES (new.id, new.first_name, new.last_name, new.medical_record_number); END")
+        op.execute("CREATE TRIGGER patients_fts_delete AFTER DELETE ON patients BEGIN "
+                   "INSERT INTO patients_fts(patients_fts, rowid, first_name, last_name, medical_record_number) "
+                   "VALUES ('delete', old.id, old.first_name, old.last_name, old.medical_record_number); END")
+        op.execute("CREATE TRIGGER patients_fts_update AFTER UPDATE ON patients BEGIN "
+                   "INSERT INTO patients_fts(patients_fts, rowid, first_name, last_name, medical_record_number) "
+                   "VALUES ('delete', old.id, old.first_name, old.last_name, old.medical_record_number); "
+                   "INSERT INTO patients_fts(rowid, first_name, last_name, medical_record_number) "
+                   "VALUES (new.id, new.first_name, new.last_name, new.medical_record_number); END")
+        # Index the existing patients
+        op.execute("INSERT INTO patients_fts(patients_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute('DROP INDEX ix_patients_search_trgm')
+    elif dialect == 'sqlite':
+        for trigger in ('patients_fts_insert', 'patients_fts_delete', 'patients_fts_update'):
+            op.execute(f'DROP TRIGGER {trigger}')
+        op.execute('DROP TABLE patients_fts')
+
+    for name in PREFIX_INDEXES:
+        op.drop_index(name, table_name='patients')
@@ -0,0 +1,30 @@
+"""Add reference cache stamps
+
+Revision ID: e6b3d8f2a415
+Revises: c8e2f5a1d734
+Create Date: 2026-10-18 21:04:37.518209
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6b3d8f2a415'
+down_revision = 'c8e2f5a1d734'
+branch_labels = None
+depends_on = None
+
+table_versions = sa.table('table_versions', sa.column('name', sa.String), sa.column('version', sa.Integer))
+
+
+def upgrade():
+    # Counters the worker reference caches check (see references.py)
+    op.bulk_insert(table_versions, [
+        {'name': 'medication_refs', 'version': 1},
+        {'name': 'patient_refs', 'version': 1},
+    ])
+
+
+def downgrade():
+    op.execute(table_versions.delete().where(table_versions.c.name.in_(['medication_refs', 'patient_refs'])))
@@ -0,0 +1,160 @@
+"""Partition dosages by month and cascade deletes
+
+Revision ID: f3c7a1d9e264
+Revises: d5a8e3b6c912
+Create Date: 2026-10-18 17:24:05.318840
+
+"""
+import logging
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3c7a1d9e264'
+down_revision = 'd5a8e3b6c912'
+branch_labels = None
+depends_on = None
+
+DOSAGE_INDEXES = [
+    ('ix_dosages_time_id', ['dosage_time', 'id']),
+    ('ix_dosages_patient_time_id', ['patient_id', 'dosage_time', 'id']),
+    ('ix_dosages_medication_time_id', ['medication_id', 'dosage_time', 'id']),
+    ('ix_dosages_administered_by_time_id', ['administered_by', 'dosage_time', 'id']),
+]
+COLUMNS = 'id, medication_id, patient_id, dosage_amount, dosage_time, administered_by, notes'
+# Monthly partitions created ahead of the current month
+MONTHS_AHEAD = 3
+ORPHANED = ('NOT EXISTS (SELECT 1 FROM patients p WHERE p.id = d.patient_id) '
+            'OR NOT EXISTS (SELECT 1 FROM medications m WHERE m.id = d.medication_id)')
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def dosage_table(name, postgres, ondelete):
+    """Create a dosages-shaped table; on PostgreSQL partitioned by month,
+    which needs dosage_time in the primary key"""
+    op.create_table(name,
+    sa.Column('id', sa.Integer(), nullable=False,
+              server_default=sa.text("nextval('dosages_id_seq')") if postgres else None),
+    sa.Column('medication_id', sa.Integer(), nullable=False),
+    sa.Column('patient_id', sa.Integer(), nullable=False),
+    sa.Column('dosage_amount', sa.Float(), nullable=False),
+    sa.Column('dosage_time', sa.DateTime(), nullable=False),
+    sa.Column('administered_by', sa.String(length=100), nullable=False),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.ForeignKeyConstraint(['medication_id'], ['medications.id'], ondelete=ondelete),
+    sa.ForeignKeyConstraint(['patient_id'], ['patients.id'], ondelete=ondelete),
+    sa.PrimaryKeyConstraint('id', 'dosage_time') if postgres else sa.PrimaryKeyConstraint('id'),
+    **({'postgresql_partition_by': 'RANGE (dosage_time)'} if postgres else {})
+    )
+
+
+def monthly_partitions(table, first, last):
+    month = datetime(first.year, first.month, 1)
+    while month <= last:
+        following = add_months(month, 1)
+        op.execute(f"CREATE TABLE {table}_p{month:%Y_%m} PARTITION OF {table} "
+                   f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{following:%Y-%m-%d}')")
+        month = following
+    op.execute(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT')
+
+
+def shift_consumption(table, sign, postgres):
+    """Add (sign 1) or take out (sign -1) the dosages of `table` from
+    the daily consumption rollup, which only keeps days with doses"""
+    day = 'CAST(d.dosage_time AS DATE)' if postgres else 'date(d.dosage_time)'
+    matching = f'd.medication_id = c.medication_id AND {day} = c.day'
+    if sign > 0:
+        op.execute(f'INSERT INTO medication_daily_consumption (medication_id, day, total_amount, dose_count) '
+                   f'SELECT DISTINCT d.medication_id, {day}, 0, 0 FROM {table} d WHERE NOT EXISTS '
+                   f'(SELECT 1 FROM medication_daily_consumption c WHERE {matching})')
+    op.execute(f'UPDATE medication_daily_consumption AS c SET '
+               f'total_amount = total_amount + {sign} * (SELECT sum(d.dosage_amount) FROM {table} d WHERE {matching}), '
+               f'dose_count = dose_count + {sign} * (SELECT count(*) FROM {table} d WHERE {matching}) '
+               f'WHERE EXISTS (SELECT 1 FROM {table} d WHERE {matching})')
+    if sign < 0:
+        op.execute('DELETE FROM medication_daily_consumption WHERE dose_count <= 0')
+
+
+def upgrade():
+    postgres = op.get_bind().dialect.name == 'postgresql'
+
+    for index, _ in DOSAGE_INDEXES:
+        op.drop_index(index, table_name='dosages')
+    op.rename_table('dosages', 'dosages_unpartitioned')
+    if postgres:
+        op.execute('ALTER INDEX dosages_pkey RENAME TO dosages_unpartitioned_pkey')
+
+    dosage_table('dosages', postgres, 'CASCADE')
+    if postgres:
+        # Keep the id sequence when the old table is dropped
+        op.execute('ALTER SEQUENCE dosages_id_seq OWNED BY dosages.id')
+        now = datetime.utcnow()
+        first = op.get_bind().execute(sa.text('SELECT min(dosage_time) FROM dosages_unpartitioned')).scalar()
+        monthly_partitions('dosages', first or now, add_months(now, MONTHS_AHEAD))
+    for index, columns in DOSAGE_INDEXES:
+        op.create_index(index, 'dosages', columns, unique=False)
+
+    # Dosages of already deleted patients or medications would break the
+    # new foreign keys. They are kept, without foreign keys, in
+    # dosages_orphaned and taken out of the rollup, which follows dosages.
+    orphaned = op.get_bind().execute(sa.text(f'SELECT count(*) FROM dosages_unpartitioned d WHERE {ORPHANED}')).scalar()
+    if orphaned:
+        logger.warning('Moving %d dosages whose patient or medication no longer exists to dosages_orphaned', orphaned)
+        op.execute(f'CREATE TABLE dosages_orphaned AS SELECT {COLUMNS} FROM dosages_unpartitioned d WHERE {ORPHANED}')
+        shift_consumption('dosages_orphaned', -1, postgres)
+    op.execute(f'INSERT INTO dosages ({COLUMNS}) SELECT {COLUMNS} FROM dosages_unpartitioned d WHERE NOT ({ORPHANED})')
+    op.drop_table('dosages_unpartitioned')
+
+    dosage_table('dosages_archive', postgres, 'CASCADE')
+    if postgres:
+        op.execute('ALTER TABLE dosages_archive ALTER COLUMN id DROP DEFAULT')
+        op.execute('CREATE TABLE dosages_archive_default PARTITION OF dosages_archive DEFAULT')
+    op.create_index('ix_dosages_archive_patient_time_id', 'dosages_archive',
+                    ['patient_id', 'dosage_time', 'id'], unique=False)
+
+
+def downgrade():
+    postgres = op.get_bind().dialect.name == 'postgresql'
+
+    for index, _ in DOSAGE_INDEXES:
+        op.drop_index(index, table_name='dosages')
+    op.rename_table('dosages', 'dosages_partitioned')
+    if postgres:
+        op.execute('ALTER INDEX dosages_pkey RENAME TO dosages_partitioned_pkey')
+
+    op.create_table('dosages',
+    sa.Column('id', sa.Integer(), nullable=False,
+              server_default=sa.text("nextval('dosages_id_seq')") if postgres else None),
+    sa.Column('medication_id', sa.Integer(), nullable=False),
+    sa.Column('patient_id', sa.Integer(), nullable=False),
+    sa.Column('dosage_amount', sa.Float(), nullable=False),
+    sa.Column('dosage_time', sa.DateTime(), nullable=False),
+    sa.Column('administered_by', sa.String(length=100), nullable=False),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.ForeignKeyConstraint(['medication_id'], ['medications.id'], ),
+    sa.ForeignKeyConstraint(['patient_id'], ['patients.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    if postgres:
+        op.execute('ALTER SEQUENCE dosages_id_seq OWNED BY dosages.id')
+    # Archived dosages go back into the single table
+    op.execute(f'INSERT INTO dosages ({COLUMNS}) SELECT {COLUMNS} FROM dosages_partitioned')
+    op.execute(f'INSERT INTO dosages ({COLUMNS}) SELECT {COLUMNS} FROM dosages_archive')
+    if sa.inspect(op.get_bind()).has_table('dosages_orphaned'):
+        op.execute(f'INSERT INTO dosages ({COLUMNS}) SELECT {COLUMNS} FROM dosages_orphaned')
+        shift_consumption('dosages_orphaned', 1, postgres)
+        op.drop_table('dosages_orphaned')
+    for index, columns in DOSAGE_INDEXES:
+        op.create_index(index, 'dosages', columns, unique=False)
+
+    op.drop_index('ix_dosages_archive_patient_time_id', table_name='dosages_archive')
+    op.drop_table('dosages_archive')
+    op.drop_table('dosages_partitioned')
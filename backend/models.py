@@ -1,5 +1,19 @@
 from extensions import db
-from datetime import datetime
+from datetime import datetime, time, timedelta
+from serialization import compile_serializer
+
+# Days of consumption history the stock forecast averages over
+FORECAST_DAYS = 14
+
+
+def days_until_threshold(current_stock, threshold, daily_rate):
+    """Days until stock drops below threshold at `daily_rate`, or None if unused"""
+    if current_stock < threshold:
+        return 0
+    if daily_rate <= 0:
+        return None
+    return round((current_stock - threshold) / daily_rate, 1)
+
 
 class Medication(db.Model):
     __tablename__ = 'medications'
@@ -9,29 +23,87 @@ class Medication(db.Model):
     description = db.Column(db.Text)
     current_stock = db.Column(db.Integer, nullable=False)
     threshold = db.Column(db.Integer, nullable=False)
+    # Materialized `current_stock < threshold`, maintained on every stock or
+    # threshold change so alert lookups can use an index
+    low_stock = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+    low_stock_changed_at = db.Column(db.DateTime, index=True)
     
-    dosages = db.relationship('Dosage', backref='medication', lazy=True, cascade='all, delete-orphan')
+    # passive_deletes: the database's ON DELETE CASCADE removes the children,
+    # so deleting a medication or patient never loads its history
+    dosages = db.relationship('Dosage', backref='medication', lazy=True, cascade='all, delete-orphan',
+                              passive_deletes=True)
+    consumption = db.relationship('DailyConsumption', lazy=True, cascade='all, delete-orphan',
+                                  passive_deletes=True)
+    schedules = db.relationship('Schedule', backref='medication', lazy=True, cascade='all, delete-orphan',
+                                passive_deletes=True)
+    stock_movements = db.relationship('StockMovement', lazy=True, cascade='all, delete-orphan',
+                                      passive_deletes=True)
+    
+    __table_args__ = (
+        db.Index('ix_medications_low_stock', 'id',
+                 postgresql_where=db.text('low_stock'), sqlite_where=db.text('low_stock = 1')),
+    )
+    
+    # Columns read by listing_query(), in order, and the matching serializer
+    # for its rows; same output as to_dict()
+    LISTING_COLUMNS = ('id', 'name', 'description', 'current_stock', 'threshold', 'low_stock_changed_at')
+    serialize_row = staticmethod(compile_serializer('serialize_medication_row', LISTING_COLUMNS, {
+        'id': 'id',
+        'name': 'name',
+        'description': 'description',
+        'current_stock': 'current_stock',
+        'threshold': 'threshold',
+        'low_stock': 'current_stock < threshold',
+        'days_until_threshold': 'days_until_threshold(current_stock, threshold, daily_rate)',
+        'low_stock_changed_at': 'low_stock_changed_at.isoformat() if low_stock_changed_at else None'
+    }, params=('daily_rate',), namespace={'days_until_threshold': days_until_threshold}))
     
     def __repr__(self):
         return f'<Medication {self.name}>'
     
-    def to_dict(self):
-        """Serialize Medication object to dictionary"""
+    @classmethod
+    def listing_query(cls):
+        """Query the serialized medication columns as plain rows"""
+        return db.session.query(*[getattr(cls, column) for column in cls.LISTING_COLUMNS])
+    
+    def to_dict(self, daily_rate):
+        """Serialize Medication object to dictionary
+        
+        `daily_rate` is the average daily consumption behind the forecast;
+        callers load it with DailyConsumption.daily_rates(), once for all the
+        medications they serialize, so serializing never queries.
+        """
         return {
             'id': self.id,
             'name': self.name,
             'description': self.description,
             'current_stock': self.current_stock,
             'threshold': self.threshold,
-            'low_stock': self.current_stock < self.threshold
+            'low_stock': self.current_stock < self.threshold,
+            'days_until_threshold': self.days_until_threshold(daily_rate),
+            'low_stock_changed_at': self.low_stock_changed_at.isoformat() if self.low_stock_changed_at else None
         }
     
     def update_from_dict(self, data):
         """Update Medication from dictionary"""
         self.name = data.get('name', self.name)
         self.description = data.get('description', self.description)
-        self.current_stock = data.get('current_stock', self.current_stock)
+        # current_stock changes go through inventory.set_stock so they are
+        # recorded in the stock ledger
         self.threshold = data.get('threshold', self.threshold)
+        self.sync_low_stock()
+        return self
+    
+    def days_until_threshold(self, daily_rate):
+        """Days until stock drops below threshold at `daily_rate`, or None if unused"""
+        return days_until_threshold(self.current_stock, self.threshold, daily_rate)
+    
+    def sync_low_stock(self):
+        """Recompute the low_stock flag, stamping the time when it flips"""
+        low = self.current_stock < self.threshold
+        if low != bool(self.low_stock):
+            self.low_stock = low
+            self.low_stock_changed_at = datetime.utcnow()
         return self
 
 
@@ -44,11 +116,39 @@ class Patient(db.Model):
     date_of_birth = db.Column(db.Date, nullable=False)
     medical_record_number = db.Column(db.String(50), unique=True, nullable=False)
     
-    dosages = db.relationship('Dosage', backref='patient', lazy=True, cascade='all, delete-orphan')
+    dosages = db.relationship('Dosage', backref='patient', lazy=True, cascade='all, delete-orphan',
+                              passive_deletes=True)
+    schedules = db.relationship('Schedule', backref='patient', lazy=True, cascade='all, delete-orphan',
+                                passive_deletes=True)
+    
+    # Case-insensitive prefix lookups for patient search (see search.py)
+    __table_args__ = (
+        db.Index('ix_patients_last_name_lower', db.func.lower(last_name).label('last_name_lower'),
+                 postgresql_ops={'last_name_lower': 'text_pattern_ops'}),
+        db.Index('ix_patients_first_name_lower', db.func.lower(first_name).label('first_name_lower'),
+                 postgresql_ops={'first_name_lower': 'text_pattern_ops'}),
+        db.Index('ix_patients_mrn_lower', db.func.lower(medical_record_number).label('mrn_lower'),
+                 postgresql_ops={'mrn_lower': 'text_pattern_ops'}),
+    )
+    
+    LISTING_COLUMNS = ('id', 'first_name', 'last_name', 'date_of_birth', 'medical_record_number')
+    serialize_row = staticmethod(compile_serializer('serialize_patient_row', LISTING_COLUMNS, {
+        'id': 'id',
+        'first_name': 'first_name',
+        'last_name': 'last_name',
+        'date_of_birth': 'date_of_birth.isoformat()',
+        'medical_record_number': 'medical_record_number',
+        'full_name': "f'{first_name} {last_name}'"
+    }))
     
     def __repr__(self):
         return f'<Patient {self.first_name} {self.last_name}>'
     
+    @classmethod
+    def listing_query(cls):
+        """Query the serialized patient columns as plain rows"""
+        return db.session.query(*[getattr(cls, column) for column in cls.LISTING_COLUMNS])
+    
     def to_dict(self):
         """Serialize Patient object to dictionary"""
         return {
@@ -73,30 +173,110 @@ class Patient(db.Model):
 class Dosage(db.Model):
     __tablename__ = 'dosages'
     
+    # On PostgreSQL the table is partitioned by month on dosage_time and its
+    # primary key is (id, dosage_time); see partitions.py
     id = db.Column(db.Integer, primary_key=True)
-    medication_id = db.Column(db.Integer, db.ForeignKey('medications.id'), nullable=False)
-    patient_id = db.Column(db.Integer, db.ForeignKey('patients.id'), nullable=False)
+    medication_id = db.Column(db.Integer, db.ForeignKey('medications.id', ondelete='CASCADE'), nullable=False)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patients.id', ondelete='CASCADE'), nullable=False)
     dosage_amount = db.Column(db.Float, nullable=False)
     dosage_time = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     administered_by = db.Column(db.String(100), nullable=False)
     notes = db.Column(db.Text)
     
+    # Composite indexes backing the keyset-paginated, filtered dosage listing
+    __table_args__ = (
+        db.Index('ix_dosages_time_id', 'dosage_time', 'id'),
+        db.Index('ix_dosages_patient_time_id', 'patient_id', 'dosage_time', 'id'),
+        db.Index('ix_dosages_medication_time_id', 'medication_id', 'dosage_time', 'id'),
+        db.Index('ix_dosages_administered_by_time_id', 'administered_by', 'dosage_time', 'id'),
+    )
+    
+    # Row layout of listing_query(); formatted_time is sliced from the ISO
+    # string instead of formatting the timestamp a second time
+    LISTING_COLUMNS = ('id', 'medication_id', 'patient_id', 'dosage_amount', 'dosage_time',
+                       'administered_by', 'notes', 'medication_name', 'patient_first_name', 'patient_last_name')
+    # Row layout of plain_query(), which leaves the names to the caller
+    COLUMNS = LISTING_COLUMNS[:7]
+    FIELDS = {
+        'id': 'id',
+        'medication_id': 'medication_id',
+        'patient_id': 'patient_id',
+        'medication_name': 'medication_name',
+        'patient_name': 'patient_name',
+        'dosage_amount': 'dosage_amount',
+        'dosage_time': 'iso_time',
+        'administered_by': 'administered_by',
+        'notes': 'notes',
+        'formatted_time': "iso_time[:10] + ' ' + iso_time[11:16]"
+    }
+    serialize_row = staticmethod(compile_serializer('serialize_dosage_row', LISTING_COLUMNS, FIELDS, derived={
+        'iso_time': 'dosage_time.isoformat()',
+        'patient_name': "f'{patient_first_name} {patient_last_name}' if patient_first_name is not None else None",
+    }))
+    # Takes the names as dicts by medication and patient id
+    serialize_plain_row = staticmethod(compile_serializer('serialize_plain_dosage_row', COLUMNS, dict(
+        FIELDS, medication_name='medication_names.get(medication_id)', patient_name='patient_names.get(patient_id)'
+    ), derived={'iso_time': 'dosage_time.isoformat()'}, params=('medication_names', 'patient_names')))
+    
     def __repr__(self):
         return f'<Dosage {self.medication.name} for {self.patient.first_name}>'
     
     def to_dict(self):
         """Serialize Dosage object to dictionary"""
+        return Dosage.row_to_dict(
+            self,
+            medication_name=self.medication.name if self.medication else None,
+            patient_name=f"{self.patient.first_name} {self.patient.last_name}" if self.patient else None
+        )
+    
+    @classmethod
+    def listing_query(cls):
+        """Query dosage columns joined with medication and patient names.
+        
+        Returns plain rows (laid out as LISTING_COLUMNS, for serialize_row)
+        rather than ORM instances, so serializing any number of dosages costs
+        one SELECT and no per-row relationship loads.
+        """
+        return db.session.query(
+            cls.id,
+            cls.medication_id,
+            cls.patient_id,
+            cls.dosage_amount,
+            cls.dosage_time,
+            cls.administered_by,
+            cls.notes,
+            Medication.name.label('medication_name'),
+            Patient.first_name.label('patient_first_name'),
+            Patient.last_name.label('patient_last_name'),
+        ).outerjoin(Medication, Medication.id == cls.medication_id) \
+         .outerjoin(Patient, Patient.id == cls.patient_id)
+    
+    @classmethod
+    def plain_query(cls):
+        """Query the dosage columns alone (laid out as COLUMNS, for
+        serialize_plain_row), for callers resolving names from the
+        reference cache instead of joining"""
+        return db.session.query(*[getattr(cls, column) for column in cls.COLUMNS])
+    
+    @staticmethod
+    def row_to_dict(row, medication_name=None, patient_name=None):
+        """Serialize a dosage row (from listing_query) to dictionary"""
+        if medication_name is None:
+            medication_name = getattr(row, 'medication_name', None)
+        if patient_name is None and getattr(row, 'patient_first_name', None) is not None:
+            patient_name = f"{row.patient_first_name} {row.patient_last_name}"
+        dosage_time = row.dosage_time.isoformat()
         return {
-            'id': self.id,
-            'medication_id': self.medication_id,
-            'patient_id': self.patient_id,
-            'medication_name': self.medication.name if self.medication else None,
-            'patient_name': f"{self.patient.first_name} {self.patient.last_name}" if self.patient else None,
-            'dosage_amount': self.dosage_amount,
-            'dosage_time': self.dosage_time.isoformat(),
-            'administered_by': self.administered_by,
-            'notes': self.notes,
-            'formatted_time': self.dosage_time.strftime('%Y-%m-%d %H:%M')
+            'id': row.id,
+            'medication_id': row.medication_id,
+            'patient_id': row.patient_id,
+            'medication_name': medication_name,
+            'patient_name': patient_name,
+            'dosage_amount': row.dosage_amount,
+            'dosage_time': dosage_time,
+            'administered_by': row.administered_by,
+            'notes': row.notes,
+            'formatted_time': dosage_time[:10] + ' ' + dosage_time[11:16]
         }
     
     def update_from_dict(self, data):
@@ -108,4 +288,265 @@ class Dosage(db.Model):
             self.dosage_time = datetime.strptime(data['dosage_time'], '%Y-%m-%d %H:%M:%S')
         self.administered_by = data.get('administered_by', self.administered_by)
         self.notes = data.get('notes', self.notes)
-        return self
\ No newline at end of file
+        return self
+
+class TableVersion(db.Model):
+    __tablename__ = 'table_versions'
+    
+    # One counter per table, bumped in the same transaction as every write to
+    # it, plus the medication_refs and patient_refs stamps of references.py
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<TableVersion {self.name} {self.version}>'
+
+
+class ArchivedDosage(db.Model):
+    __tablename__ = 'dosages_archive'
+    
+    # Dosages moved out of `dosages` by `flask dosages archive`; same columns.
+    # Still removed with their patient or medication.
+    id = db.Column(db.Integer, primary_key=True)
+    medication_id = db.Column(db.Integer, db.ForeignKey('medications.id', ondelete='CASCADE'), nullable=False)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patients.id', ondelete='CASCADE'), nullable=False)
+    dosage_amount = db.Column(db.Float, nullable=False)
+    dosage_time = db.Column(db.DateTime, nullable=False)
+    administered_by = db.Column(db.String(100), nullable=False)
+    notes = db.Column(db.Text)
+    
+    __table_args__ = (
+        db.Index('ix_dosages_archive_patient_time_id', 'patient_id', 'dosage_time', 'id'),
+    )
+    
+    def __repr__(self):
+        return f'<ArchivedDosage {self.id}>'
+
+
+class DailyConsumption(db.Model):
+    __tablename__ = 'medication_daily_consumption'
+    
+    # Per-medication, per-day totals of the dosages table, upserted in the
+    # same transaction as every dosage write (see inventory.record_consumption)
+    medication_id = db.Column(db.Integer, db.ForeignKey('medications.id', ondelete='CASCADE'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    total_amount = db.Column(db.Float, nullable=False, default=0)
+    dose_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<DailyConsumption {self.medication_id} {self.day}>'
+    
+    def to_dict(self):
+        """Serialize DailyConsumption object to dictionary"""
+        return {
+            'day': self.day.isoformat(),
+            'total_amount': round(self.total_amount, 6),
+            'dose_count': self.dose_count
+        }
+    
+    @classmethod
+    def daily_rates(cls, medication_ids, days=FORECAST_DAYS):
+        """Average daily consumption of each medication over the last `days` days"""
+        if not medication_ids:
+            return {}
+        start = datetime.utcnow().date() - timedelta(days=days - 1)
+        rows = db.session.query(cls.medication_id, db.func.sum(cls.total_amount)) \
+            .filter(cls.medication_id.in_(medication_ids), cls.day >= start) \
+            .group_by(cls.medication_id).all()
+        return {medication_id: (total or 0.0) / days for medication_id, total in rows}
+
+
+class StockMovement(db.Model):
+    __tablename__ = 'stock_movements'
+    
+    # Append-only ledger of every change to medications.current_stock,
+    # written in the same transaction (see inventory.adjust_stock)
+    KINDS = ('opening', 'dose', 'restock', 'correction')
+    
+    id = db.Column(db.Integer, primary_key=True)
+    medication_id = db.Column(db.Integer, db.ForeignKey('medications.id', ondelete='CASCADE'), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)
+    quantity = db.Column(db.Float, nullable=False)
+    # The dose behind a `dose` movement; not a foreign key, the dose may be
+    # deleted or archived while its movements stay
+    dosage_id = db.Column(db.Integer)
+    note = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_stock_movements_medication_time_id', 'medication_id', 'created_at', 'id'),
+    )
+    
+    def __repr__(self):
+        return f'<StockMovement {self.kind} {self.quantity} of {self.medication_id}>'
+    
+    def to_dict(self):
+        """Serialize StockMovement object to dictionary"""
+        return {
+            'id': self.id,
+            'medication_id': self.medication_id,
+            'kind': self.kind,
+            'quantity': self.quantity,
+            'dosage_id': self.dosage_id,
+            'note': self.note,
+            'created_at': self.created_at.isoformat()
+        }
+
+
+class StockSnapshot(db.Model):
+    __tablename__ = 'stock_snapshots'
+    
+    # Ledger balance of a medication as of taken_at, so a point-in-time
+    # query only sums the movements after the latest snapshot before it
+    medication_id = db.Column(db.Integer, db.ForeignKey('medications.id', ondelete='CASCADE'), primary_key=True)
+    taken_at = db.Column(db.DateTime, primary_key=True)
+    balance = db.Column(db.Float, nullable=False)
+    
+    def __repr__(self):
+        return f'<StockSnapshot {self.medication_id} at {self.taken_at}>'
+
+
+class Schedule(db.Model):
+    __tablename__ = 'schedules'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patients.id', ondelete='CASCADE'), nullable=False, index=True)
+    medication_id = db.Column(db.Integer, db.ForeignKey('medications.id', ondelete='CASCADE'), nullable=False)
+    dosage_amount = db.Column(db.Float, nullable=False)
+    # Either every `interval_minutes` from starts_at, or at fixed UTC times
+    # of day stored as 'HH:MM,HH:MM'
+    interval_minutes = db.Column(db.Integer)
+    times_of_day = db.Column(db.String(200))
+    starts_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    ends_at = db.Column(db.DateTime)
+    # A dose within this many minutes either side of a slot counts for it
+    grace_minutes = db.Column(db.Integer, nullable=False, default=60)
+    # The next slot the missed-dose sweeper has not resolved yet, and the
+    # window a dose must fall in to satisfy it (NULL once the schedule ends)
+    due_at = db.Column(db.DateTime)
+    due_window_start = db.Column(db.DateTime)
+    due_window_end = db.Column(db.DateTime, index=True)
+    
+    missed_doses = db.relationship('MissedDose', backref='schedule', lazy=True, cascade='all, delete-orphan',
+                                   passive_deletes=True)
+    
+    def __repr__(self):
+        return f'<Schedule {self.id} for patient {self.patient_id}>'
+    
+    def to_dict(self):
+        """Serialize Schedule object to dictionary"""
+        return {
+            'id': self.id,
+            'patient_id': self.patient_id,
+            'medication_id': self.medication_id,
+            'dosage_amount': self.dosage_amount,
+            'interval_minutes': self.interval_minutes,
+            'times_of_day': self.times_of_day.split(',') if self.times_of_day else None,
+            'starts_at': self.starts_at.isoformat(),
+            'ends_at': self.ends_at.isoformat() if self.ends_at else None,
+            'grace_minutes': self.grace_minutes,
+            'next_due_at': self.due_at.isoformat() if self.due_at else None
+        }
+    
+    def update_from_dict(self, data):
+        """Update Schedule from dictionary; raises ValueError for an invalid schedule"""
+        self.patient_id = data.get('patient_id', self.patient_id)
+        self.medication_id = data.get('medication_id', self.medication_id)
+        self.dosage_amount = data.get('dosage_amount', self.dosage_amount)
+        if 'interval_minutes' in data:
+            self.interval_minutes = int(data['interval_minutes']) if data['interval_minutes'] else None
+        if 'times_of_day' in data:
+            times = data['times_of_day'] or []
+            for value in times:
+                datetime.strptime(value, '%H:%M')
+            self.times_of_day = ','.join(sorted(times)) or None
+        if 'starts_at' in data:
+            self.starts_at = datetime.fromisoformat(data['starts_at'])
+        if 'ends_at' in data:
+            self.ends_at = datetime.fromisoformat(data['ends_at']) if data['ends_at'] else None
+        self.grace_minutes = int(data.get('grace_minutes', self.grace_minutes or 60))
+        if bool(self.interval_minutes) == bool(self.times_of_day):
+            raise ValueError('Give exactly one of interval_minutes or times_of_day')
+        if self.interval_minutes is not None and self.interval_minutes <= 0:
+            raise ValueError('interval_minutes must be positive')
+        return self
+    
+    def slots(self, start, end):
+        """Yield the scheduled dose times in [start, end), in order"""
+        start = max(start, self.starts_at or start)
+        if self.ends_at:
+            end = min(end, self.ends_at)
+        if self.interval_minutes:
+            step = timedelta(minutes=self.interval_minutes)
+            # First slot at or after `start` (ceiling division of timedeltas)
+            slot = self.starts_at + -(-(start - self.starts_at) // step) * step
+            while slot < end:
+                yield slot
+                slot += step
+        else:
+            times = [time.fromisoformat(value) for value in self.times_of_day.split(',')]
+            day = start.date()
+            while True:
+                for at in times:
+                    slot = datetime.combine(day, at)
+                    if slot >= end:
+                        return
+                    if slot >= start:
+                        yield slot
+                day += timedelta(days=1)
+    
+    def schedule_next(self, after):
+        """Point due_at at the first slot at or after `after` (None once ended)"""
+        self.due_at = next(self.slots(after, datetime.max), None)
+        grace = timedelta(minutes=self.grace_minutes)
+        self.due_window_start = self.due_at - grace if self.due_at else None
+        self.due_window_end = self.due_at + grace if self.due_at else None
+        return self
+
+
+class MissedDose(db.Model):
+    __tablename__ = 'missed_doses'
+    
+    # Written by the sweeper (see schedules.sweep_missed_doses)
+    id = db.Column(db.Integer, primary_key=True)
+    schedule_id = db.Column(db.Integer, db.ForeignKey('schedules.id', ondelete='CASCADE'), nullable=False)
+    patient_id = db.Column(db.Integer, nullable=False)
+    medication_id = db.Column(db.Integer, nullable=False)
+    due_at = db.Column(db.DateTime, nullable=False)
+    detected_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.UniqueConstraint('schedule_id', 'due_at', name='uq_missed_doses_schedule_due'),
+        db.Index('ix_missed_doses_patient_due', 'patient_id', 'due_at'),
+    )
+    
+    def __repr__(self):
+        return f'<MissedDose {self.schedule_id} at {self.due_at}>'
+    
+    def to_dict(self):
+        """Serialize MissedDose object to dictionary"""
+        return {
+            'id': self.id,
+            'schedule_id': self.schedule_id,
+            'patient_id': self.patient_id,
+            'medication_id': self.medication_id,
+            'due_at': self.due_at.isoformat(),
+            'detected_at': self.detected_at.isoformat()
+        }
+
+
+class IdempotencyKey(db.Model):
+    __tablename__ = 'idempotency_keys'
+    
+    # Responses of writes sent with an Idempotency-Key, shared by all workers
+    # (IDEMPOTENCY_BACKEND=database; see idempotency.py). status_code is
+    # NULL while the first request is still running.
+    key = db.Column(db.String(64), primary_key=True)
+    fingerprint = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer)
+    body = db.Column(db.LargeBinary)
+    content_type = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f'<IdempotencyKey {self.key} {self.status_code}>'
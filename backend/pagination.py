@@ -0,0 +1,91 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(values):
+    """Encode the sort key of the last row of a page as an opaque cursor"""
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+    """Decode a cursor back into sort key values matching `columns`"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(payload, list) or len(payload) != len(columns):
+        raise ValueError('Invalid cursor')
+    values = []
+    for column, value in zip(columns, payload):
+        expected = column.type.python_type
+        if expected is datetime:
+            try:
+                value = datetime.fromisoformat(value)
+            except TypeError:
+                raise ValueError('Invalid cursor')
+        elif expected is float and isinstance(value, int) and not isinstance(value, bool):
+            value = float(value)
+        # bool is an int subclass; a JSON true is no row id
+        elif not isinstance(value, expected) or isinstance(value, bool) and expected is not bool:
+            raise ValueError('Invalid cursor')
+        values.append(value)
+    return values
+
+
+def parse_limit(args):
+    """Read the `limit` query parameter, clamped to MAX_PAGE_SIZE"""
+    # Not args.get(type=int), which falls back to the default on junk
+    try:
+        limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ValueError('limit must be a positive integer')
+    if limit < 1:
+        raise ValueError('limit must be a positive integer')
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def keyset_page(query, columns, args, descending=False):
+    """Fetch one page of `query` ordered by `columns` after the request cursor.
+
+    Returns the rows of the page and the cursor of the next page, which is
+    None when there are no more rows.
+    """
+    limit = parse_limit(args)
+    cursor = args.get('cursor')
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        query = query.filter(_after(columns, values, descending))
+    order = [c.desc() if descending else c.asc() for c in columns]
+    rows = query.order_by(*order).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, c.key) for c in columns])
+    return rows, next_cursor
+
+
+def _after(columns, values, descending):
+    """Build `(c1, c2, ...) > (v1, v2, ...)` as an index-friendly OR chain"""
+    clauses = []
+    for i, column in enumerate(columns):
+        equal = [columns[j] == values[j] for j in range(i)]
+        beyond = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*equal, beyond))
+    return or_(*clauses)
+
+
+def paginated_response(response, next_cursor):
+    """Attach the next-page cursor to a list response"""
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
@@ -0,0 +1,148 @@
+from datetime import datetime
+import click
+from sqlalchemy import delete, insert, select, text
+from extensions import db
+from models import ArchivedDosage, Dosage
+from versions import touch
+
+# Monthly partitions kept ready ahead of the current month
+PARTITION_MONTHS_AHEAD = 3
+# Archive dosages older than this many months by default
+ARCHIVE_AFTER_MONTHS = 24
+# Rows moved per transaction when archiving without partitions
+ARCHIVE_BATCH = 10000
+
+
+def add_months(month, count):
+    """First day of the month `count` months after `month`"""
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def month_start(moment):
+    return datetime(moment.year, moment.month, 1)
+
+
+def partition_name(table, month):
+    return f'{table}_p{month:%Y_%m}'
+
+
+def is_partitioned(table):
+    """True when `table` is a partitioned PostgreSQL table"""
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return False
+    return db.session.execute(text(
+        'SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid '
+        'WHERE c.relname = :table AND pg_table_is_visible(c.oid))'
+    ), {'table': table}).scalar()
+
+
+def monthly_partitions(table):
+    """{month: partition name} of the monthly partitions attached to `table`"""
+    names = db.session.execute(text(
+        'SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid '
+        'JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = :table'
+    ), {'table': table}).scalars()
+    prefix = f'{table}_p'
+    return {datetime.strptime(name[len(prefix):], '%Y_%m'): name
+            for name in names if name.startswith(prefix)}
+
+
+def ensure_partitions(months_ahead=PARTITION_MONTHS_AHEAD, now=None):
+    """Create the monthly dosages partitions up to `months_ahead` months out.
+
+    Rows outside every monthly partition land in dosages_default; creating
+    a partition whose range already has rows there fails, so run this
+    (`flask dosages partitions`) before the months arrive. Returns the
+    names created.
+    """
+    if not is_partitioned('dosages'):
+        return []
+    existing = monthly_partitions('dosages')
+    current = month_start(now or datetime.utcnow())
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        if month not in existing:
+            name = partition_name('dosages', month)
+            db.session.execute(text(
+                f"CREATE TABLE {name} PARTITION OF dosages "
+                f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')"
+            ))
+            created.append(name)
+    db.session.commit()
+    return created
+
+
+def _move_rows(cutoff, batch):
+    """Move dosages older than `cutoff` to dosages_archive, `batch` rows per
+    transaction, walking the (dosage_time, id) index; returns the count"""
+    columns = [column.name for column in Dosage.__table__.columns]
+    moved = 0
+    while True:
+        ids = db.session.execute(
+            select(Dosage.id).where(Dosage.dosage_time < cutoff)
+            .order_by(Dosage.dosage_time, Dosage.id).limit(batch)
+        ).scalars().all()
+        if not ids:
+            return moved
+        db.session.execute(insert(ArchivedDosage).from_select(
+            columns, select(*[Dosage.__table__.c[name] for name in columns]).where(Dosage.id.in_(ids))))
+        db.session.execute(delete(Dosage).where(Dosage.id.in_(ids)))
+        touch('dosages')
+        db.session.commit()
+        moved += len(ids)
+
+
+def archive_dosages(before, batch=ARCHIVE_BATCH):
+    """Move dosages older than `before` (rounded down to a month) to dosages_archive.
+
+    On partitioned PostgreSQL each whole month is moved by detaching its
+    partition from `dosages` and attaching it to `dosages_archive`, which
+    only changes the catalog. Elsewhere, and for anything left in the
+    default partition, rows are copied and deleted in batches. The daily
+    consumption rollup keeps the archived doses. Returns what was moved.
+    """
+    cutoff = month_start(before)
+    report = {'partitions': [], 'rows': 0}
+    if is_partitioned('dosages') and is_partitioned('dosages_archive'):
+        for month, name in sorted(monthly_partitions('dosages').items()):
+            if add_months(month, 1) > cutoff:
+                continue
+            db.session.execute(text(f'ALTER TABLE dosages DETACH PARTITION {name}'))
+            db.session.execute(text(
+                f"ALTER TABLE dosages_archive ATTACH PARTITION {name} "
+                f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')"
+            ))
+            touch('dosages')
+            db.session.commit()
+            report['partitions'].append(name)
+    report['rows'] = _move_rows(cutoff, batch)
+    return report
+
+
+def init_app(app):
+    """Register the `flask dosages` maintenance commands"""
+
+    @app.cli.group('dosages')
+    def dosages_group():
+        """Dosage history partitions and archive."""
+
+    @dosages_group.command('partitions')
+    @click.option('--months-ahead', type=int, default=PARTITION_MONTHS_AHEAD, show_default=True)
+    def partitions_command(months_ahead):
+        """Create upcoming monthly partitions (PostgreSQL)."""
+        created = ensure_partitions(months_ahead)
+        click.echo(f"created {', '.join(created)}" if created else 'partitions up to date')
+
+    @dosages_group.command('archive')
+    @click.option('--before', type=click.DateTime(formats=['%Y-%m-%d']),
+                  help='Archive months before this date')
+    @click.option('--months', type=int, default=ARCHIVE_AFTER_MONTHS, show_default=True,
+                  help='Without --before, archive months older than this')
+    def archive_command(before, months):
+        """Move old dosages to dosages_archive."""
+        before = before or add_months(month_start(datetime.utcnow()), -months)
+        report = archive_dosages(before)
+        click.echo(f"archived {len(report['partitions'])} partitions and {report['rows']} rows "
+                   f"before {month_start(before):%Y-%m-%d}")
@@ -0,0 +1,155 @@
+from collections import namedtuple
+from itertools import chain
+from flask import g, has_request_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from cache import LRUCache
+from extensions import db
+from instrumentation import REFERENCE_CACHE_LOOKUPS
+from models import Medication, Patient, TableVersion
+from versions import touch
+
+MedicationRef = namedtuple('MedicationRef', 'name threshold')
+PatientRef = namedtuple('PatientRef', 'name')
+
+
+class ReferenceCache:
+    """Per-worker read-through cache of the rarely changing reference
+    fields of one table's rows, keyed by id.
+
+    A commit that writes `model` rows through the ORM bumps the `stamp`
+    counter in table_versions. The writing worker drops its entries at
+    once; the others notice the moved stamp on their next request.
+    """
+
+    def __init__(self, model, stamp, load, maxsize):
+        self.model = model
+        self.stamp = stamp
+        self.load = load
+        self.entries = LRUCache(maxsize)
+        self.version = None
+
+    def get_many(self, ids):
+        """Reference rows of `ids` by id, loading the misses in one query.
+        Ids with no row are left out."""
+        ids = set(ids)
+        if not ids:
+            return {}
+        if _writing(self, db.session()):
+            # This transaction's own writes are not ours to cache yet
+            return self.load(ids)
+        sync()
+        generation = self.entries.generation
+        found = self.entries.get_many(ids)
+        missing = ids.difference(found)
+        if found:
+            REFERENCE_CACHE_LOOKUPS.inc((('table', self.model.__tablename__), ('result', 'hit')), len(found))
+        if missing:
+            REFERENCE_CACHE_LOOKUPS.inc((('table', self.model.__tablename__), ('result', 'miss')), len(missing))
+            loaded = self.load(missing)
+            self.entries.set_many(loaded, generation)
+            found.update(loaded)
+        return found
+
+    def names(self, ids):
+        """Names of `ids` by id"""
+        return {id: ref.name for id, ref in self.get_many(ids).items()}
+
+    def check(self, version):
+        """Drop the entries if `stamp` is no longer at the version they were read at"""
+        if version != self.version:
+            self.entries.clear()
+            self.version = version
+
+    def invalidate(self):
+        self.entries.clear()
+        self.version = None
+
+
+def load_medications(ids):
+    rows = db.session.query(Medication.id, Medication.name, Medication.threshold).filter(Medication.id.in_(ids))
+    return {id: MedicationRef(name, threshold) for id, name, threshold in rows}
+
+
+def load_patients(ids):
+    rows = db.session.query(Patient.id, Patient.first_name, Patient.last_name).filter(Patient.id.in_(ids))
+    return {id: PatientRef(f'{first_name} {last_name}') for id, first_name, last_name in rows}
+
+
+DEFAULT_SIZE = 10000
+medication_refs = ReferenceCache(Medication, 'medication_refs', load_medications, DEFAULT_SIZE)
+patient_refs = ReferenceCache(Patient, 'patient_refs', load_patients, DEFAULT_SIZE)
+CACHES = (medication_refs, patient_refs)
+
+
+def sync():
+    """Catch up with reference writes committed by other workers; the
+    stamps are read once per request (or taken from the ones conditional()
+    already read)"""
+    if has_request_context():
+        if g.get('references_synced'):
+            return
+        g.references_synced = True
+        versions = g.get('table_versions', {})
+    else:
+        versions = {}
+    stamps = [cache.stamp for cache in CACHES]
+    if not all(stamp in versions for stamp in stamps):
+        versions = dict(db.session.query(TableVersion.name, TableVersion.version)
+                        .filter(TableVersion.name.in_(stamps)))
+    for cache in CACHES:
+        cache.check(versions.get(cache.stamp, 0))
+
+
+def _writing(cache, session):
+    """Whether the session's transaction has written, or is about to
+    flush, rows of the cache's table"""
+    if cache.stamp in session.info.get('reference_writes', ()):
+        return True
+    return any(isinstance(obj, cache.model) for obj in chain(session.new, session.dirty, session.deleted))
+
+
+@event.listens_for(Session, 'before_flush')
+def note_reference_writes(session, flush_context, instances):
+    for cache in CACHES:
+        if any(isinstance(obj, cache.model) for obj in chain(session.new, session.dirty, session.deleted)):
+            session.info.setdefault('reference_writes', set()).add(cache.stamp)
+
+
+# The commit and rollback events also fire for SAVEPOINTs; only the
+# outermost transaction decides what other workers and the cache see
+
+@event.listens_for(Session, 'before_commit')
+def stamp_reference_writes(session):
+    if session.in_nested_transaction():
+        return
+    session.flush()
+    # Bulk writers (imports) touch() the stamps themselves
+    stamps = session.info.setdefault('reference_writes', set())
+    stamps.update(cache.stamp for cache in CACHES if cache.stamp in session.info.get('touched_tables', ()))
+    missing = [stamp for stamp in stamps if stamp not in session.info.get('touched_tables', ())]
+    if missing:
+        touch(*sorted(missing))
+
+
+@event.listens_for(Session, 'after_commit')
+def drop_written_references(session):
+    if session.in_nested_transaction():
+        return
+    stamps = session.info.pop('reference_writes', ())
+    for cache in CACHES:
+        if cache.stamp in stamps:
+            cache.invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def forget_reference_writes(session):
+    if session.in_nested_transaction():
+        return
+    session.info.pop('reference_writes', None)
+
+
+def init_app(app):
+    """Size the reference caches from REFERENCE_CACHE_SIZE"""
+    for cache in CACHES:
+        cache.entries.maxsize = app.config['REFERENCE_CACHE_SIZE']
@@ -1,31 +1,440 @@
-from flask import Blueprint, request, jsonify
-from models import Medication, Patient, Dosage
+from flask import Blueprint, Response, abort, current_app, request, jsonify, stream_with_context
+from models import Medication, Patient, Dosage, DailyConsumption, Schedule, MissedDose, FORECAST_DAYS
 from extensions import db
-from datetime import datetime
-from sqlalchemy.exc import SQLAlchemyError
+from datetime import datetime, timedelta
+from collections import defaultdict
+import csv
+import io
+import json
+import queue
+from sqlalchemy import func, case, insert, update, delete
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from werkzeug.exceptions import HTTPException
+from pagination import keyset_page, paginated_response
+from cache import summary_cache
+from versions import touch, conditional, utc_today
+from idempotency import idempotent
+from instrumentation import serialization_timer
+from inventory import (adjust_stock, begin_write, record_consumption, record_movements, remove_consumption,
+                       run_in_transaction, set_stock, StaleRowError)
+from search import search_patients, SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT
+from imports import describe_error, import_rows, read_rows, FORMATS as IMPORT_FORMATS
+from ledger import balance_at
+from references import medication_refs, patient_refs
+from schedules import build_timeline, TIMELINE_DEFAULT_PAST, TIMELINE_DEFAULT_AHEAD, TIMELINE_MAX_SPAN
+
+TOP_MEDICATIONS_LIMIT = 5
+TOP_MEDICATIONS_DAYS = 30
+BULK_INSERT_CHUNK = 1000
+ALERTS_SINCE_OVERLAP = timedelta(seconds=5)
+SSE_KEEPALIVE_SECONDS = 15
+SSE_RETRY_MS = 5000
+SSE_REFUSED_RETRY_SECONDS = 30
+EXPORT_BATCH = 1000
+EXPORT_FIELDS = ['id', 'dosage_time', 'medication_id', 'medication_name', 'patient_id',
+                 'patient_name', 'dosage_amount', 'administered_by', 'notes']
+CONSUMPTION_DEFAULT_DAYS = 30
+CONSUMPTION_MAX_DAYS = 366
+MAX_BATCH_OPERATIONS = 500
+
+
+def parse_datetime(value):
+    """Parse an ISO 8601 or 'YYYY-MM-DD HH:MM:SS' timestamp"""
+    return datetime.fromisoformat(value) if 'T' in value \
+           else datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+
+
+def parse_dosage(data):
+    """Validate a dosage payload and return its column values.
+
+    Raises KeyError for a missing field and ValueError/TypeError for a
+    malformed one.
+    """
+    return {
+        'dosage_time': parse_datetime(data['dosage_time']),
+        'medication_id': int(data['medication_id']),
+        'patient_id': int(data['patient_id']),
+        'dosage_amount': float(data['dosage_amount']),
+        'administered_by': data['administered_by'],
+        'notes': data.get('notes', '')
+    }
+
+
+# Writes shared by the single-record routes and /batch; they flush but
+# leave touch() and the commit to the caller
+
+def create_medication(data):
+    """Add a medication along with its opening stock movement"""
+    medication = Medication(
+        name=data['name'],
+        description=data.get('description'),
+        current_stock=data['current_stock'],
+        threshold=data['threshold']
+    ).sync_low_stock()
+    db.session.add(medication)
+    db.session.flush()
+    record_movements([(medication.id, medication.current_stock, 'opening', None, None)])
+    return medication
+
+
+def change_medication(medication, data):
+    """Update a medication; a current_stock is a stock count recorded in the ledger"""
+    medication.update_from_dict(data)
+    db.session.flush()
+    if 'current_stock' in data:
+        set_stock(medication.id, int(data['current_stock']))
+        # set_stock updated the row in SQL
+        db.session.expire(medication)
+    return medication
+
+
+def remove_medication(medication):
+    # Dosages, rollup, schedules and ledger go with it (ON DELETE CASCADE)
+    db.session.delete(medication)
+    db.session.flush()
+
+
+def create_patient(data):
+    patient = Patient(
+        first_name=data['first_name'],
+        last_name=data['last_name'],
+        date_of_birth=datetime.strptime(data['date_of_birth'], '%Y-%m-%d').date(),
+        medical_record_number=data['medical_record_number']
+    )
+    db.session.add(patient)
+    db.session.flush()
+    return patient
+
+
+def remove_patient(patient):
+    # ON DELETE CASCADE removes the patient's dosages in the database;
+    # take them out of the rollup first
+    remove_consumption(Dosage.patient_id == patient.id)
+    db.session.delete(patient)
+    db.session.flush()
+
+
+def create_dosage(fields):
+    """Record a parsed dose, deducting its stock; returns the new id"""
+    dosage = Dosage(**fields)
+    db.session.add(dosage)
+    db.session.flush()
+    
+    # Update medication stock
+    adjust_stock(fields['medication_id'], -fields['dosage_amount'], dosage_id=dosage.id)
+    record_consumption([(fields['medication_id'], fields['dosage_time'],
+                         fields['dosage_amount'], 1)])
+    return dosage.id
+
+
+def change_dosage(id, data):
+    """Update a dose, moving its stock and rollup entries"""
+    # FOR UPDATE holds the row on PostgreSQL; the guarded UPDATE
+    # below catches concurrent changes on SQLite
+    dosage = Dosage.query.with_for_update().populate_existing().get_or_404(id)
+    values = {}
+    
+    # Handle datetime
+    if 'dosage_time' in data:
+        values['dosage_time'] = parse_datetime(data['dosage_time'])
+    
+    # Handle medication change and stock adjustment
+    new_med_id = int(data.get('medication_id', dosage.medication_id))
+    new_amount = float(data.get('dosage_amount', dosage.dosage_amount))
+    values['medication_id'] = new_med_id
+    values['dosage_amount'] = new_amount
+    
+    # Update other fields
+    if 'patient_id' in data:
+        values['patient_id'] = int(data['patient_id'])
+    if 'administered_by' in data:
+        values['administered_by'] = data['administered_by']
+    if 'notes' in data:
+        values['notes'] = data['notes']
+    
+    claimed = db.session.execute(
+        update(Dosage)
+        .where(Dosage.id == id,
+               Dosage.medication_id == dosage.medication_id,
+               Dosage.dosage_amount == dosage.dosage_amount,
+               Dosage.dosage_time == dosage.dosage_time)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not claimed:
+        raise StaleRowError(f'Dosage {id} changed concurrently')
+    
+    # Restore old medication stock and deduct from the new one
+    if dosage.medication_id != new_med_id or dosage.dosage_amount != new_amount:
+        adjust_stock(dosage.medication_id, dosage.dosage_amount, dosage_id=id)
+        adjust_stock(new_med_id, -new_amount, dosage_id=id)
+    
+    # Move the dose in the rollup; a no-op unless medication, amount or day changed
+    record_consumption([
+        (dosage.medication_id, dosage.dosage_time, -dosage.dosage_amount, -1),
+        (new_med_id, values.get('dosage_time', dosage.dosage_time), new_amount, 1),
+    ])
+
+
+def remove_dosage(id):
+    """Delete a dose and give its stock back"""
+    dosage = Dosage.query.with_for_update().populate_existing().get_or_404(id)
+    deleted = db.session.execute(
+        delete(Dosage)
+        .where(Dosage.id == id,
+               Dosage.medication_id == dosage.medication_id,
+               Dosage.dosage_amount == dosage.dosage_amount,
+               Dosage.dosage_time == dosage.dosage_time)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not deleted:
+        raise StaleRowError(f'Dosage {id} changed concurrently')
+    
+    # Restore medication stock
+    adjust_stock(dosage.medication_id, dosage.dosage_amount, dosage_id=id)
+    record_consumption([(dosage.medication_id, dosage.dosage_time, -dosage.dosage_amount, -1)])
+
+
+def read_records(req):
+    """Yield the records of a JSON array body or an NDJSON stream"""
+    if req.mimetype in ('application/x-ndjson', 'application/ndjson'):
+        for line in req.stream:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+    else:
+        records = req.get_json()
+        if not isinstance(records, list):
+            raise ValueError('Expected a JSON array of dosages')
+        yield from records
+
+
+def import_upload(req, kind):
+    """Run an import of the CSV or NDJSON request body and return its report"""
+    fmt = req.args.get('format') or ('csv' if req.mimetype == 'text/csv' else 'ndjson')
+    if fmt not in IMPORT_FORMATS:
+        return jsonify({'error': 'format must be csv or ndjson'}), 400
+    return jsonify(import_rows(kind, read_rows(req.stream, fmt))), 200
+
+
+def filter_dosages(query, args):
+    """Apply the patient, medication, administrator and time range filters"""
+    if 'patient_id' in args:
+        query = query.filter(Dosage.patient_id == int(args['patient_id']))
+    if 'medication_id' in args:
+        query = query.filter(Dosage.medication_id == int(args['medication_id']))
+    if 'administered_by' in args:
+        query = query.filter(Dosage.administered_by == args['administered_by'])
+    if 'since' in args:
+        query = query.filter(Dosage.dosage_time >= parse_datetime(args['since']))
+    if 'until' in args:
+        query = query.filter(Dosage.dosage_time < parse_datetime(args['until']))
+    return query
+
+
+def export_dosages(rows, fmt):
+    """Yield an NDJSON or CSV export of dosage rows, EXPORT_BATCH rows per chunk"""
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_FIELDS)
+        for count, row in enumerate(rows, 1):
+            record = Dosage.serialize_row(row)
+            writer.writerow([record[field] for field in EXPORT_FIELDS])
+            if count % EXPORT_BATCH == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+    else:
+        dumps = current_app.json.dumps
+        chunk = []
+        for row in rows:
+            chunk.append(dumps(Dosage.serialize_row(row)))
+            if len(chunk) == EXPORT_BATCH:
+                yield '\n'.join(chunk) + '\n'
+                chunk = []
+        if chunk:
+            yield '\n'.join(chunk) + '\n'
+
+
+def serialize_dosages(rows):
+    """Serialize Dosage.plain_query() rows, naming their medications and
+    patients from the reference cache"""
+    # Rows are laid out as Dosage.COLUMNS; indexing beats attribute access
+    medications = medication_refs.names({row[1] for row in rows})
+    patients = patient_refs.names({row[2] for row in rows})
+    return [Dosage.serialize_plain_row(row, medications, patients) for row in rows]
+
+
+def serialize_dosage(dosage_id):
+    """Serialize one dosage; only the dosage row is read when its names are cached"""
+    return serialize_dosages([Dosage.plain_query().filter(Dosage.id == dosage_id).one()])[0]
+
+
+def serialize_new_dosage(dosage_id, fields):
+    """Serialize a dosage just created from parse_dosage() `fields` without reading it back"""
+    row = dict(fields, id=dosage_id)
+    return serialize_dosages([tuple(row[column] for column in Dosage.COLUMNS)])[0]
+
+
+def serialize_medication(medication):
+    """Serialize one medication with its forecast"""
+    return medication.to_dict(DailyConsumption.daily_rates([medication.id]).get(medication.id, 0.0))
+
+
+def serialize_medications(rows):
+    """Serialize Medication.listing_query() rows with their forecasts from one rollup query"""
+    rates = DailyConsumption.daily_rates([row.id for row in rows])
+    return [Medication.serialize_row(row, rates.get(row.id, 0.0)) for row in rows]
+
+
+def batch_medication(action, id, data):
+    """Run a /batch medication operation; returns (status, body, tables written)"""
+    if action == 'create':
+        return 201, create_medication(data).to_dict(daily_rate=0.0), ('medications',)
+    medication = Medication.query.get_or_404(id)
+    if action == 'update':
+        return 200, serialize_medication(change_medication(medication, data)), ('medications',)
+    remove_medication(medication)
+    return 200, {'message': 'Medication deleted'}, ('medications', 'dosages', 'schedules')
+
+
+def batch_patient(action, id, data):
+    if action == 'create':
+        return 201, create_patient(data).to_dict(), ('patients',)
+    patient = Patient.query.get_or_404(id)
+    if action == 'update':
+        return 200, patient.update_from_dict(data).to_dict(), ('patients',)
+    remove_patient(patient)
+    return 200, {'message': 'Patient deleted'}, ('patients', 'dosages', 'medications', 'schedules')
+
+
+def batch_dosage(action, id, data):
+    if action == 'create':
+        fields = parse_dosage(data)
+        return 201, serialize_new_dosage(create_dosage(fields), fields), ('dosages', 'medications')
+    if action == 'update':
+        change_dosage(id, data)
+        return 200, serialize_dosage(id), ('dosages', 'medications')
+    remove_dosage(id)
+    return 200, {'message': 'Dosage deleted'}, ('dosages', 'medications')
+
+
+BATCH_RESOURCES = {'medications': batch_medication, 'patients': batch_patient, 'dosages': batch_dosage}
+BATCH_ACTIONS = ('create', 'update', 'delete')
+
+
+def run_batch(operations, partial):
+    """Run /batch operations in order in the current transaction, each under
+    a SAVEPOINT so a failed one is undone on its own.
+
+    Returns (results, tables written, whether any failed). Unless `partial`,
+    the first failure stops the batch and the caller rolls everything back.
+    Lock conflicts and StaleRowError propagate so the whole batch is retried.
+    """
+    results, tables, failed = [], set(), False
+    for index, operation in enumerate(operations):
+        try:
+            if not isinstance(operation, dict):
+                raise ValueError('expected an object')
+            action, resource = operation.get('op'), operation.get('resource')
+            if action not in BATCH_ACTIONS or resource not in BATCH_RESOURCES:
+                raise ValueError(f'unknown operation {action!r} on {resource!r}')
+            target = int(operation['id']) if action != 'create' else None
+            with db.session.begin_nested():
+                status, body, written = BATCH_RESOURCES[resource](action, target, operation.get('data') or {})
+            results.append({'index': index, 'status': status, 'data': body})
+            tables.update(written)
+        except HTTPException as e:
+            results.append({'index': index, 'status': e.code, 'error': e.name})
+            failed = True
+        except IntegrityError:
+            results.append({'index': index, 'status': 409, 'error': 'Conflicts with an existing record'})
+            failed = True
+        except (KeyError, ValueError, TypeError) as e:
+            results.append({'index': index, 'status': 400, 'error': describe_error(e)})
+            failed = True
+        # Stock and ledger updates run as SQL; reload what the next operation reads
+        db.session.expire_all()
+        if failed and not partial:
+            break
+    return results, tables, failed
+
+
+def build_summary():
+    """Compute the dashboard aggregates with a handful of SQL queries"""
+    counts = db.session.query(
+        db.session.query(func.count(Medication.id)).scalar_subquery(),
+        db.session.query(func.count(Patient.id)).scalar_subquery(),
+        db.session.query(func.count(Dosage.id)).scalar_subquery(),
+        db.session.query(func.count(Medication.id))
+            .filter(Medication.low_stock == True).scalar_subquery(),
+    ).one()
+
+    now = datetime.utcnow()
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    last_24h = now - timedelta(hours=24)
+    recent = db.session.query(
+        func.count(case((Dosage.dosage_time >= today, 1))),
+        func.count(case((Dosage.dosage_time >= last_24h, 1))),
+    ).filter(Dosage.dosage_time >= min(today, last_24h)).one()
+
+    # Consumption ranking from the daily rollup: O(medications x days), not O(doses)
+    top = db.session.query(
+        Medication.id,
+        Medication.name,
+        func.sum(DailyConsumption.total_amount).label('total_amount'),
+        func.sum(DailyConsumption.dose_count).label('dose_count'),
+    ).join(DailyConsumption, DailyConsumption.medication_id == Medication.id) \
+     .filter(DailyConsumption.day > (now - timedelta(days=TOP_MEDICATIONS_DAYS)).date()) \
+     .group_by(Medication.id, Medication.name) \
+     .having(func.sum(DailyConsumption.dose_count) > 0) \
+     .order_by(func.sum(DailyConsumption.total_amount).desc()) \
+     .limit(TOP_MEDICATIONS_LIMIT).all()
+
+    return {
+        'medications': counts[0],
+        'patients': counts[1],
+        'dosages': counts[2],
+        'low_stock': counts[3],
+        'doses_today': recent[0],
+        'doses_last_24h': recent[1],
+        'top_medications': [{
+            'id': row.id,
+            'name': row.name,
+            'total_amount': row.total_amount,
+            'dose_count': row.dose_count
+        } for row in top],
+        'top_medications_days': TOP_MEDICATIONS_DAYS,
+        'generated_at': now.isoformat()
+    }
+
 
 def init_routes():
     bp = Blueprint('routes', __name__)
 
     # Medication Routes (unchanged)
     @bp.route('/medications', methods=['GET'])
+    # days_until_threshold averages the FORECAST_DAYS up to today
+    @conditional('medications', key=utc_today)
     def get_medications():
-        medications = Medication.query.all()
-        return jsonify([med.to_dict() for med in medications])
+        try:
+            medications, next_cursor = keyset_page(Medication.listing_query(), [Medication.id], request.args)
+        except ValueError as ve:
+            return jsonify({'error': str(ve)}), 400
+        with serialization_timer():
+            response = jsonify(serialize_medications(medications))
+        return paginated_response(response, next_cursor)
 
     @bp.route('/medications', methods=['POST'])
     def add_medication():
         data = request.get_json()
         try:
-            medication = Medication(
-                name=data['name'],
-                description=data.get('description'),
-                current_stock=data['current_stock'],
-                threshold=data['threshold']
-            )
-            db.session.add(medication)
+            medication = create_medication(data)
+            touch('medications')
             db.session.commit()
-            return jsonify(medication.to_dict()), 201
+            return jsonify(medication.to_dict(daily_rate=0.0)), 201
         except (KeyError, TypeError) as e:
             db.session.rollback()
             return jsonify({'error': str(e)}), 400
@@ -33,15 +442,24 @@ def init_routes():
             db.session.rollback()
             return jsonify({'error': 'Database error'}), 500
 
+    @bp.route('/medications/import', methods=['POST'])
+    def import_medications():
+        # Rows with an `id` update that medication, the others are added
+        return import_upload(request, 'medications')
+
     @bp.route('/medications/<int:id>', methods=['PUT'])
     def update_medication(id):
         medication = Medication.query.get_or_404(id)
         data = request.get_json()
         try:
-            medication.update_from_dict(data)
-            db.session.commit()
-            return jsonify(medication.to_dict())
-        except (KeyError, TypeError) as e:
+            def apply():
+                change_medication(medication, data)
+                touch('medications')
+                db.session.commit()
+
+            run_in_transaction(apply)
+            return jsonify(serialize_medication(medication))
+        except (KeyError, TypeError, ValueError) as e:
             db.session.rollback()
             return jsonify({'error': str(e)}), 400
         except SQLAlchemyError as e:
@@ -52,45 +470,156 @@ def init_routes():
     def delete_medication(id):
         medication = Medication.query.get_or_404(id)
         try:
-            db.session.delete(medication)
+            remove_medication(medication)
+            touch('medications', 'dosages', 'schedules')
             db.session.commit()
             return jsonify({'message': 'Medication deleted'}), 200
         except SQLAlchemyError as e:
             db.session.rollback()
             return jsonify({'error': 'Database error'}), 500
 
+    @bp.route('/medications/<int:id>/consumption', methods=['GET'])
+    @conditional('dosages', 'medications', key=utc_today)
+    def get_medication_consumption(id):
+        medication = Medication.query.get_or_404(id)
+        try:
+            days = int(request.args.get('days', CONSUMPTION_DEFAULT_DAYS))
+            if not 1 <= days <= CONSUMPTION_MAX_DAYS:
+                raise ValueError(f'days must be between 1 and {CONSUMPTION_MAX_DAYS}')
+        except ValueError as ve:
+            return jsonify({'error': f'Invalid data format: {str(ve)}'}), 400
+
+        # One rollup row per day with doses, instead of scanning the dosages
+        end = datetime.utcnow().date()
+        start = end - timedelta(days=days - 1)
+        rows = {row.day: row for row in DailyConsumption.query.filter(
+            DailyConsumption.medication_id == id,
+            DailyConsumption.day >= start
+        )}
+        daily = []
+        for offset in range(days):
+            day = start + timedelta(days=offset)
+            row = rows.get(day)
+            daily.append(row.to_dict() if row else
+                         {'day': day.isoformat(), 'total_amount': 0, 'dose_count': 0})
+
+        total = sum(row.total_amount for row in rows.values())
+        rates = DailyConsumption.daily_rates([id])
+        return jsonify({
+            'medication_id': id,
+            'days': days,
+            'total_amount': round(total, 6),
+            'dose_count': sum(row.dose_count for row in rows.values()),
+            'average_daily': round(total / days, 6),
+            'forecast_days': FORECAST_DAYS,
+            'days_until_threshold': medication.days_until_threshold(rates.get(id, 0.0)),
+            'daily': daily
+        })
+
+    @bp.route('/medications/<int:id>/stock', methods=['GET'])
+    @conditional('medications')
+    def get_medication_stock(id):
+        Medication.query.get_or_404(id)
+        try:
+            at = parse_datetime(request.args['at']) if 'at' in request.args else datetime.utcnow()
+        except ValueError as ve:
+            return jsonify({'error': f'Invalid data format: {str(ve)}'}), 400
+        # One snapshot lookup plus the ledger movements since that snapshot
+        balance = balance_at(id, at) or {'stock': None, 'snapshot_at': None, 'movements_scanned': 0}
+        return jsonify(dict(balance, medication_id=id, at=at.isoformat()))
+
+    @bp.route('/medications/<int:id>/stock', methods=['POST'])
+    @idempotent
+    def add_stock_movement(id):
+        Medication.query.get_or_404(id)
+        data = request.get_json()
+        try:
+            # {"quantity": 50} for a delivery, {"stock": 118} for a stock count
+            note = data.get('note')
+            if 'stock' in data:
+                stock = int(data['stock'])
+                change = lambda: set_stock(id, stock, note=note)
+            else:
+                quantity = int(data['quantity'])
+                if quantity <= 0:
+                    raise ValueError('quantity must be positive')
+                change = lambda: adjust_stock(id, quantity, 'restock', note=note)
+
+            def apply():
+                change()
+                touch('medications')
+                db.session.commit()
+
+            run_in_transaction(apply)
+            return jsonify(serialize_medication(db.session.get(Medication, id))), 201
+        except KeyError as ke:
+            db.session.rollback()
+            return jsonify({'error': f'Missing required field: {str(ke)}'}), 400
+        except (ValueError, TypeError) as e:
+            db.session.rollback()
+            return jsonify({'error': f'Invalid data format: {str(e)}'}), 400
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            return jsonify({'error': 'Database error'}), 500
+
     # Patient Routes (unchanged)
     @bp.route('/patients', methods=['GET'])
+    @conditional('patients')
     def get_patients():
-        patients = Patient.query.all()
-        return jsonify([pat.to_dict() for pat in patients])
+        try:
+            patients, next_cursor = keyset_page(Patient.listing_query(), [Patient.id], request.args)
+        except ValueError as ve:
+            return jsonify({'error': str(ve)}), 400
+        with serialization_timer():
+            response = jsonify([Patient.serialize_row(row) for row in patients])
+        return paginated_response(response, next_cursor)
+
+    @bp.route('/patients/search', methods=['GET'])
+    @conditional('patients')
+    def search_patient_records():
+        q = request.args.get('q', '').strip()
+        if not q:
+            return jsonify({'error': 'Missing required field: q'}), 400
+        try:
+            limit = int(request.args.get('limit', SEARCH_DEFAULT_LIMIT))
+            if not 1 <= limit <= SEARCH_MAX_LIMIT:
+                raise ValueError(f'limit must be between 1 and {SEARCH_MAX_LIMIT}')
+        except ValueError as ve:
+            return jsonify({'error': f'Invalid data format: {str(ve)}'}), 400
+        patients = search_patients(q, limit)
+        with serialization_timer():
+            return jsonify([pat.to_dict() for pat in patients])
 
     @bp.route('/patients', methods=['POST'])
     def add_patient():
         data = request.get_json()
         try:
-            patient = Patient(
-                first_name=data['first_name'],
-                last_name=data['last_name'],
-                date_of_birth=datetime.strptime(data['date_of_birth'], '%Y-%m-%d').date(),
-                medical_record_number=data['medical_record_number']
-            )
-            db.session.add(patient)
+            patient = create_patient(data)
+            touch('patients')
             db.session.commit()
             return jsonify(patient.to_dict()), 201
         except (KeyError, TypeError, ValueError) as e:
             db.session.rollback()
             return jsonify({'error': str(e)}), 400
+        except IntegrityError:
+            db.session.rollback()
+            return jsonify({'error': 'A patient with this medical_record_number already exists'}), 409
         except SQLAlchemyError as e:
             db.session.rollback()
             return jsonify({'error': 'Database error'}), 500
 
+    @bp.route('/patients/import', methods=['POST'])
+    def import_patients():
+        # Upserts on medical_record_number, committing every IMPORT_BATCH rows
+        return import_upload(request, 'patients')
+
     @bp.route('/patients/<int:id>', methods=['PUT'])
     def update_patient(id):
         patient = Patient.query.get_or_404(id)
         data = request.get_json()
         try:
             patient.update_from_dict(data)
+            touch('patients')
             db.session.commit()
             return jsonify(patient.to_dict())
         except (KeyError, TypeError, ValueError) as e:
@@ -104,50 +633,181 @@ def init_routes():
     def delete_patient(id):
         patient = Patient.query.get_or_404(id)
         try:
-            db.session.delete(patient)
+            remove_patient(patient)
+            touch('patients', 'dosages', 'medications', 'schedules')
             db.session.commit()
             return jsonify({'message': 'Patient deleted'}), 200
         except SQLAlchemyError as e:
             db.session.rollback()
             return jsonify({'error': 'Database error'}), 500
 
+    @bp.route('/patients/<int:id>/timeline', methods=['GET'])
+    def get_patient_timeline(id):
+        Patient.query.get_or_404(id)
+        now = datetime.utcnow()
+        try:
+            since = parse_datetime(request.args['since']) if 'since' in request.args \
+                else now - TIMELINE_DEFAULT_PAST
+            until = parse_datetime(request.args['until']) if 'until' in request.args \
+                else now + TIMELINE_DEFAULT_AHEAD
+            if not since < until <= since + TIMELINE_MAX_SPAN:
+                raise ValueError(f'until must be after since and at most {TIMELINE_MAX_SPAN.days} days later')
+        except ValueError as ve:
+            return jsonify({'error': f'Invalid data format: {str(ve)}'}), 400
+        entries = build_timeline(id, since, until, now)
+        counts = defaultdict(int)
+        for entry in entries:
+            counts[entry['status']] += 1
+        return jsonify({
+            'patient_id': id,
+            'since': since.isoformat(),
+            'until': until.isoformat(),
+            'as_of': now.isoformat(),
+            'counts': counts,
+            'entries': entries
+        })
+
+    # Schedule Routes
+    @bp.route('/schedules', methods=['GET'])
+    @conditional('schedules')
+    def get_schedules():
+        try:
+            query = Schedule.query
+            if 'patient_id' in request.args:
+                query = query.filter(Schedule.patient_id == int(request.args['patient_id']))
+            schedules, next_cursor = keyset_page(query, [Schedule.id], request.args)
+        except ValueError as ve:
+            return jsonify({'error': str(ve)}), 400
+        with serialization_timer():
+            response = jsonify([schedule.to_dict() for schedule in schedules])
+        return paginated_response(response, next_cursor)
+
+    @bp.route('/schedules', methods=['POST'])
+    def add_schedule():
+        data = request.get_json()
+        try:
+            schedule = Schedule(
+                patient_id=int(data['patient_id']),
+                medication_id=int(data['medication_id']),
+                dosage_amount=float(data['dosage_amount']),
+                starts_at=datetime.utcnow()
+            ).update_from_dict(data)
+            db.session.get(Patient, schedule.patient_id) or abort(400, 'Unknown patient_id')
+            db.session.get(Medication, schedule.medication_id) or abort(400, 'Unknown medication_id')
+            schedule.schedule_next(max(schedule.starts_at, datetime.utcnow()))
+            db.session.add(schedule)
+            touch('schedules')
+            db.session.commit()
+            return jsonify(schedule.to_dict()), 201
+        except HTTPException as e:
+            db.session.rollback()
+            return jsonify({'error': e.description}), e.code
+        except KeyError as ke:
+            db.session.rollback()
+            return jsonify({'error': f'Missing required field: {str(ke)}'}), 400
+        except (TypeError, ValueError) as e:
+            db.session.rollback()
+            return jsonify({'error': f'Invalid data format: {str(e)}'}), 400
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            return jsonify({'error': 'Database error'}), 500
+
+    @bp.route('/schedules/<int:id>', methods=['PUT'])
+    def update_schedule(id):
+        schedule = Schedule.query.get_or_404(id)
+        data = request.get_json()
+        try:
+            schedule.update_from_dict(data)
+            # Resolve slots from now on under the new rules
+            schedule.schedule_next(max(schedule.starts_at, datetime.utcnow()))
+            touch('schedules')
+            db.session.commit()
+            return jsonify(schedule.to_dict())
+        except (KeyError, TypeError, ValueError) as e:
+            db.session.rollback()
+            return jsonify({'error': f'Invalid data format: {str(e)}'}), 400
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            return jsonify({'error': 'Database error'}), 500
+
+    @bp.route('/schedules/<int:id>', methods=['DELETE'])
+    def delete_schedule(id):
+        schedule = Schedule.query.get_or_404(id)
+        try:
+            db.session.delete(schedule)
+            touch('schedules')
+            db.session.commit()
+            return jsonify({'message': 'Schedule deleted'}), 200
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            return jsonify({'error': 'Database error'}), 500
+
+    @bp.route('/schedules/missed', methods=['GET'])
+    @conditional('schedules')
+    def get_missed_doses():
+        # Newest first; recorded by `flask sweep-missed`
+        try:
+            query = MissedDose.query
+            if 'patient_id' in request.args:
+                query = query.filter(MissedDose.patient_id == int(request.args['patient_id']))
+            if 'since' in request.args:
+                query = query.filter(MissedDose.due_at >= parse_datetime(request.args['since']))
+            missed, next_cursor = keyset_page(
+                query, [MissedDose.due_at, MissedDose.id], request.args, descending=True)
+        except ValueError as ve:
+            return jsonify({'error': f'Invalid data format: {str(ve)}'}), 400
+        with serialization_timer():
+            response = jsonify([row.to_dict() for row in missed])
+        return paginated_response(response, next_cursor)
+
     # Dosage Routes (Fixed)
     @bp.route('/dosages', methods=['GET'])
+    @conditional('dosages', 'medication_refs', 'patient_refs')
     def get_dosages():
-        dosages = Dosage.query.all()
-        return jsonify([dosage.to_dict() for dosage in dosages])
+        # Newest first, paged on (dosage_time, id) so each page is an index range scan
+        try:
+            query = filter_dosages(Dosage.plain_query(), request.args)
+            dosages, next_cursor = keyset_page(
+                query, [Dosage.dosage_time, Dosage.id], request.args, descending=True)
+        except ValueError as ve:
+            return jsonify({'error': f'Invalid data format: {str(ve)}'}), 400
+        with serialization_timer():
+            response = jsonify(serialize_dosages(dosages))
+        return paginated_response(response, next_cursor)
+
+    @bp.route('/dosages/export', methods=['GET'])
+    def export_dosage_history():
+        fmt = request.args.get('format', 'ndjson')
+        if fmt not in ('ndjson', 'csv'):
+            return jsonify({'error': 'format must be ndjson or csv'}), 400
+        try:
+            query = filter_dosages(Dosage.listing_query(), request.args)
+        except ValueError as ve:
+            return jsonify({'error': f'Invalid data format: {str(ve)}'}), 400
+
+        # yield_per streams rows through a server-side cursor instead of
+        # fetching the whole result, so memory stays flat for any table size
+        rows = query.order_by(Dosage.dosage_time, Dosage.id).yield_per(EXPORT_BATCH)
+        mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+        return Response(stream_with_context(export_dosages(rows, fmt)), mimetype=mimetype, headers={
+            'Content-Disposition': f'attachment; filename=dosages.{fmt}'
+        })
 
     @bp.route('/dosages', methods=['POST'])
+    @idempotent
     def add_dosage():
         data = request.get_json()
         try:
-            # Parse and validate datetime
-            dosage_time = datetime.fromisoformat(data['dosage_time']) if 'T' in data['dosage_time'] \
-                         else datetime.strptime(data['dosage_time'], '%Y-%m-%d %H:%M:%S')
-            
-            # Validate numeric fields
-            medication_id = int(data['medication_id'])
-            patient_id = int(data['patient_id'])
-            dosage_amount = float(data['dosage_amount'])
-
-            dosage = Dosage(
-                medication_id=medication_id,
-                patient_id=patient_id,
-                dosage_amount=dosage_amount,
-                dosage_time=dosage_time,
-                administered_by=data['administered_by'],
-                notes=data.get('notes', '')
-            )
-            
-            db.session.add(dosage)
-            
-            # Update medication stock
-            medication = Medication.query.get(medication_id)
-            if medication:
-                medication.current_stock -= dosage_amount
-            
-            db.session.commit()
-            return jsonify(dosage.to_dict()), 201
+            fields = parse_dosage(data)
+
+            def record():
+                dosage_id = create_dosage(fields)
+                touch('dosages', 'medications')
+                db.session.commit()
+                return dosage_id
+
+            dosage_id = run_in_transaction(record)
+            return jsonify(serialize_new_dosage(dosage_id, fields)), 201
             
         except ValueError as ve:
             db.session.rollback()
@@ -159,46 +819,77 @@ def init_routes():
             db.session.rollback()
             return jsonify({'error': str(e)}), 400
 
+    @bp.route('/dosages/bulk', methods=['POST'])
+    def add_dosages_bulk():
+        # ?partial=true inserts the valid rows even when some rows are rejected
+        partial = request.args.get('partial', 'false').lower() in ('1', 'true', 'yes')
+        rows, errors = [], []
+        try:
+            for index, data in enumerate(read_records(request)):
+                try:
+                    rows.append((index, parse_dosage(data)))
+                except (KeyError, ValueError, TypeError) as e:
+                    errors.append({'index': index, 'error': describe_error(e)})
+        except ValueError as ve:
+            return jsonify({'error': f'Invalid data format: {str(ve)}'}), 400
+
+        try:
+            # Check every referenced medication and patient against the
+            # reference cache; only the ids it lacks are queried
+            known_medications = medication_refs.get_many({fields['medication_id'] for _, fields in rows})
+            known_patients = patient_refs.get_many({fields['patient_id'] for _, fields in rows})
+            valid = []
+            for index, fields in rows:
+                if fields['medication_id'] not in known_medications:
+                    errors.append({'index': index, 'error': f"Unknown medication_id {fields['medication_id']}"})
+                elif fields['patient_id'] not in known_patients:
+                    errors.append({'index': index, 'error': f"Unknown patient_id {fields['patient_id']}"})
+                else:
+                    valid.append(fields)
+            errors.sort(key=lambda e: e['index'])
+
+            if errors and not partial:
+                return jsonify({'inserted': 0, 'errors': errors}), 400
+
+            # One stock UPDATE (and ledger movement) per medication for the summed amount
+            consumed = defaultdict(float)
+            doses = defaultdict(int)
+            for fields in valid:
+                consumed[fields['medication_id']] += fields['dosage_amount']
+                doses[fields['medication_id']] += 1
+
+            def ingest():
+                for start in range(0, len(valid), BULK_INSERT_CHUNK):
+                    db.session.execute(insert(Dosage), valid[start:start + BULK_INSERT_CHUNK])
+                for medication_id, amount in consumed.items():
+                    adjust_stock(medication_id, -amount, note=f'{doses[medication_id]} doses by bulk upload')
+                record_consumption((fields['medication_id'], fields['dosage_time'],
+                                    fields['dosage_amount'], 1) for fields in valid)
+                touch('dosages', 'medications')
+                db.session.commit()
+
+            run_in_transaction(ingest)
+            return jsonify({'inserted': len(valid), 'errors': errors}), 201
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            return jsonify({'error': 'Database error'}), 500
+
     @bp.route('/dosages/<int:id>', methods=['PUT'])
+    @idempotent
     def update_dosage(id):
-        dosage = Dosage.query.get_or_404(id)
+        Dosage.query.get_or_404(id)
         data = request.get_json()
         try:
-            # Handle datetime
-            if 'dosage_time' in data:
-                dosage.dosage_time = datetime.fromisoformat(data['dosage_time']) if 'T' in data['dosage_time'] \
-                                   else datetime.strptime(data['dosage_time'], '%Y-%m-%d %H:%M:%S')
-            
-            # Handle medication change and stock adjustment
-            if 'medication_id' in data or 'dosage_amount' in data:
-                new_med_id = int(data.get('medication_id', dosage.medication_id))
-                new_amount = float(data.get('dosage_amount', dosage.dosage_amount))
-                
-                # Restore old medication stock
-                if dosage.medication_id != new_med_id or dosage.dosage_amount != new_amount:
-                    old_med = Medication.query.get(dosage.medication_id)
-                    if old_med:
-                        old_med.current_stock += dosage.dosage_amount
-                    
-                    # Deduct from new medication
-                    new_med = Medication.query.get(new_med_id)
-                    if new_med:
-                        new_med.current_stock -= new_amount
-                
-                dosage.medication_id = new_med_id
-                dosage.dosage_amount = new_amount
-            
-            # Update other fields
-            if 'patient_id' in data:
-                dosage.patient_id = int(data['patient_id'])
-            if 'administered_by' in data:
-                dosage.administered_by = data['administered_by']
-            if 'notes' in data:
-                dosage.notes = data['notes']
-            
-            db.session.commit()
-            return jsonify(dosage.to_dict())
+            def apply():
+                change_dosage(id, data)
+                touch('dosages', 'medications')
+                db.session.commit()
+
+            run_in_transaction(apply)
+            return jsonify(serialize_dosage(id))
             
+        except HTTPException:
+            raise
         except ValueError as ve:
             db.session.rollback()
             return jsonify({'error': f'Invalid data format: {str(ve)}'}), 400
@@ -207,33 +898,116 @@ def init_routes():
             return jsonify({'error': str(e)}), 400
 
     @bp.route('/dosages/<int:id>', methods=['DELETE'])
+    @idempotent
     def delete_dosage(id):
-        dosage = Dosage.query.get_or_404(id)
+        Dosage.query.get_or_404(id)
         try:
-            # Restore medication stock
-            medication = Medication.query.get(dosage.medication_id)
-            if medication:
-                medication.current_stock += dosage.dosage_amount
-            
-            db.session.delete(dosage)
-            db.session.commit()
+            def remove():
+                remove_dosage(id)
+                touch('dosages', 'medications')
+                db.session.commit()
+
+            run_in_transaction(remove)
             return jsonify({'message': 'Dosage deleted'}), 200
+        except HTTPException:
+            raise
         except Exception as e:
             db.session.rollback()
             return jsonify({'error': str(e)}), 500
 
+    # Batch Route
+    @bp.route('/batch', methods=['POST'])
+    @idempotent
+    def batch():
+        # [{"op": "update", "resource": "dosages", "id": 3, "data": {...}}, ...]
+        # in one transaction; ?partial=true commits the operations that
+        # succeeded, otherwise any failure rolls the whole batch back
+        partial = request.args.get('partial', 'false').lower() in ('1', 'true', 'yes')
+        operations = request.get_json(silent=True)
+        if not isinstance(operations, list):
+            return jsonify({'error': 'Invalid data format: Expected a JSON array of operations'}), 400
+        if len(operations) > MAX_BATCH_OPERATIONS:
+            return jsonify({'error': f'At most {MAX_BATCH_OPERATIONS} operations per batch'}), 400
+
+        try:
+            def apply():
+                begin_write()
+                results, tables, failed = run_batch(operations, partial)
+                if failed and not partial:
+                    db.session.rollback()
+                    return results, False
+                if tables:
+                    touch(*sorted(tables))
+                db.session.commit()
+                return results, True
+
+            results, committed = run_in_transaction(apply)
+            return jsonify({'committed': committed, 'results': results}), 200 if committed else 400
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            return jsonify({'error': 'Database error'}), 500
+
     # Alerts Route
     @bp.route('/alerts', methods=['GET'])
+    @conditional('medications', key=utc_today)
     def get_alerts():
         try:
-            medications = Medication.query.filter(
-                Medication.current_stock != None,
-                Medication.threshold != None,
-                Medication.current_stock < Medication.threshold
-            ).all()
-            return jsonify([med.to_dict() for med in medications]), 200
+            # Clients pass this back as `since`; the overlap covers transactions
+            # that stamped a change just before we read but committed after
+            as_of = datetime.utcnow() - ALERTS_SINCE_OVERLAP
+            if 'since' in request.args:
+                # Raised and cleared alerts since the client's last poll
+                medications = Medication.listing_query().filter(
+                    Medication.low_stock_changed_at > parse_datetime(request.args['since'])
+                ).order_by(Medication.low_stock_changed_at).all()
+            else:
+                medications = Medication.listing_query().filter(Medication.low_stock == True).all()
+            with serialization_timer():
+                response = jsonify(serialize_medications(medications))
+            response.headers['X-Alerts-As-Of'] = as_of.isoformat()
+            return response, 200
+        except ValueError as ve:
+            return jsonify({'error': f'Invalid data format: {str(ve)}'}), 400
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
+    @bp.route('/alerts/stream', methods=['GET'])
+    def stream_alerts():
+        alerts = current_app.extensions['alert_events']
+        subscription = alerts.subscribe()
+        if subscription is None:
+            # Each stream holds a request thread; clients poll /api/alerts
+            # until a slot frees up
+            response = jsonify({'error': 'Too many open alert streams'})
+            response.headers['Retry-After'] = str(SSE_REFUSED_RETRY_SECONDS)
+            return response, 503
+
+        def generate():
+            try:
+                yield f'retry: {SSE_RETRY_MS}\n\n'
+                while True:
+                    try:
+                        event = subscription.get(timeout=SSE_KEEPALIVE_SECONDS)
+                    except queue.Empty:
+                        # Comment line keeps proxies from closing an idle stream
+                        yield ': keepalive\n\n'
+                        continue
+                    yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+            finally:
+                alerts.unsubscribe(subscription)
+
+        return Response(generate(), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
+
+    # Dashboard Summary Route
+    @bp.route('/summary', methods=['GET'])
+    def get_summary():
+        try:
+            return jsonify(summary_cache.get_or_set('summary', build_summary)), 200
+        except SQLAlchemyError as e:
+            return jsonify({'error': 'Database error'}), 500
+
 
     return bp
\ No newline at end of file
@@ -0,0 +1,35 @@
+import random
+from flask import has_request_context, request
+from flask_sqlalchemy.session import Session
+
+# Bind keys of the read replicas are REPLICA_PREFIX + n (see app.replica_binds)
+REPLICA_PREFIX = 'replica_'
+READ_METHODS = frozenset(('GET', 'HEAD'))
+
+
+class RoutingSession(Session):
+    """Session sending the reads of GET requests to a read replica.
+
+    Everything else uses the primary: other methods, work outside a request
+    (CLI commands, the sweeper), flushes and INSERT/UPDATE/DELETE
+    statements. Once a session has written, the rest of its reads stay on
+    the primary so they see that write. Each session picks one replica and
+    keeps it, so a request reads one consistent snapshot.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self.info.get('use_primary'):
+            if self._flushing or getattr(clause, 'is_dml', False):
+                self.info['use_primary'] = True
+            elif has_request_context() and request.method in READ_METHODS:
+                replica = self._replica()
+                if replica is not None:
+                    return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _replica(self):
+        if 'replica' not in self.info:
+            keys = [key for key in self._db.engines if key and key.startswith(REPLICA_PREFIX)]
+            self.info['replica'] = self._db.engines[random.choice(keys)] if keys else None
+        return self.info['replica']
+
@@ -0,0 +1,190 @@
+import heapq
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+import click
+from sqlalchemy import and_, exists, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from extensions import db
+from models import Schedule, MissedDose, Dosage, Medication
+from events import queue_alert
+from versions import touch
+
+TIMELINE_DEFAULT_PAST = timedelta(days=7)
+TIMELINE_DEFAULT_AHEAD = timedelta(days=1)
+TIMELINE_MAX_SPAN = timedelta(days=92)
+TIMELINE_BATCH = 1000
+# Slots each schedule may advance per sweep; a sweeper that was down for a
+# long time catches up over several runs
+SWEEP_MAX_ROUNDS = 100
+# Arbitrary key for the PostgreSQL advisory lock that keeps sweepers from
+# overlapping
+SWEEP_LOCK_KEY = 4712002
+
+
+def slot_status(window_end, slot, now):
+    """Status of a scheduled slot that no dose has satisfied"""
+    if window_end < now:
+        return 'missed'
+    return 'due' if slot <= now else 'upcoming'
+
+
+def build_timeline(patient_id, since, until, now=None):
+    """Merge a patient's schedules with their dosages into one ordered timeline.
+
+    Scheduled slots and dosages (read in dosage_time order through the
+    (patient_id, dosage_time) index, in batches) are merged in a single
+    pass: each dose satisfies the earliest open slot of its medication
+    whose grace window it falls in, or is reported as unscheduled. Slots
+    nothing satisfied are missed, due or upcoming relative to `now`.
+    """
+    now = now or datetime.utcnow()
+    schedules = Schedule.query.filter(Schedule.patient_id == patient_id).all()
+    names = dict(db.session.query(Medication.id, Medication.name)
+                 .filter(Medication.id.in_({s.medication_id for s in schedules})))
+    max_grace = timedelta(minutes=max([s.grace_minutes for s in schedules], default=0))
+
+    # (key, kind, ...) tuples: a slot enters at its window start, so it is
+    # pending before any dose that could satisfy it arrives
+    def schedule_slots(schedule):
+        grace = timedelta(minutes=schedule.grace_minutes)
+        for slot in schedule.slots(since, until):
+            yield slot - grace, 0, slot, schedule.id, schedule
+
+    slots = heapq.merge(*[schedule_slots(schedule) for schedule in schedules])
+    rows = Dosage.listing_query() \
+        .filter(Dosage.patient_id == patient_id,
+                Dosage.dosage_time >= since - max_grace,
+                Dosage.dosage_time < until + max_grace) \
+        .order_by(Dosage.dosage_time, Dosage.id).yield_per(TIMELINE_BATCH)
+    doses = ((row.dosage_time, 1, row.id, row) for row in rows)
+
+    def slot_entry(slot, schedule, status, dose=None):
+        return {
+            'time': slot.isoformat(),
+            'status': status,
+            'schedule_id': schedule.id,
+            'medication_id': schedule.medication_id,
+            'medication_name': names.get(schedule.medication_id),
+            'dosage_amount': schedule.dosage_amount,
+            'dosage_id': dose.id if dose else None,
+            'taken_at': dose.dosage_time.isoformat() if dose else None,
+            'taken_amount': dose.dosage_amount if dose else None
+        }
+
+    entries = []
+    pending = defaultdict(deque)
+    for item in heapq.merge(slots, doses, key=lambda item: item[:2]):
+        if item[1] == 0:
+            _, _, slot, _, schedule = item
+            pending[schedule.medication_id].append((slot, schedule))
+            continue
+        dose = item[3]
+        queue = pending[dose.medication_id]
+        # Slots whose window closed before this dose can no longer be satisfied
+        while queue and queue[0][0] + timedelta(minutes=queue[0][1].grace_minutes) < dose.dosage_time:
+            slot, schedule = queue.popleft()
+            entries.append(slot_entry(slot, schedule, slot_status(
+                slot + timedelta(minutes=schedule.grace_minutes), slot, now)))
+        if queue:
+            slot, schedule = queue.popleft()
+            entries.append(slot_entry(slot, schedule, 'taken', dose))
+        elif since <= dose.dosage_time < until:
+            entries.append({
+                'time': dose.dosage_time.isoformat(),
+                'status': 'unscheduled',
+                'schedule_id': None,
+                'medication_id': dose.medication_id,
+                'medication_name': dose.medication_name,
+                'dosage_amount': None,
+                'dosage_id': dose.id,
+                'taken_at': dose.dosage_time.isoformat(),
+                'taken_amount': dose.dosage_amount
+            })
+
+    for queue in pending.values():
+        for slot, schedule in queue:
+            entries.append(slot_entry(slot, schedule, slot_status(
+                slot + timedelta(minutes=schedule.grace_minutes), slot, now)))
+    entries.sort(key=lambda entry: entry['time'])
+    return entries
+
+
+def missed_dose_event(schedule_id, patient_id, medication_id, due_at):
+    """Build the payload pushed to clients when the sweeper records a missed dose"""
+    return {
+        'type': 'missed',
+        'schedule_id': schedule_id,
+        'patient_id': patient_id,
+        'medication_id': medication_id,
+        'due_at': due_at.isoformat()
+    }
+
+
+def _insert_ignoring_duplicates():
+    """INSERT that skips missed doses another sweeper already recorded"""
+    dialect = {'postgresql': postgresql, 'sqlite': sqlite}[db.session.get_bind().dialect.name]
+    return dialect.insert(MissedDose).on_conflict_do_nothing(
+        index_elements=[MissedDose.schedule_id, MissedDose.due_at])
+
+
+def sweep_missed_doses(now=None, max_rounds=SWEEP_MAX_ROUNDS):
+    """Record every missed dose of every patient; returns how many were found.
+
+    Each round is one set-based query over all schedules whose current
+    slot's grace window has closed, anti-joined with dosages through the
+    (patient_id, dosage_time) index. Those slots are recorded as missed,
+    and every expired schedule is advanced to its next slot.
+    """
+    now = now or datetime.utcnow()
+    expired = and_(Schedule.due_window_end.isnot(None), Schedule.due_window_end <= now)
+    taken = exists().where(
+        Dosage.patient_id == Schedule.patient_id,
+        Dosage.medication_id == Schedule.medication_id,
+        Dosage.dosage_time >= Schedule.due_window_start,
+        Dosage.dosage_time <= Schedule.due_window_end,
+    )
+    found = 0
+    for _ in range(max_rounds):
+        if db.session.get_bind().dialect.name == 'postgresql' and not db.session.execute(
+                text('SELECT pg_try_advisory_xact_lock(:key)'), {'key': SWEEP_LOCK_KEY}).scalar():
+            # Another sweeper is running
+            break
+        missed = db.session.execute(
+            select(Schedule.id, Schedule.patient_id, Schedule.medication_id, Schedule.due_at)
+            .where(expired, ~taken)
+        ).all()
+        if missed:
+            db.session.execute(_insert_ignoring_duplicates(), [{
+                'schedule_id': row.id, 'patient_id': row.patient_id,
+                'medication_id': row.medication_id, 'due_at': row.due_at, 'detected_at': now
+            } for row in missed])
+            for row in missed:
+                queue_alert(db.session, missed_dose_event(*row))
+            found += len(missed)
+
+        advancing = Schedule.query.filter(expired).all()
+        if not advancing:
+            break
+        for schedule in advancing:
+            schedule.schedule_next(schedule.due_at + timedelta(microseconds=1))
+        touch('schedules')
+        db.session.commit()
+    db.session.commit()
+    return found
+
+
+def init_app(app):
+    """Register the `flask sweep-missed` command"""
+
+    @app.cli.command('sweep-missed')
+    @click.option('--every', type=float, default=0,
+                  help='Repeat every this many seconds instead of running once')
+    def sweep_missed_command(every):
+        """Record missed scheduled doses for all patients."""
+        while True:
+            found = sweep_missed_doses()
+            click.echo(f'{datetime.utcnow().isoformat()} recorded {found} missed doses')
+            if not every:
+                break
+            time.sleep(every)
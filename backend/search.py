@@ -0,0 +1,166 @@
+import math
+from sqlalchemy import DDL, and_, event, func, literal, literal_column, or_, text
+from extensions import db
+from models import Patient
+
+SEARCH_DEFAULT_LIMIT = 10
+SEARCH_MAX_LIMIT = 50
+# Queries shorter than one trigram are matched by prefix only
+TRIGRAM_MIN_LENGTH = 3
+# SQLite fuzzy matching: the share of the query's trigrams a row must
+# contain, and a cap on the rows scored per query
+FUZZY_MIN_SHARED = 0.5
+FUZZY_MAX_CANDIDATES = 2000
+
+# Trigram index over the searchable fields; needs the pg_trgm extension
+POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_patients_search_trgm ON patients USING gin "
+    "((lower(first_name || ' ' || last_name || ' ' || medical_record_number)) gin_trgm_ops)",
+]
+
+# External-content FTS5 table over patients, kept in step by triggers so
+# bulk INSERTs that bypass the ORM are indexed too
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS patients_fts USING fts5("
+    "first_name, last_name, medical_record_number, "
+    "content='patients', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS patients_fts_insert AFTER INSERT ON patients BEGIN "
+    "INSERT INTO patients_fts(rowid, first_name, last_name, medical_record_number) "
+    "VALUES (new.id, new.first_name, new.last_name, new.medical_record_number); END",
+    "CREATE TRIGGER IF NOT EXISTS patients_fts_delete AFTER DELETE ON patients BEGIN "
+    "INSERT INTO patients_fts(patients_fts, rowid, first_name, last_name, medical_record_number) "
+    "VALUES ('delete', old.id, old.first_name, old.last_name, old.medical_record_number); END",
+    "CREATE TRIGGER IF NOT EXISTS patients_fts_update AFTER UPDATE ON patients BEGIN "
+    "INSERT INTO patients_fts(patients_fts, rowid, first_name, last_name, medical_record_number) "
+    "VALUES ('delete', old.id, old.first_name, old.last_name, old.medical_record_number); "
+    "INSERT INTO patients_fts(rowid, first_name, last_name, medical_record_number) "
+    "VALUES (new.id, new.first_name, new.last_name, new.medical_record_number); END",
+]
+
+# Databases built with create_all() (seeding, tests) get the same objects
+# as the migration
+for statement in POSTGRES_DDL:
+    event.listen(Patient.__table__, 'after_create', DDL(statement).execute_if(dialect='postgresql'))
+for statement in SQLITE_DDL:
+    event.listen(Patient.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+
+
+def _escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _prefix_columns():
+    """The lower()-ed columns covered by the ix_patients_*_lower indexes"""
+    return [func.lower(Patient.last_name), func.lower(Patient.first_name),
+            func.lower(Patient.medical_record_number)]
+
+
+def _starts_with(expr, prefix, dialect):
+    if dialect == 'sqlite':
+        # SQLite only uses an expression index for a range, not for LIKE
+        return and_(expr >= prefix, expr < prefix[:-1] + chr(ord(prefix[-1]) + 1))
+    return expr.like(_escape_like(prefix) + '%', escape='\\')
+
+
+def _trigrams(value):
+    return set(value[i:i + 3] for i in range(len(value) - 2))
+
+
+def _fields(patient):
+    return [patient.first_name.lower(), patient.last_name.lower(), patient.medical_record_number.lower()]
+
+
+def _prefix_matches(q, limit, dialect):
+    """Rows where a name or the record number starts with `q`, exact matches first.
+
+    One index range scan per column, each ordered by its index and stopped
+    after `limit` rows, so the cost does not depend on how many rows match.
+    """
+    found = {}
+    for column in _prefix_columns():
+        for patient in Patient.query.filter(_starts_with(column, q, dialect)) \
+                .order_by(column, Patient.id).limit(limit):
+            found[patient.id] = patient
+    return sorted(found.values(), key=lambda p: (q not in _fields(p), p.last_name.lower(),
+                                                 p.first_name.lower(), p.id))[:limit]
+
+
+def _trigram_matches_postgres(q, limit):
+    document = func.lower(Patient.first_name + literal_column("' '") + Patient.last_name
+                          + literal_column("' '") + Patient.medical_record_number)
+    # Substring or fuzzy (word_similarity above pg_trgm's threshold) matches,
+    # both answered by the trigram GIN index
+    return Patient.query.filter(or_(
+        document.like('%' + _escape_like(q) + '%', escape='\\'),
+        literal(q).op('<%')(document),
+    )).order_by(func.word_similarity(q, document).desc(), Patient.id).limit(limit).all()
+
+
+def _fts_phrase(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _fts_rows(expression, limit):
+    """Patient rows matching an FTS5 expression; unranked, so FTS5 stops after `limit`"""
+    return db.session.execute(text(
+        'SELECT patients.id, patients.first_name, patients.last_name, patients.medical_record_number '
+        'FROM patients_fts JOIN patients ON patients.id = patients_fts.rowid '
+        'WHERE patients_fts MATCH :match LIMIT :limit'
+    ), {'match': expression, 'limit': limit}).all()
+
+
+def _fts_count(expression, cap):
+    """Rows matching an FTS5 expression, counting no further than `cap`"""
+    return db.session.execute(text(
+        'SELECT count(*) FROM (SELECT 1 FROM patients_fts WHERE patients_fts MATCH :match LIMIT :cap)'
+    ), {'match': expression, 'cap': cap}).scalar()
+
+
+def _trigram_matches_sqlite(q, limit):
+    wanted = _trigrams(q)
+    # Capped, so a trigram found in every row costs no more than a rare one
+    counts = {t: _fts_count(_fts_phrase(t), FUZZY_MAX_CANDIDATES + 1) for t in wanted}
+
+    ranked = []
+    if all(counts.values()):
+        # A term of three or more characters is a substring match with the
+        # trigram tokenizer (skipped above when some trigram occurs nowhere)
+        ranked = [(0, row) for row in _fts_rows(_fts_phrase(q), limit)]
+    # Fuzzy: rows containing at least FUZZY_MIN_SHARED of the query's
+    # trigrams. Such a row must contain one of the `k - need + 1` rarest of
+    # them, so only those are looked up. When even those are too common to
+    # narrow the candidates the query is left to the tiers above.
+    need = max(1, math.ceil(len(wanted) * FUZZY_MIN_SHARED))
+    rarest = sorted(wanted, key=lambda t: (counts[t], t))[:len(wanted) - need + 1]
+    if len(ranked) < limit and sum(counts[t] for t in rarest) <= FUZZY_MAX_CANDIDATES:
+        seen = {row.id for _, row in ranked}
+        for row in _fts_rows(' OR '.join(_fts_phrase(t) for t in rarest), FUZZY_MAX_CANDIDATES):
+            shared = len(wanted & _trigrams(' '.join(row[1:]).lower()))
+            if shared >= need and row.id not in seen:
+                ranked.append((len(wanted) - shared + 1, row))
+
+    ranked.sort(key=lambda item: (item[0], item[1].last_name.lower(), item[1].first_name.lower(), item[1].id))
+    best = [row.id for _, row in ranked[:limit]]
+    by_id = {patient.id: patient for patient in Patient.query.filter(Patient.id.in_(best))} if best else {}
+    return [by_id[patient_id] for patient_id in best]
+
+
+def search_patients(q, limit=SEARCH_DEFAULT_LIMIT):
+    """Patients matching `q` by prefix, substring or trigram similarity, best first.
+
+    Prefix matches come first, answered by the lower() b-tree indexes; the
+    rest of the page is filled from pg_trgm (PostgreSQL) or the patients_fts
+    trigram table (SQLite) with substring and then fuzzy matches.
+    """
+    q = q.strip().lower()
+    dialect = db.session.get_bind().dialect.name
+    patients = _prefix_matches(q, limit, dialect)
+    if len(patients) < limit and len(q) >= TRIGRAM_MIN_LENGTH:
+        seen = {patient.id for patient in patients}
+        if dialect == 'postgresql':
+            more = _trigram_matches_postgres(q, limit + len(seen))
+        else:
+            more = _trigram_matches_sqlite(q, limit + len(seen))
+        patients += [patient for patient in more if patient.id not in seen][:limit - len(patients)]
+    return patients
@@ -0,0 +1,70 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional; responses fall back to the stdlib encoder
+    orjson = None
+
+JSON_BACKENDS = ('orjson', 'stdlib')
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider encoding with orjson, producing the same documents as the
+    default provider (sorted keys, dates as HTTP dates, same fallbacks)"""
+
+    def _options(self):
+        # Dates go through the default provider's `default` so they keep
+        # Flask's format rather than orjson's ISO strings
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return option
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # Options only the stdlib encoder understands (indent, cls, ...)
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if self.compact is False or (self.compact is None and self._app.debug):
+            # Pretty-printed output for debugging
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self._options() | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def compile_serializer(name, columns, fields, derived=None, params=(), namespace=None):
+    """Compile a function turning a result row of `columns` into a dict.
+
+    `fields` maps each output key to a Python expression over the column
+    names, the names in `derived` (computed once per row) and `params`
+    (extra arguments after the row). The generated function unpacks the
+    row tuple into locals and builds the dict in one expression, so no ORM
+    instance or attribute lookup is involved.
+    """
+    lines = [f"def {name}(row{''.join(', ' + p for p in params)}):",
+             f"    {', '.join(columns)}, = row"]
+    lines += [f'    {local} = {expression}' for local, expression in (derived or {}).items()]
+    lines.append('    return {' + ', '.join(f'{key!r}: {expression}' for key, expression in fields.items()) + '}')
+    scope = dict(namespace or {})
+    exec(compile('\n'.join(lines), f'<serializer {name}>', 'exec'), scope)
+    return scope[name]
+
+
+def init_app(app):
+    """Install the JSON provider chosen by the JSON_BACKEND setting"""
+    backend = app.config['JSON_BACKEND']
+    if backend not in JSON_BACKENDS:
+        raise ValueError(f'JSON_BACKEND must be one of {", ".join(JSON_BACKENDS)}')
+    if backend == 'orjson':
+        if orjson is None:
+            app.logger.warning('orjson is not installed; using the stdlib JSON encoder')
+        else:
+            app.json = OrjsonProvider(app)
@@ -0,0 +1,89 @@
+import os
+import sys
+
+import pytest
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from extensions import db
+from references import CACHES
+from versions import touch
+
+
+@pytest.fixture
+def app_config():
+    """Config overrides for the app; override this fixture in a module to change them"""
+    return {}
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch, app_config):
+    """The app on an empty SQLite database of its own, or on
+    TEST_DATABASE_URL, whose tables are dropped and recreated (only point it
+    at a scratch database)"""
+    monkeypatch.setenv('DATABASE_URL', os.environ.get('TEST_DATABASE_URL') or f'sqlite:///{tmp_path}/test.db')
+    # Log files go to ./logs
+    monkeypatch.chdir(tmp_path)
+    app = create_app(dict({'TESTING': True}, **app_config))
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        # create_all() leaves out the counter rows the migrations seed
+        touch('dosages', 'medications', 'patients', 'schedules', 'medication_refs', 'patient_refs')
+        db.session.commit()
+    # Per-worker caches outlive the app; start each test cold
+    for cache in CACHES:
+        cache.invalidate()
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    # Requests run outside an app context, each with its own g and session
+    return app.test_client()
+
+
+@pytest.fixture
+def statements(app):
+    """The SQL statements run since the list was last cleared"""
+    with app.app_context():
+        engine = db.engine
+    executed = []
+
+    def record(conn, cursor, statement, *rest):
+        executed.append(statement)
+    event.listen(engine, 'before_cursor_execute', record)
+    yield executed
+    event.remove(engine, 'before_cursor_execute', record)
+
+
+@pytest.fixture
+def make_medication(client):
+    def make(**fields):
+        resp = client.post('/api/medications', json=dict({'current_stock': 100, 'threshold': 10}, **fields))
+        assert resp.status_code == 201, resp.get_json()
+        return resp.get_json()
+    return make
+
+
+@pytest.fixture
+def make_patient(client):
+    count = iter(range(10 ** 6))
+
+    def make(**fields):
+        n = next(count)
+        resp = client.post('/api/patients', json=dict({
+            'first_name': 'Test', 'last_name': f'Patient{n}', 'date_of_birth': '1980-01-01',
+            'medical_record_number': f'TEST-{n}'}, **fields))
+        assert resp.status_code == 201, resp.get_json()
+        return resp.get_json()
+    return make
+
+
+def dose(medication, patient, amount=1, time='2025-01-01 08:00:00'):
+    return {'medication_id': medication['id'], 'patient_id': patient['id'], 'dosage_amount': amount,
+            'dosage_time': time, 'administered_by': 'nurse'}
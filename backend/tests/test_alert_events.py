@@ -0,0 +1,62 @@
+import queue
+
+import pytest
+
+from conftest import dose
+from extensions import db
+from models import Medication
+
+
+@pytest.fixture
+def subscription(app):
+    alerts = app.extensions['alert_events']
+    subscription = alerts.subscribe()
+    yield subscription
+    alerts.unsubscribe(subscription)
+
+
+def received(subscription):
+    events = []
+    while True:
+        try:
+            events.append(subscription.get_nowait())
+        except queue.Empty:
+            return events
+
+
+def low_dose_batch(app, client, make_medication, make_patient, partial):
+    medication = make_medication(name='Batch', current_stock=25, threshold=20)
+    patient = make_patient()
+    resp = client.post('/api/batch' + ('?partial=true' if partial else ''), json=[
+        {'op': 'create', 'resource': 'dosages', 'data': dose(medication, patient, amount=10)},
+        {'op': 'delete', 'resource': 'dosages', 'id': 999},
+    ])
+    with app.app_context():
+        stock = db.session.get(Medication, medication['id']).current_stock
+    return resp, stock
+
+
+def test_rolled_back_batch_publishes_nothing(app, client, subscription, make_medication, make_patient):
+    resp, stock = low_dose_batch(app, client, make_medication, make_patient, partial=False)
+    assert resp.status_code == 400
+    assert resp.get_json()['committed'] is False
+    assert stock == 25
+    assert received(subscription) == []
+
+
+def test_partial_batch_publishes_the_operations_that_committed(app, client, subscription, make_medication,
+                                                               make_patient):
+    resp, stock = low_dose_batch(app, client, make_medication, make_patient, partial=True)
+    assert resp.status_code == 200
+    assert resp.get_json()['committed'] is True
+    assert [r['status'] for r in resp.get_json()['results']] == [201, 404]
+    assert stock == 15
+    events = received(subscription)
+    assert [(e['type'], e['current_stock']) for e in events] == [('raised', 15)]
+
+
+def test_direct_write_publishes_after_commit(client, subscription, make_medication, make_patient):
+    medication = make_medication(name='Direct', current_stock=25, threshold=20)
+    resp = client.post('/api/dosages', json=dose(medication, make_patient(), amount=10))
+    assert resp.status_code == 201
+    assert [e['type'] for e in received(subscription)] == ['raised']
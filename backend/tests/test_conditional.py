@@ -0,0 +1,27 @@
+from datetime import datetime
+
+import pytest
+
+import versions
+
+
+class FrozenDatetime(datetime):
+    now = datetime(2025, 1, 1, 23, 59)
+
+    @classmethod
+    def utcnow(cls):
+        return cls.now
+
+
+@pytest.mark.parametrize('url', ['/api/medications', '/api/alerts', '/api/medications/1/consumption'])
+def test_forecast_etags_change_at_utc_midnight(client, monkeypatch, make_medication, url):
+    # Forecasts count days from today, so yesterday's 304 would be stale
+    make_medication(name='Forecast', current_stock=5, threshold=10)
+    monkeypatch.setattr(versions, 'datetime', FrozenDatetime)
+    etag = client.get(url).headers['ETag']
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+    monkeypatch.setattr(FrozenDatetime, 'now', datetime(2025, 1, 2, 0, 1))
+    resp = client.get(url, headers={'If-None-Match': etag})
+    assert resp.status_code == 200
+    assert resp.headers['ETag'] != etag
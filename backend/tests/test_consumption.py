@@ -0,0 +1,37 @@
+import re
+
+from conftest import dose
+from extensions import db
+from models import DailyConsumption
+
+ROLLUP_UPSERT = re.compile(r'^\s*INSERT INTO medication_daily_consumption\b', re.I)
+
+
+def rollup(app):
+    with app.app_context():
+        return {(row.medication_id, row.day.isoformat()): (row.total_amount, row.dose_count)
+                for row in db.session.query(DailyConsumption)}
+
+
+def test_bulk_dosages_update_the_rollup_in_one_statement(app, client, statements, make_medication, make_patient):
+    medications = [make_medication(name=f'Bulk {n}', current_stock=1000) for n in range(4)]
+    patient = make_patient()
+    doses = [dose(medications[n % 4], patient, amount=n % 3 + 1, time=f'2025-01-{n % 5 + 1:02d} 08:00:00')
+             for n in range(100)]
+    statements.clear()
+    resp = client.post('/api/dosages/bulk', json=doses)
+    assert resp.status_code == 201, resp.get_json()
+    assert sum(bool(ROLLUP_UPSERT.match(s)) for s in statements) == 1
+
+    expected = {}
+    for d in doses:
+        key = (d['medication_id'], d['dosage_time'][:10])
+        amount, count = expected.get(key, (0.0, 0))
+        expected[key] = (amount + d['dosage_amount'], count + 1)
+    assert rollup(app) == expected
+
+    # A second upload adds to the stored totals
+    resp = client.post('/api/dosages/bulk', json=doses[:1])
+    assert resp.status_code == 201
+    key = (doses[0]['medication_id'], doses[0]['dosage_time'][:10])
+    assert rollup(app)[key] == (expected[key][0] + doses[0]['dosage_amount'], expected[key][1] + 1)
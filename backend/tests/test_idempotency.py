@@ -0,0 +1,80 @@
+"""Concurrent duplicate dosage writes must apply exactly once.
+
+For each Idempotency-Key, several threads submit the same POST
+/api/dosages at once, then the same PUT and DELETE of the new dose.
+Afterwards exactly the doses that were not deleted must exist, once each,
+`current_stock` must reflect each write once, and every duplicate has to
+get the original's response back.
+"""
+import threading
+import uuid
+
+import pytest
+
+from conftest import dose
+from extensions import db
+from models import Dosage, Medication
+
+OPENING_STOCK = 1_000_000
+DUPLICATES = 8
+DOSES = 20
+
+
+@pytest.fixture(params=['memory', 'database'])
+def app_config(request):
+    return {'IDEMPOTENCY_BACKEND': request.param}
+
+
+def race(app, method, url, body=None):
+    """Send the same request from every thread at once; return the responses"""
+    key = str(uuid.uuid4())
+    responses = [None] * DUPLICATES
+    barrier = threading.Barrier(DUPLICATES)
+
+    def send(n):
+        client = app.test_client()
+        barrier.wait()
+        responses[n] = getattr(client, method)(url, json=body, headers={'Idempotency-Key': key})
+
+    threads = [threading.Thread(target=send, args=(n,)) for n in range(DUPLICATES)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return responses
+
+
+def test_concurrent_duplicates_apply_once(app, make_medication, make_patient):
+    medication = make_medication(name='Duplicated', current_stock=OPENING_STOCK, threshold=0)
+    patient = make_patient()
+    expected_stock = OPENING_STOCK
+    mismatched, replayed, requests = [], 0, 0
+
+    def check(responses, status):
+        nonlocal replayed, requests
+        requests += 1
+        first = responses[0]
+        assert first.status_code == status, first.get_json()
+        mismatched.extend(resp for resp in responses
+                          if (resp.status_code, resp.get_data()) != (first.status_code, first.get_data()))
+        replayed += sum(resp.headers.get('Idempotent-Replayed') == 'true' for resp in responses)
+        return first.get_json()
+
+    for i in range(DOSES):
+        dosage_id = check(race(app, 'post', '/api/dosages', dose(medication, patient)), 201)['id']
+        expected_stock -= 1
+        # Every third dose is corrected upwards, every fifth is voided
+        if i % 3 == 0:
+            check(race(app, 'put', f'/api/dosages/{dosage_id}', {'dosage_amount': 2}), 200)
+            expected_stock -= 1
+        if i % 5 == 0:
+            check(race(app, 'delete', f'/api/dosages/{dosage_id}'), 200)
+            expected_stock += 2 if i % 3 == 0 else 1
+
+    assert mismatched == []
+    # All but one copy of each request got the stored response
+    assert replayed == requests * (DUPLICATES - 1)
+    with app.app_context():
+        assert db.session.get(Medication, medication['id']).current_stock == expected_stock
+        doses = db.session.query(Dosage).filter_by(medication_id=medication['id']).count()
+    assert doses == DOSES - len(range(0, DOSES, 5))
@@ -0,0 +1,19 @@
+import pytest
+
+
+@pytest.mark.parametrize('url', ['/api/medications', '/api/patients', '/api/schedules', '/api/dosages'])
+@pytest.mark.parametrize('limit', ['abc', '1.5', '0', '-3', ''])
+def test_invalid_limit_is_rejected(client, url, limit):
+    resp = client.get(f'{url}?limit={limit}')
+    assert resp.status_code == 400
+    assert 'limit must be a positive integer' in resp.get_json()['error']
+
+
+def test_limit_pages_and_is_clamped(client, make_medication):
+    for n in range(3):
+        make_medication(name=f'Page {n}')
+    resp = client.get('/api/medications?limit=2')
+    assert resp.status_code == 200
+    assert len(resp.get_json()) == 2
+    assert resp.headers['X-Next-Cursor']
+    assert len(client.get('/api/medications?limit=100000').get_json()) == 3
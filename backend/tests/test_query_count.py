@@ -0,0 +1,87 @@
+"""The dosage routes run a fixed number of SQL statements.
+
+GET /api/dosages reads the dosages with one SELECT and runs as many
+statements for 50 rows as for 2; names come from the reference cache, or
+one query per table when it is cold. Creating and updating a dose each run
+the same statements every time. Guards against per-row relationship loads
+(N+1) coming back.
+"""
+import re
+from datetime import datetime
+
+import pytest
+
+from conftest import dose
+from models import FORECAST_DAYS, days_until_threshold
+from references import CACHES
+
+# Statements per request. Warm means the reference cache already holds the
+# names involved; each cold table costs one more SELECT.
+LIST_STATEMENTS = 2     # table_versions (ETag and cache stamps), dosages
+CREATE_STATEMENTS = 6   # INSERT dosage, stock UPDATE, ledger INSERT, rollup upsert, touch, cache stamps
+UPDATE_STATEMENTS = 11  # 404 check, SELECT FOR UPDATE, guarded UPDATE, stock and ledger out and in,
+                        # rollup, touch, dosage re-read, cache stamps
+COLD_TABLES = 2
+SELECT_DOSAGES = re.compile(r'^\s*SELECT\b.*\bFROM dosages\b', re.S | re.I)
+
+
+@pytest.fixture
+def seeded(client, statements, make_medication, make_patient):
+    """50 medications and patients, and a dose for each pair"""
+    medications = [make_medication(name=f'Count {n}', current_stock=10 ** 6, threshold=0) for n in range(50)]
+    patients = [make_patient() for _ in range(50)]
+    created = []
+    for medication, patient in zip(medications, patients):
+        statements.clear()
+        resp = client.post('/api/dosages', json=dose(medication, patient))
+        assert resp.status_code == 201, resp.get_json()
+        assert len(statements) == CREATE_STATEMENTS + COLD_TABLES
+        created.append(resp.get_json()['id'])
+    return medications, patients, created
+
+
+def count(client, statements, method, url, body=None):
+    statements.clear()
+    resp = getattr(client, method)(url, json=body)
+    assert resp.status_code in (200, 201), (url, resp.status_code, resp.get_json())
+    return len(statements), sum(bool(SELECT_DOSAGES.match(s)) for s in statements)
+
+
+@pytest.mark.parametrize('limit', [2, 50])
+def test_list_runs_the_same_statements_for_any_page_size(client, statements, seeded, limit):
+    assert count(client, statements, 'get', f'/api/dosages?limit={limit}') == (LIST_STATEMENTS, 1)
+
+
+def test_list_with_a_cold_cache_loads_names_once_per_table(client, statements, seeded):
+    for cache in CACHES:
+        cache.invalidate()
+    assert count(client, statements, 'get', '/api/dosages?limit=50') == (LIST_STATEMENTS + COLD_TABLES, 1)
+
+
+def test_create_and_update_run_a_fixed_number_of_statements(client, statements, seeded):
+    medications, patients, created = seeded
+    for medication, patient in zip(medications[:5], patients[:5]):
+        assert count(client, statements, 'post', '/api/dosages', dose(medication, patient))[0] == CREATE_STATEMENTS
+    for dosage_id in created[:5]:
+        assert count(client, statements, 'put', f'/api/dosages/{dosage_id}',
+                     {'dosage_amount': 2})[0] == UPDATE_STATEMENTS
+
+
+def test_medication_list_loads_forecasts_in_one_query(client, statements, make_medication):
+    make_medication(name='Forecast 0')
+    make_medication(name='Forecast 1')
+    few = count(client, statements, 'get', '/api/medications')[0]
+    for n in range(2, 30):
+        make_medication(name=f'Forecast {n}')
+    assert count(client, statements, 'get', '/api/medications')[0] == few
+
+
+def test_medication_update_returns_its_forecast(client, make_medication, make_patient):
+    medication = make_medication(name='Updated', current_stock=100, threshold=10)
+    today = datetime.utcnow().strftime('%Y-%m-%d 08:00:00')
+    resp = client.post('/api/dosages', json=dose(medication, make_patient(), amount=30, time=today))
+    assert resp.status_code == 201
+    resp = client.put(f"/api/medications/{medication['id']}", json={'threshold': 20})
+    assert resp.status_code == 200
+    # 70 left, 50 above the threshold, at 30 a day over FORECAST_DAYS
+    assert resp.get_json()['days_until_threshold'] == days_until_threshold(70, 20, 30 / FORECAST_DAYS)
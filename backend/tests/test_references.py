@@ -0,0 +1,24 @@
+from references import MedicationRef, medication_refs
+
+
+def test_medication_refs_follow_name_and_threshold_changes(app, client, make_medication):
+    medication = make_medication(name='Cached', threshold=10)
+    with app.test_request_context():
+        assert medication_refs.get_many([medication['id']]) == {medication['id']: MedicationRef('Cached', 10)}
+
+    resp = client.put(f"/api/medications/{medication['id']}", json={'name': 'Renamed', 'threshold': 25})
+    assert resp.status_code == 200, resp.get_json()
+    with app.test_request_context():
+        assert medication_refs.get_many([medication['id']]) == {medication['id']: MedicationRef('Renamed', 25)}
+
+
+def test_stock_changes_keep_the_cache(app, client, make_medication):
+    medication = make_medication(name='Stocked', current_stock=50, threshold=10)
+    with app.test_request_context():
+        medication_refs.get_many([medication['id']])
+    version = medication_refs.version
+    resp = client.post(f"/api/medications/{medication['id']}/stock", json={'quantity': 5})
+    assert resp.status_code in (200, 201), resp.get_json()
+    with app.test_request_context():
+        medication_refs.get_many([medication['id']])
+    assert medication_refs.version == version
@@ -0,0 +1,56 @@
+"""Concurrent dosage writes must leave medication stock exact.
+
+Several threads record, amend and delete doses of the same medication
+through the API at once. Afterwards `current_stock` has to equal the
+opening stock minus the doses that remain, otherwise an update was lost,
+and the stock ledger has to add up to it.
+"""
+import threading
+
+from conftest import dose
+from extensions import db
+from ledger import reconcile
+from models import Dosage, Medication
+
+OPENING_STOCK = 1_000_000
+THREADS = 8
+DOSES_PER_THREAD = 25
+
+
+def test_concurrent_dosage_writes_lose_no_stock_update(app, make_medication, make_patient):
+    medication = make_medication(name='Contended', current_stock=OPENING_STOCK, threshold=0)
+    patient = make_patient()
+    failures = []
+
+    def worker():
+        client = app.test_client()
+        for i in range(DOSES_PER_THREAD):
+            resp = client.post('/api/dosages', json=dose(medication, patient))
+            if resp.status_code != 201:
+                failures.append(('create', resp.status_code, resp.get_json()))
+                continue
+            dosage_id = resp.get_json()['id']
+            # Every third dose is corrected upwards, every fifth is voided
+            if i % 3 == 0:
+                resp = client.put(f'/api/dosages/{dosage_id}', json={'dosage_amount': 2})
+                if resp.status_code != 200:
+                    failures.append(('update', resp.status_code, resp.get_json()))
+            if i % 5 == 0:
+                resp = client.delete(f'/api/dosages/{dosage_id}')
+                if resp.status_code != 200:
+                    failures.append(('delete', resp.status_code, resp.get_json()))
+
+    threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert failures == []
+    with app.app_context():
+        stock = db.session.get(Medication, medication['id']).current_stock
+        remaining = db.session.query(db.func.coalesce(db.func.sum(Dosage.dosage_amount), 0)) \
+            .filter(Dosage.medication_id == medication['id']).scalar()
+        # Every stock change must also have landed in the ledger
+        assert reconcile() == []
+    assert stock == OPENING_STOCK - remaining
@@ -0,0 +1,82 @@
+import hashlib
+from datetime import datetime
+from functools import wraps
+from flask import g, request, make_response
+from sqlalchemy import event, insert, update
+from sqlalchemy.orm import Session
+from extensions import db
+from models import TableVersion
+from cache import invalidate_summary
+
+CACHE_CONTROL = 'private, no-cache'
+
+
+def touch(*tables):
+    """Bump the version of `tables` inside the current write transaction"""
+    result = db.session.execute(
+        update(TableVersion)
+        .where(TableVersion.name.in_(tables))
+        .values(version=TableVersion.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount < len(tables):
+        # Databases built with create_all() start without counter rows
+        known = {name for (name,) in db.session.query(TableVersion.name)
+                 .filter(TableVersion.name.in_(tables))}
+        missing = [{'name': name, 'version': 1} for name in tables if name not in known]
+        if missing:
+            db.session.execute(insert(TableVersion), missing)
+    db.session.info.setdefault('touched_tables', set()).update(tables)
+
+
+def current_versions(*tables):
+    """Current version of each of `tables`, read in one query"""
+    rows = db.session.query(TableVersion.name, TableVersion.version) \
+        .filter(TableVersion.name.in_(tables)).all()
+    versions = dict(rows)
+    return [(name, versions.get(name, 0)) for name in sorted(tables)]
+
+
+def utc_today():
+    """ETag key for responses that depend on the current UTC day"""
+    return datetime.utcnow().date().isoformat()
+
+
+def conditional(*tables, key=None):
+    """Serve a GET with a strong ETag and answer If-None-Match with 304.
+
+    The ETag covers the request URL and the versions of `tables`, so a
+    matching validator is answered from the counters alone without reading
+    or serializing any rows. Responses that also depend on something else,
+    such as the current day, pass a `key` callable whose value joins the tag.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            versions = current_versions(*tables)
+            g.table_versions = dict(versions)
+            extra = f'|{key()}' if key else ''
+            etag = hashlib.sha1(f'{request.full_path}|{versions}{extra}'.encode()).hexdigest()
+            if request.if_none_match.contains(etag):
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = CACHE_CONTROL
+            return response
+        return wrapper
+    return decorator
+
+
+@event.listens_for(Session, 'after_commit')
+def clear_caches(session):
+    touched = session.info.pop('touched_tables', None)
+    if touched:
+        invalidate_summary()
+
+
+@event.listens_for(Session, 'after_rollback')
+def forget_touched(session):
+    session.info.pop('touched_tables', None)
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useRef } from "react";
 import {
   Table,
   TableBody,
@@ -12,24 +12,60 @@ import {
   Alert,
   Button,
 } from "@mui/material";
-import { getAlerts } from "../../services/api";
+import { getAlerts, subscribeAlerts } from "../../services/api";
 
 const AlertsPage = () => {
   const [alerts, setAlerts] = useState([]);
+  const asOf = useRef(null);
 
-  const fetchAlerts = async () => {
+  // Full list on the first call and on Refresh, then only the alerts raised
+  // or cleared since the previous poll.
+  const fetchAlerts = async (incremental = false) => {
     try {
-      const { data } = await getAlerts();
-      setAlerts(data);
+      const since = incremental ? asOf.current : null;
+      const { data, headers } = await getAlerts(since);
+      asOf.current = headers["x-alerts-as-of"];
+      if (!since) {
+        setAlerts(data);
+        return;
+      }
+      setAlerts((prev) => {
+        const byId = new Map(prev.map((med) => [med.id, med]));
+        data.forEach((med) => {
+          if (med.low_stock) byId.set(med.id, med);
+          else byId.delete(med.id);
+        });
+        return Array.from(byId.values());
+      });
     } catch (error) {
       console.error("Error fetching alerts:", error);
     }
   };
 
   useEffect(() => {
-    fetchAlerts();
-    const interval = setInterval(fetchAlerts, 30000);
-    return () => clearInterval(interval);
+    // Pushed events keep the list current; every (re)connect catches up on
+    // what changed while the stream was down.
+    return subscribeAlerts(
+      (event) =>
+        setAlerts((prev) => {
+          const others = prev.filter((med) => med.id !== event.medication_id);
+          if (!event.low_stock) return others;
+          const current = prev.find((med) => med.id === event.medication_id);
+          return [
+            ...others,
+            {
+              ...current,
+              id: event.medication_id,
+              name: event.name,
+              current_stock: event.current_stock,
+              threshold: event.threshold,
+              low_stock: true,
+            },
+          ];
+        }),
+      () => fetchAlerts(asOf.current !== null),
+      () => fetchAlerts(asOf.current !== null)
+    );
   }, []);
 
   return (
@@ -43,7 +79,7 @@ const AlertsPage = () => {
         }}
       >
         <Typography variant="h4">Low Stock Alerts</Typography>
-        <Button variant="contained" onClick={fetchAlerts}>
+        <Button variant="contained" onClick={() => fetchAlerts()}>
           Refresh
         </Button>
       </Box>
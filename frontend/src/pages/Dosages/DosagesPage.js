@@ -47,16 +47,27 @@ const DosagesPage = () => {
   const [open, setOpen] = useState(false);
   const [currentDosage, setCurrentDosage] = useState(null);
   const [error, setError] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+
+  // Newest first, one page at a time; without a cursor the list restarts
+  // from the first page, with one the next page is appended
+  const loadDosages = async (cursor) => {
+    const response = await getDosages(cursor ? { cursor } : {});
+    setDosages((current) =>
+      cursor ? [...current, ...response.data] : response.data
+    );
+    setNextCursor(response.headers["x-next-cursor"] || null);
+  };
 
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const [dosagesRes, medsRes, patientsRes] = await Promise.all([
-          getDosages(),
+        const [, medsRes, patientsRes] = await Promise.all([
+          loadDosages(),
           getMedications(),
           getPatients(),
         ]);
-        setDosages(dosagesRes.data);
         setMedications(medsRes.data);
         setPatients(patientsRes.data);
       } catch (error) {
@@ -86,8 +97,7 @@ const DosagesPage = () => {
       }
 
       // Refresh data
-      const { data } = await getDosages();
-      setDosages(data);
+      await loadDosages();
       handleClose();
     } catch (error) {
       setError(error.response?.data?.error || "Failed to save dosage");
@@ -103,8 +113,7 @@ const DosagesPage = () => {
     try {
       setError(null);
       await deleteDosage(id);
-      const { data } = await getDosages();
-      setDosages(data);
+      await loadDosages();
     } catch (error) {
       setError("Failed to delete dosage");
       console.error(
@@ -114,6 +123,18 @@ const DosagesPage = () => {
     }
   };
 
+  const handleLoadMore = async () => {
+    try {
+      setError(null);
+      setLoadingMore(true);
+      await loadDosages(nextCursor);
+    } catch (error) {
+      setError("Failed to load more dosages");
+      console.error("Error loading dosages:", error.response?.data || error.message);
+    }
+    setLoadingMore(false);
+  };
+
   const handleOpen = (dosage = null) => {
     setCurrentDosage(dosage);
     setOpen(true);
@@ -185,6 +206,13 @@ const DosagesPage = () => {
           </TableBody>
         </Table>
       </TableContainer>
+      {nextCursor && (
+        <Box sx={{ display: "flex", justifyContent: "center", mt: 2 }}>
+          <Button variant="outlined" onClick={handleLoadMore} disabled={loadingMore}>
+            {loadingMore ? "Loading..." : "Load more"}
+          </Button>
+        </Box>
+      )}
 
       <Dialog open={open} onClose={handleClose}>
         <DialogTitle>
@@ -7,12 +7,7 @@ import {
   Alert,
   CircularProgress,
 } from "@mui/material";
-import {
-  getMedications,
-  getPatients,
-  getDosages,
-  getAlerts,
-} from "../../services/api";
+import { getSummary } from "../../services/api";
 import SummaryCard from "../../components/SummaryCard";
 import {
   Medication as MedicationIcon,
@@ -34,15 +29,13 @@ const HomePage = () => {
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const [medsRes, patientsRes, dosagesRes, alertsRes] = await Promise.all(
-          [getMedications(), getPatients(), getDosages(), getAlerts()]
-        );
+        const { data } = await getSummary();
 
         setStats({
-          medications: medsRes.data.length,
-          patients: patientsRes.data.length,
-          dosages: dosagesRes.data.length,
-          alerts: alertsRes.data.length,
+          medications: data.medications,
+          patients: data.patients,
+          dosages: data.dosages,
+          alerts: data.low_stock,
           loading: false,
           error: null,
         });
@@ -21,7 +21,8 @@ import { Add, Edit, Delete } from "@mui/icons-material";
 import { Formik, Form, Field } from "formik";
 import * as Yup from "yup";
 import {
-  getPatients,
+  getPatientsPage,
+  searchPatients,
   addPatient,
   updatePatient,
   deletePatient,
@@ -34,24 +35,62 @@ const patientSchema = Yup.object().shape({
   medical_record_number: Yup.string().required("Required"),
 });
 
+const SEARCH_DEBOUNCE_MS = 200;
+
 const PatientsPage = () => {
   const [patients, setPatients] = useState([]);
   const [open, setOpen] = useState(false);
   const [currentPatient, setCurrentPatient] = useState(null);
+  const [query, setQuery] = useState("");
+  const [results, setResults] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
+  // Bumped after a write to rerun the current search
+  const [searchVersion, setSearchVersion] = useState(0);
 
   useEffect(() => {
     fetchPatients();
   }, []);
 
-  const fetchPatients = async () => {
+  // Ranked server-side search instead of filtering the full list here
+  useEffect(() => {
+    const q = query.trim();
+    if (!q) {
+      setResults(null);
+      return undefined;
+    }
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      try {
+        const { data } = await searchPatients(q);
+        if (!cancelled) setResults(data);
+      } catch (error) {
+        console.error("Error searching patients:", error);
+      }
+    }, SEARCH_DEBOUNCE_MS);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [query, searchVersion]);
+
+  // One page at a time; a cursor appends the next page to the list
+  const fetchPatients = async (cursor) => {
     try {
-      const { data } = await getPatients();
-      setPatients(data);
+      const response = await getPatientsPage(cursor ? { cursor } : {});
+      setPatients((current) =>
+        cursor ? [...current, ...response.data] : response.data
+      );
+      setNextCursor(response.headers["x-next-cursor"] || null);
     } catch (error) {
       console.error("Error fetching patients:", error);
     }
   };
 
+  // After a write, reload only what is on screen: the search results or
+  // the first page
+  const refresh = () =>
+    query.trim() ? setSearchVersion((v) => v + 1) : fetchPatients();
+
   const handleSubmit = async (values, { setSubmitting }) => {
     try {
       if (currentPatient) {
@@ -59,8 +98,7 @@ const PatientsPage = () => {
       } else {
         await addPatient(values);
       }
-      const { data } = await getPatients(); 
-      setPatients(data);
+      await refresh();
       handleClose();
     } catch (error) {
       console.error("Error saving patient:", error);
@@ -71,8 +109,7 @@ const PatientsPage = () => {
   const handleDelete = async (id) => {
     try {
       await deletePatient(id);
-      const { data } = await getPatients(); 
-      setPatients(data);
+      await refresh();
     } catch (error) {
       console.error(
         "Error deleting patient:",
@@ -104,6 +141,14 @@ const PatientsPage = () => {
       >
         Add Patient
       </Button>
+      <TextField
+        label="Search by name or record #"
+        value={query}
+        onChange={(e) => setQuery(e.target.value)}
+        fullWidth
+        size="small"
+        sx={{ mb: 2 }}
+      />
 
       <TableContainer component={Paper}>
         <Table>
@@ -117,7 +162,7 @@ const PatientsPage = () => {
             </TableRow>
           </TableHead>
           <TableBody>
-            {patients.map((pat) => (
+            {(results ?? patients).map((pat) => (
               <TableRow key={pat.id}>
                 <TableCell>{pat.first_name}</TableCell>
                 <TableCell>{pat.last_name}</TableCell>
@@ -138,6 +183,13 @@ const PatientsPage = () => {
           </TableBody>
         </Table>
       </TableContainer>
+      {!results && nextCursor && (
+        <Box sx={{ display: "flex", justifyContent: "center", mt: 2 }}>
+          <Button variant="outlined" onClick={() => fetchPatients(nextCursor)}>
+            Load more
+          </Button>
+        </Box>
+      )}
 
       <Dialog open={open} onClose={handleClose}>
         <DialogTitle>
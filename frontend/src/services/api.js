@@ -6,28 +6,154 @@ console.log("🌍 Base URL:", process.env.REACT_APP_API_URL);
 const api = axios.create({
   baseURL: process.env.REACT_APP_API_URL,
   headers: { "Content-Type": "application/json" },
+  validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
 });
 
+// Conditional GETs: remember the ETag and body of each GET response and send
+// the validator back. A 304 means nothing changed, so the remembered body is
+// returned without the server re-reading or re-sending it.
+const etagCache = new Map();
+
+api.interceptors.request.use((config) => {
+  if (config.method === "get") {
+    const cached = etagCache.get(api.getUri(config));
+    if (cached) config.headers["If-None-Match"] = cached.etag;
+  }
+  return config;
+});
+
+api.interceptors.response.use((response) => {
+  const { config } = response;
+  if (config.method !== "get") return response;
+  const key = api.getUri(config);
+  if (response.status === 304 && etagCache.has(key)) {
+    const cached = etagCache.get(key);
+    return { ...response, status: 200, data: cached.data, headers: cached.headers };
+  }
+  if (response.headers.etag) {
+    etagCache.set(key, {
+      etag: response.headers.etag,
+      data: response.data,
+      headers: response.headers,
+    });
+  }
+  return response;
+});
+
+// List endpoints are keyset-paginated: the cursor of the next page comes back
+// in the X-Next-Cursor header and is passed as the `cursor` query parameter.
+export const getPage = (url, params = {}) => api.get(url, { params });
+
+// Follows the cursor until the last page; only for small catalogs.
+export const getAllPages = async (url, params = {}) => {
+  let cursor;
+  let response;
+  const data = [];
+  do {
+    response = await getPage(url, { ...params, limit: 1000, cursor });
+    data.push(...response.data);
+    cursor = response.headers["x-next-cursor"];
+  } while (cursor);
+  return { ...response, data };
+};
+
 // Medications
-export const getMedications = () => api.get("/medications");
+export const getMedications = () => getAllPages("/medications");
 export const addMedication = (data) => api.post("/medications", data);
 export const updateMedication = (id, data) =>
   api.put(`/medications/${id}`, data);
 export const deleteMedication = (id) => api.delete(`/medications/${id}`);
+// Stock at a point in time (`at` is an ISO timestamp, default now)
+export const getMedicationStock = (id, at) =>
+  api.get(`/medications/${id}/stock`, { params: at ? { at } : {} });
 
 // Patients
-export const getPatients = () => api.get("/patients");
+// The whole registry, for pickers; the patients screen pages instead
+export const getPatients = () => getAllPages("/patients");
+export const getPatientsPage = (params = {}) => getPage("/patients", params);
+export const searchPatients = (q, limit = 20) =>
+  api.get("/patients/search", { params: { q, limit } });
 export const addPatient = (data) => api.post("/patients", data);
 export const updatePatient = (id, data) => api.put(`/patients/${id}`, data);
-export const updateDosage = (id, data) => api.put(`/dosages/${id}`, data);
 export const deletePatient = (id) => api.delete(`/patients/${id}`);
+export const getPatientTimeline = (id, params = {}) =>
+  api.get(`/patients/${id}/timeline`, { params });
+
+// Schedules
+export const getSchedules = (params = {}) => getPage("/schedules", params);
+export const addSchedule = (data) => api.post("/schedules", data);
+export const updateSchedule = (id, data) => api.put(`/schedules/${id}`, data);
+export const deleteSchedule = (id) => api.delete(`/schedules/${id}`);
+export const getMissedDoses = (params = {}) => getPage("/schedules/missed", params);
+
+// Dosage writes carry an Idempotency-Key and are retried with the same key
+// when the network drops or the server is briefly unavailable, so a dose is
+// recorded (and its stock deducted) once however many attempts it takes.
+const RETRY_STATUSES = [409, 502, 503, 504];
+const MAX_ATTEMPTS = 4;
+
+const sendIdempotent = async (method, url, data) => {
+  const headers = { "Idempotency-Key": crypto.randomUUID() };
+  for (let attempt = 1; ; attempt++) {
+    try {
+      return await api.request({ method, url, data, headers });
+    } catch (error) {
+      const status = error.response?.status;
+      const retryable = !error.response || RETRY_STATUSES.includes(status);
+      if (!retryable || attempt === MAX_ATTEMPTS) throw error;
+      await new Promise((resolve) => setTimeout(resolve, 500 * 2 ** (attempt - 1)));
+    }
+  }
+};
 
 // Dosages
-export const getDosages = () => api.get("/dosages");
-export const addDosage = (data) => api.post("/dosages", data);
-export const deleteDosage = (id) => api.delete(`/dosages/${id}`);
+export const getDosages = (params = {}) => getPage("/dosages", params);
+export const addDosage = (data) => sendIdempotent("post", "/dosages", data);
+export const updateDosage = (id, data) => sendIdempotent("put", `/dosages/${id}`, data);
+export const deleteDosage = (id) => sendIdempotent("delete", `/dosages/${id}`);
+// {quantity} for a delivery, {stock} for a stock count
+export const addStockMovement = (id, data) =>
+  sendIdempotent("post", `/medications/${id}/stock`, data);
+
+// Several writes in one transaction: [{ op, resource, id, data }, ...].
+// With partial, the operations that succeed are kept even if others fail.
+export const runBatch = (operations, { partial = false } = {}) =>
+  sendIdempotent("post", partial ? "/batch?partial=true" : "/batch", operations);
 
 // Alerts
-export const getAlerts = () => api.get("/alerts");
+export const getAlerts = (since) =>
+  api.get("/alerts", { params: since ? { since } : {} });
+
+// Server-sent low-stock events ("raised" / "cleared"). `onOpen` runs on every
+// (re)connect so the caller can resync anything missed while disconnected.
+// A worker with all its stream slots taken answers 503, which closes the
+// EventSource for good; `onRefused` runs (to poll instead) and a new stream
+// is tried after STREAM_RETRY_MS.
+const STREAM_RETRY_MS = 30000;
+
+export const subscribeAlerts = (onEvent, onOpen, onRefused) => {
+  let source;
+  let timer;
+  const handler = (message) => onEvent(JSON.parse(message.data));
+  const connect = () => {
+    source = new EventSource(`${process.env.REACT_APP_API_URL}/alerts/stream`);
+    source.addEventListener("raised", handler);
+    source.addEventListener("cleared", handler);
+    if (onOpen) source.onopen = onOpen;
+    source.onerror = () => {
+      if (source.readyState !== EventSource.CLOSED) return;
+      if (onRefused) onRefused();
+      timer = setTimeout(connect, STREAM_RETRY_MS);
+    };
+  };
+  connect();
+  return () => {
+    clearTimeout(timer);
+    source.close();
+  };
+};
+
+// Dashboard
+export const getSummary = () => api.get("/summary");
 
 export default api;